@@ -0,0 +1,121 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import AccessToken
+from reviews.models import User
+
+ACCESS_CLAIMS = ('username', 'role', 'is_staff', 'token_version', )
+TOKEN_VERSION_KEY = 'token-version:{}'
+
+
+def get_access_token(user):
+    """
+    Метод выпускает токен доступа с ролью и версией токенов
+    пользователя, чтобы проверять права без обращения к базе.
+    """
+    token = AccessToken.for_user(user)
+    for claim in ACCESS_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def get_token_version(user_id):
+    """
+    Метод возвращает актуальную версию токенов пользователя из общего кеша,
+    при промахе читая её из базы; None, если пользователя нет.
+    """
+    key = TOKEN_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = User.objects.filter(
+            pk=user_id, is_active=True).values_list(
+                'token_version', flat=True).first()
+        if version is not None:
+            cache.set(key, version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def forget_token_version(user_id):
+    cache.delete(TOKEN_VERSION_KEY.format(user_id))
+
+
+class UserCache:
+    """Класс кеша строк пользователей в памяти процесса с коротким TTL."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = {}
+
+    def get(self, pk):
+        now = time.monotonic()
+        with self.lock:
+            expires, user = self.users.get(pk, (0, None))
+        if expires > now:
+            return user
+        return self.store(pk, User.objects.get(pk=pk), now)
+
+    def store(self, pk, user, now):
+        with self.lock:
+            self.users[pk] = (now + settings.USER_CACHE_TIMEOUT, user)
+        return user
+
+    def forget(self, pk):
+        with self.lock:
+            self.users.pop(pk, None)
+
+
+user_cache = UserCache()
+
+
+class ClaimsUser(TokenUser):
+    """
+    Класс пользователя, восстановленного из утверждений токена.
+    Полная строка пользователя загружается только по требованию.
+    """
+
+    @cached_property
+    def role(self):
+        return self.token['role']
+
+    @property
+    def is_admin(self):
+        return self.role == User.ADMIN or self.is_staff
+
+    @property
+    def is_moderator(self):
+        return self.role == User.MODER
+
+    @cached_property
+    def instance(self):
+        """Метод возвращает модель пользователя из кеша процесса."""
+        return user_cache.get(self.pk)
+
+
+def get_user_instance(user):
+    """Метод возвращает модель пользователя для записи в базу."""
+    return getattr(user, 'instance', user)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Класс аутентификации по JWT без чтения пользователя из базы.
+
+    Права проверяются по утверждениям токена, а отозванность — по версии
+    токенов в общем кеше. Токены без утверждений, выпущенные раньше,
+    обрабатываются как обычно, с загрузкой пользователя.
+    """
+
+    def get_user(self, validated_token):
+        if not all(claim in validated_token for claim in ACCESS_CLAIMS):
+            return super().get_user(validated_token)
+        user = ClaimsUser(validated_token)
+        if get_token_version(user.pk) != validated_token['token_version']:
+            raise AuthenticationFailed(
+                'Токен отозван.', code='token_revoked')
+        return user
@@ -0,0 +1,342 @@
+import math
+import platform
+import re
+import time
+from contextlib import contextmanager
+from itertools import islice
+from random import Random
+
+import django
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
+from reviews.rankings import refresh_rankings
+
+from .authentication import get_access_token
+from .fast import compare_serialization
+from .serializers import CommentSerializer, ReviewSerializer, TitleSerializer
+from .urls import router_v1
+
+WORDS = (
+    'звезда', 'море', 'город', 'ночь', 'дорога', 'сад', 'зима', 'огонь',
+    'ветер', 'тень', 'песня', 'остров', 'память', 'лес', 'мост', 'свет',
+    'река', 'дом', 'небо', 'время', 'star', 'river', 'night', 'garden',
+)
+EXTRA_QUERIES = {
+    'title-list': ('cursor=', 'search=звезда', 'ordering=rating',
+                   'genre=genre-1&year=2000', ),
+    'review-list': ('cursor=', ),
+}
+ADMIN_EXTRA_QUERIES = {
+    'title': ('q=звезда', 'genre__id__exact=1', ),
+    'review': ('q=user1', 'author__id__exact=1', 'score=10', ),
+    'comment': ('q=user1', 'review__id__exact=1', ),
+}
+ADMIN_CHANGE_MODELS = (Title, Review, Comment)
+PARENT_PATTERN = re.compile(r'\(\?P<(\w+)>[^)]+\)')
+SEEDED_MODELS = (User, Category, Genre, Title, GenreTitle, Review, Comment)
+SCALE_OPTIONS = ('titles', 'reviews', 'comments', 'users', 'seed', )
+SERIALIZERS = (TitleSerializer, ReviewSerializer, CommentSerializer)
+
+
+def add_scale_arguments(parser):
+    """Метод добавляет команде параметры размера каталога."""
+    parser.add_argument('--titles', type=int, default=1000)
+    parser.add_argument('--reviews', type=int, default=10000)
+    parser.add_argument('--comments', type=int, default=10000)
+    parser.add_argument('--users', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument(
+        '--keepdb', action='store_true',
+        help='Не удалять тестовую базу после измерений.')
+
+
+@contextmanager
+def temporary_database(keepdb=False):
+    """Контекст создаёт тестовую базу на время замеров."""
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+def insert(model, objects, batch_size):
+    """Метод записывает объекты генератора пачками через bulk_create."""
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return
+        model.objects.bulk_create(batch)
+
+
+def sentence(rng, length):
+    return ' '.join(rng.choice(WORDS) for _ in range(length))
+
+
+def seed_catalog(titles=1000, reviews=10000, comments=10000, users=None,
+                 seed=42, batch_size=5000):
+    """
+    Метод детерминированно заполняет базу каталогом заданного размера.
+
+    Все объекты получают явные первичные ключи, поэтому одинаковые
+    параметры дают одинаковые данные в любой СУБД (кроме дат
+    публикации, которые проставляет auto_now_add). Отзывы распределяются
+    по произведениям поровну, авторы отзыва на одно произведение
+    не повторяются.
+    """
+    rng = Random(seed)
+    reviews = reviews if titles else 0
+    per_title = -(-reviews // titles) if titles else 0
+    users = max(users or 0, per_title, 1)
+    with transaction.atomic():
+        insert(User, (
+            User(id=number, username=f'user{number}',
+                 email=f'user{number}@yamdb.fake',
+                 role=User.ADMIN if number == 1 else User.USER,
+                 is_staff=number == 1, is_superuser=number == 1)
+            for number in range(1, users + 1)), batch_size)
+        Category.objects.bulk_create(
+            Category(id=number, name=f'Категория {number}',
+                     slug=f'category-{number}') for number in range(1, 11))
+        Genre.objects.bulk_create(
+            Genre(id=number, name=f'Жанр {number}', slug=f'genre-{number}')
+            for number in range(1, 21))
+        insert(Title, (
+            Title(id=number,
+                  name=f'{sentence(rng, 2).capitalize()} {number}',
+                  year=rng.randint(1950, 2022),
+                  category_id=rng.randint(1, 10),
+                  description=sentence(rng, rng.randint(5, 30)))
+            for number in range(1, titles + 1)), batch_size)
+        insert(GenreTitle, (
+            GenreTitle(title_id=title_id, genre_id=genre_id)
+            for title_id in range(1, titles + 1)
+            for genre_id in rng.sample(range(1, 21), rng.randint(1, 3))),
+            batch_size)
+        insert(Review, generate_reviews(
+            rng, titles, reviews, users), batch_size)
+        insert(Comment, (
+            Comment(id=number, review_id=rng.randint(1, reviews),
+                    author_id=rng.randint(1, users),
+                    text=sentence(rng, rng.randint(3, 20)))
+            for number in range(1, comments + 1 if reviews else 1)),
+            batch_size)
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), SEEDED_MODELS):
+                cursor.execute(sql)
+        Title.objects.recalculate_rating()
+        Review.objects.recalculate_comment_count()
+        Title.objects.update_search_vector()
+        refresh_rankings(batch_size, full=True)
+
+
+def generate_reviews(rng, titles, reviews, users):
+    number = 0
+    for title_id in range(1, titles + 1):
+        count = reviews // titles + (title_id <= reviews % titles)
+        for author_id in rng.sample(range(1, users + 1), count):
+            number += 1
+            yield Review(
+                id=number, title_id=title_id, author_id=author_id,
+                text=sentence(rng, rng.randint(5, 40)),
+                score=rng.randint(1, 10))
+
+
+def get_endpoints():
+    """
+    Метод строит адреса списков и объектов для всех маршрутов router_v1
+    по образцам из базы: комментарий, его отзыв и произведение.
+    Вложенные маршруты заданы регулярными выражениями с якорем,
+    поэтому адреса собираются из префиксов, а не через reverse.
+    """
+    comment = Comment.objects.select_related(
+        'review__title__category').order_by('pk').first()
+    review = comment.review
+    title = review.title
+    samples = {
+        Title: title, Review: review, Comment: comment,
+        Category: title.category, Genre: Genre.objects.order_by('pk').first(),
+        User: User.objects.order_by('pk').first(),
+    }
+    parents = {'title_id': title.pk, 'review_id': review.pk}
+    root = reverse('api-root')
+    endpoints = []
+    for prefix, viewset, basename in router_v1.registry:
+        url = root + PARENT_PATTERN.sub(
+            lambda match: str(parents[match.group(1)]),
+            prefix.lstrip('^')) + '/'
+        endpoints.append((f'{basename}-list', url))
+        for query in EXTRA_QUERIES.get(f'{basename}-list', ()):
+            endpoints.append((f'{basename}-list?{query}', f'{url}?{query}'))
+        if hasattr(viewset, 'retrieve'):
+            value = getattr(
+                samples[viewset.queryset.model], viewset.lookup_field)
+            endpoints.append((f'{basename}-detail', f'{url}{value}/'))
+    return endpoints
+
+
+def get_admin_endpoints():
+    """
+    Метод строит адреса списков всех моделей reviews в админке,
+    в том числе с поиском и фильтрами, форм изменения больших моделей
+    и автодополнения пользователей.
+    """
+    endpoints = []
+    for model in admin.site._registry:
+        if model._meta.app_label != 'reviews':
+            continue
+        name = model._meta.model_name
+        url = reverse(f'admin:reviews_{name}_changelist')
+        endpoints.append((f'admin-{name}-changelist', url))
+        for query in ADMIN_EXTRA_QUERIES.get(name, ()):
+            endpoints.append(
+                (f'admin-{name}-changelist?{query}', f'{url}?{query}'))
+    for model in ADMIN_CHANGE_MODELS:
+        name = model._meta.model_name
+        pk = model.objects.order_by('pk').values_list('pk', flat=True)[0]
+        endpoints.append((
+            f'admin-{name}-change',
+            reverse(f'admin:reviews_{name}_change', args=(pk, ))))
+    endpoints.append((
+        'admin-user-autocomplete?term=user1',
+        f'{reverse("admin:reviews_user_autocomplete")}?term=user1'))
+    return endpoints
+
+
+def percentile(values, share):
+    """Метод возвращает перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(len(ordered) * share) - 1)]
+
+
+class QueryCounter:
+    """Класс обёртки выполнения SQL, считающий запросы."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def request(client, url):
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        started = time.perf_counter()
+        response = client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        elapsed = time.perf_counter() - started
+    return response.status_code, elapsed * 1000, counter.count
+
+
+def measure(client, url, repeat=20, warmup=3):
+    """
+    Метод измеряет адрес: первый запрос на пустом кеше отдельно,
+    затем repeat запросов после warmup прогревочных.
+    """
+    cache.clear()
+    status, cold_ms, cold_queries = request(client, url)
+    for _ in range(warmup):
+        request(client, url)
+    timings, queries = [], []
+    for _ in range(repeat):
+        status, elapsed, count = request(client, url)
+        timings.append(elapsed)
+        queries.append(count)
+    return {
+        'status': status,
+        'cold_ms': round(cold_ms, 3),
+        'cold_queries': cold_queries,
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p90_ms': round(percentile(timings, 0.9), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'rps': round(len(timings) / (sum(timings) / 1000), 1),
+        'queries': max(queries),
+    }
+
+
+def run_benchmark(repeat=20, warmup=3, endpoints=None):
+    """Метод измеряет все адреса API от имени администратора."""
+    admin = User.objects.filter(role=User.ADMIN).order_by('pk').first()
+    client = Client(
+        HTTP_AUTHORIZATION=f'Bearer {get_access_token(admin)}')
+    return {
+        name: measure(client, url, repeat, warmup)
+        for name, url in (endpoints or get_endpoints())}
+
+
+def run_admin_benchmark(repeat=20, warmup=3, endpoints=None):
+    """Метод измеряет страницы админки от имени суперпользователя."""
+    client = Client()
+    client.force_login(
+        User.objects.filter(is_superuser=True).order_by('pk').first())
+    return {
+        name: measure(client, url, repeat, warmup)
+        for name, url in (endpoints or get_admin_endpoints())}
+
+
+def run_serialization(repeat=20, limit=100):
+    """
+    Метод сравнивает пропускную способность сериализаторов DRF
+    и быстрого пути на первых limit объектах каждой модели.
+    """
+    results = {}
+    for serializer_class in SERIALIZERS:
+        meta = serializer_class.Meta
+        instances = meta.model.objects.select_related(
+            *meta.select_related).prefetch_related(
+            *getattr(meta, 'prefetch_related', ())).order_by('pk')[:limit]
+        results[serializer_class.__name__] = compare_serialization(
+            serializer_class(list(instances), many=True), repeat)
+    return results
+
+
+def get_meta(**scale):
+    return {
+        'vendor': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'scale': scale,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Метод сравнивает результаты с базовыми и возвращает описания
+    регрессий: рост числа запросов или медианы задержки больше чем
+    на долю tolerance. Задержки сравниваются только для той же СУБД.
+    """
+    same_vendor = (
+        results['meta']['vendor'] == baseline['meta']['vendor'])
+    regressions = []
+    for name, current in sorted(results['endpoints'].items()):
+        base = baseline['endpoints'].get(name)
+        if base is None:
+            continue
+        if current['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: запросов {current["queries"]} '
+                f'вместо {base["queries"]}')
+        if same_vendor and (
+                current['p50_ms'] > base['p50_ms'] * (1 + tolerance)):
+            regressions.append(
+                f'{name}: p50 {current["p50_ms"]} мс '
+                f'вместо {base["p50_ms"]} мс')
+    return regressions
@@ -0,0 +1,288 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.validators import UniqueValidator
+from reviews.versions import bump_versions
+
+from .pagination import FALSE_VALUES
+from .serializers import PrefetchedSlugRelatedField
+
+
+def prefetch_related_slugs(serializer, items):
+    """
+    Метод загружает связанные объекты всех элементов одним запросом
+    IN на каждое поле PrefetchedSlugRelatedField сериализатора.
+    """
+    related_cache = {}
+    for name, field in serializer.fields.items():
+        relation = getattr(field, 'child_relation', field)
+        if field.read_only or not isinstance(
+                relation, PrefetchedSlugRelatedField):
+            continue
+        slugs = set()
+        for item in items:
+            value = item.get(name) if isinstance(item, dict) else None
+            if isinstance(value, list):
+                slugs.update(str(slug) for slug in value)
+            elif value is not None:
+                slugs.add(str(value))
+        related_cache[(relation.queryset.model, relation.slug_field)] = {
+            str(getattr(obj, relation.slug_field)): obj
+            for obj in relation.get_queryset().filter(
+                **{f'{relation.slug_field}__in': slugs})}
+    serializer.context['related_cache'] = related_cache
+
+
+def pop_unique_fields(serializer):
+    """
+    Метод снимает с полей сериализатора UniqueValidator, чтобы
+    проверить уникальность всех элементов одним запросом.
+    """
+    unique = {}
+    for name, field in serializer.fields.items():
+        validators = [
+            validator for validator in field.validators
+            if not isinstance(validator, UniqueValidator)]
+        if len(validators) != len(field.validators):
+            unique[name] = field.source_attrs[-1]
+            field.validators = validators
+    return unique
+
+
+def read_bulk_ids(model, instances):
+    """
+    Метод дочитывает одним запросом первичные ключи объектов, если база
+    не возвращает их из bulk_create. Вставка держит блокировку записи
+    до конца транзакции, поэтому последние ключи таблицы принадлежат
+    только что созданным объектам и идут в порядке вставки.
+    """
+    pks = list(model.objects.order_by('-pk').values_list(
+        'pk', flat=True)[:len(instances)])
+    for instance, pk in zip(instances, reversed(pks)):
+        instance.pk = pk
+
+
+class BulkWriteMixin:
+    """
+    Миксин массовой записи объектов контроллера.
+
+    POST, PATCH и DELETE на адрес bulk/ принимают массив объектов
+    (для DELETE — массив ключей bulk_lookup_field). Связи по слагам
+    и уникальность проверяются одним запросом на поле, запись идёт
+    через bulk_create и bulk_update в одной транзакции. По умолчанию
+    при любой ошибке не записывается ничего; с параметром atomic=false
+    записываются корректные элементы, а ошибки возвращаются по индексам.
+    """
+    bulk_lookup_field = 'id'
+    atomic_query_param = 'atomic'
+
+    @action(methods=['post', 'patch', 'delete'], detail=False)
+    def bulk(self, request, *args, **kwargs):
+        """Метод эндпоинта массового создания, изменения и удаления."""
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({'non_field_errors': [
+                'Ожидается список элементов.']})
+        if len(items) > settings.BULK_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': [
+                f'Не больше {settings.BULK_MAX_ITEMS} элементов за запрос.']})
+        atomic = request.query_params.get(
+            self.atomic_query_param, '').lower() not in FALSE_VALUES
+        if request.method == 'DELETE':
+            valid, errors = self.validate_bulk_keys(items)
+        else:
+            valid, errors = self.validate_bulk_items(
+                items, partial=request.method == 'PATCH')
+        if errors and (atomic or not valid):
+            return Response(
+                {'results': [], 'errors': errors},
+                status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            if request.method == 'DELETE':
+                return Response({
+                    'deleted': self.perform_bulk_destroy(valid),
+                    'errors': errors})
+            if request.method == 'POST':
+                instances = self.perform_bulk_create(valid)
+            else:
+                instances = self.perform_bulk_update(valid)
+        return Response(
+            {'results': self.serialize_bulk(instances), 'errors': errors},
+            status=(status.HTTP_201_CREATED if request.method == 'POST'
+                    else status.HTTP_200_OK))
+
+    def get_bulk_key(self, item):
+        """Метод приводит ключ элемента к типу поля bulk_lookup_field."""
+        if isinstance(item, dict):
+            item = item.get(self.bulk_lookup_field)
+        field = self.get_queryset().model._meta.get_field(
+            self.bulk_lookup_field)
+        try:
+            return field.to_python(item)
+        except DjangoValidationError:
+            return None
+
+    def get_bulk_instances(self, keys):
+        return self.get_queryset().model.objects.in_bulk(
+            keys, field_name=self.bulk_lookup_field)
+
+    def validate_bulk_keys(self, items):
+        """Метод находит объекты для удаления одним запросом."""
+        instances = self.get_bulk_instances(
+            [key for key in map(self.get_bulk_key, items) if key is not None])
+        valid, errors = [], []
+        for index, item in enumerate(items):
+            instance = instances.get(self.get_bulk_key(item))
+            if instance is None:
+                errors.append({'index': index, 'errors': {
+                    self.bulk_lookup_field: ['Объект не найден.']}})
+            else:
+                valid.append(instance)
+        return valid, errors
+
+    def validate_bulk_items(self, items, partial):
+        """
+        Метод проверяет все элементы одним экземпляром сериализатора
+        и возвращает пары (объект или None, данные) и ошибки по индексам.
+        """
+        serializer = self.get_serializer(partial=partial)
+        prefetch_related_slugs(serializer, items)
+        unique = pop_unique_fields(serializer)
+        instances = {}
+        if partial:
+            instances = self.get_bulk_instances(
+                [key for key in map(self.get_bulk_key, items)
+                 if key is not None])
+        valid, errors = [], []
+        for index, item in enumerate(items):
+            instance = None
+            if partial:
+                instance = instances.get(self.get_bulk_key(item))
+                if instance is None:
+                    errors.append({'index': index, 'errors': {
+                        self.bulk_lookup_field: ['Объект не найден.']}})
+                    continue
+            try:
+                data = serializer.run_validation(item)
+            except ValidationError as error:
+                errors.append({'index': index, 'errors': error.detail})
+            else:
+                valid.append((index, instance, data))
+        valid = self.check_bulk_unique(valid, unique, errors)
+        errors.sort(key=lambda error: error['index'])
+        return [(instance, data) for _, instance, data in valid], errors
+
+    def check_bulk_unique(self, valid, unique, errors):
+        """
+        Метод проверяет уникальные поля одним запросом на поле,
+        учитывая и повторы внутри самого массива.
+        """
+        model = self.get_queryset().model
+        for name, field_name in unique.items():
+            values = {data[name] for _, _, data in valid if name in data}
+            owners = dict(model.objects.filter(
+                **{f'{field_name}__in': values}).values_list(
+                    field_name, 'pk'))
+            checked = []
+            for index, instance, data in valid:
+                value = data.get(name)
+                own = getattr(instance, 'pk', None)
+                if value in owners and owners[value] != own:
+                    errors.append({'index': index, 'errors': {
+                        name: [UniqueValidator.message]}})
+                    continue
+                if value is not None:
+                    owners[value] = own if own is not None else object()
+                checked.append((index, instance, data))
+            valid = checked
+        return valid
+
+    def split_m2m(self, data):
+        model = self.get_queryset().model
+        m2m = {
+            field.name: field for field in model._meta.many_to_many
+            if field.name in data}
+        fields = {
+            name: value for name, value in data.items() if name not in m2m}
+        return fields, {m2m[name]: data[name] for name in m2m}
+
+    def perform_bulk_create(self, valid):
+        model = self.get_queryset().model
+        instances, links = [], []
+        for _, data in valid:
+            fields, m2m = self.split_m2m(data)
+            instances.append(model(**fields))
+            links.append(m2m)
+        model.objects.bulk_create(instances)
+        if instances and instances[0].pk is None:
+            read_bulk_ids(model, instances)
+        self.write_bulk_links(zip(instances, links), replace=False)
+        self.bulk_written(instances)
+        return instances
+
+    def perform_bulk_update(self, valid):
+        instances, links, names = [], [], set()
+        for instance, data in valid:
+            fields, m2m = self.split_m2m(data)
+            for name, value in fields.items():
+                setattr(instance, name, value)
+            names.update(fields)
+            instances.append(instance)
+            links.append(m2m)
+        model = self.get_queryset().model
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                names.add(field.name)
+                for instance in instances:
+                    field.pre_save(instance, add=False)
+        if names:
+            model.objects.bulk_update(instances, names)
+        self.write_bulk_links(zip(instances, links), replace=True)
+        self.bulk_written(instances)
+        return instances
+
+    def perform_bulk_destroy(self, instances):
+        self.get_queryset().model.objects.filter(
+            pk__in=[instance.pk for instance in instances]).delete()
+        return len(instances)
+
+    @staticmethod
+    def write_bulk_links(pairs, replace):
+        """
+        Метод записывает связи «многие ко многим» одним bulk_create
+        на поле без повторов; при replace старые связи объектов
+        удаляются.
+        """
+        rows, cleared = {}, {}
+        for instance, m2m in pairs:
+            for field, related in m2m.items():
+                through = field.remote_field.through
+                source = field.m2m_field_name()
+                target = field.m2m_reverse_field_name()
+                cleared.setdefault(through, (source, []))[1].append(
+                    instance.pk)
+                rows.setdefault(through, []).extend(
+                    through(**{source: instance, target: obj})
+                    for obj in dict.fromkeys(related))
+        if replace:
+            for through, (source, pks) in cleared.items():
+                through.objects.filter(**{f'{source}__in': pks}).delete()
+        for through, objects in rows.items():
+            through.objects.bulk_create(objects)
+
+    def bulk_written(self, instances):
+        """
+        Метод вызывается после массовой записи, которая не отправляет
+        сигналы сохранения, и инвалидирует ответы по модели.
+        """
+        bump_versions(self.get_queryset().model)
+
+    def serialize_bulk(self, instances):
+        loaded = self.get_queryset().in_bulk(
+            [instance.pk for instance in instances])
+        return self.get_serializer(
+            [loaded[instance.pk] for instance in instances], many=True).data
@@ -0,0 +1,20 @@
+from collections import Counter
+
+DELETED_TITLES_VERSION_NAME = 'reviews.title:deleted'
+
+stats = Counter()
+
+
+def get_reviews_version_name(title_id):
+    """Метод возвращает имя версии списка отзывов произведения."""
+    return f'reviews.review:title={title_id}'
+
+
+def get_comments_version_name(review_id):
+    """Метод возвращает имя версии списка комментариев к отзыву."""
+    return f'reviews.comment:review={review_id}'
+
+
+def get_stats():
+    """Метод возвращает счётчики попаданий и промахов кеша ответов."""
+    return dict(stats)
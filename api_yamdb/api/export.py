@@ -0,0 +1,166 @@
+import csv
+import json
+from collections import defaultdict
+from io import StringIO
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import is_naive, make_aware
+from rest_framework.exceptions import ValidationError
+from reviews.models import Comment, GenreTitle, Review, Title
+
+from .filters import TitleFilter
+
+ENTITIES = ('titles', 'reviews', 'comments', )
+CSV_FIELDS = (
+    'type', 'id', 'title_id', 'review_id', 'name', 'year', 'category',
+    'genre', 'description', 'rating', 'author', 'text', 'score',
+    'pub_date', 'updated_at', )
+TITLE_FIELDS = (
+    'id', 'name', 'year', 'category__slug', 'description', 'rating',
+    'updated_at', )
+REVIEW_FIELDS = (
+    'id', 'title_id', 'author__username', 'text', 'score', 'pub_date',
+    'updated_at', )
+COMMENT_FIELDS = (
+    'id', 'review_id', 'author__username', 'text', 'pub_date',
+    'updated_at', )
+
+
+def parse_since(value):
+    """Метод разбирает дату или дату и время из параметра since."""
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError(
+                {'since': 'Ожидается дата или дата и время в ISO 8601.'})
+        moment = parse_datetime(f'{day.isoformat()}T00:00:00')
+    if settings.USE_TZ and is_naive(moment):
+        return make_aware(moment)
+    return moment
+
+
+def parse_include(value):
+    include = tuple(
+        entity for entity in (value or ','.join(ENTITIES)).split(',')
+        if entity)
+    unknown = set(include) - set(ENTITIES)
+    if unknown:
+        raise ValidationError({'include': (
+            f'Неизвестные сущности: {", ".join(sorted(unknown))}. '
+            f'Допустимы: {", ".join(ENTITIES)}.')})
+    return include
+
+
+def get_export_titles(params):
+    """
+    Метод отбирает произведения фильтром TitleFilter по параметрам
+    category, genre, name и year.
+    """
+    filterset = TitleFilter(params, queryset=Title.objects.all())
+    if not filterset.is_valid():
+        raise ValidationError(filterset.errors)
+    return Title.objects.filter(pk__in=filterset.qs.values('pk'))
+
+
+def rename(row, **names):
+    for old, new in names.items():
+        row[new] = row.pop(old)
+    return row
+
+
+def export_titles(titles, since, chunk_size):
+    """
+    Метод выдаёт произведения пачками по первичному ключу, догружая
+    жанры одним запросом на пачку.
+    """
+    if since is not None:
+        titles = titles.filter(updated_at__gte=since)
+    titles = titles.order_by('pk').values(*TITLE_FIELDS)
+    last_pk = 0
+    while True:
+        chunk = list(titles.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return
+        genres = defaultdict(list)
+        for title_id, slug in GenreTitle.objects.filter(
+                title_id__in=[row['id'] for row in chunk],
+                genre__isnull=False).order_by(
+                    'genre__slug').values_list('title_id', 'genre__slug'):
+            genres[title_id].append(slug)
+        for row in chunk:
+            row['genre'] = genres[row['id']]
+            yield 'title', rename(row, category__slug='category')
+        last_pk = chunk[-1]['id']
+
+
+def export_posts(queryset, fields, since, chunk_size):
+    """Метод выдаёт отзывы или комментарии серверным курсором."""
+    if since is not None:
+        queryset = queryset.filter(updated_at__gte=since)
+    rows = queryset.order_by('pk').values(*fields).iterator(
+        chunk_size=chunk_size)
+    for row in rows:
+        yield rename(row, author__username='author')
+
+
+def export_records(titles, since=None, include=ENTITIES, chunk_size=None):
+    """
+    Метод выдаёт пары (тип, запись) для произведений, их отзывов
+    и комментариев, не держа в памяти больше одной пачки строк.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    if 'titles' in include:
+        yield from export_titles(titles, since, chunk_size)
+    title_ids = titles.values('pk')
+    if 'reviews' in include:
+        for row in export_posts(
+                Review.objects.filter(title__in=title_ids),
+                REVIEW_FIELDS, since, chunk_size):
+            yield 'review', row
+    if 'comments' in include:
+        for row in export_posts(
+                Comment.objects.filter(review__title__in=title_ids),
+                COMMENT_FIELDS, since, chunk_size):
+            yield 'comment', row
+
+
+def render_ndjson(records):
+    """Метод выдаёт записи строками JSON, по одной на строку."""
+    for kind, row in records:
+        yield json.dumps(
+            {'type': kind, **row}, cls=DjangoJSONEncoder,
+            ensure_ascii=False) + '\n'
+
+
+def render_csv(records):
+    """Метод выдаёт записи строками CSV с общим набором колонок."""
+    buffer = StringIO()
+    writer = csv.DictWriter(buffer, CSV_FIELDS)
+    writer.writeheader()
+    for kind, row in records:
+        if 'genre' in row:
+            row['genre'] = ','.join(row['genre'])
+        writer.writerow({'type': kind, **row})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+OUTPUTS = {
+    'ndjson': ('application/x-ndjson', render_ndjson),
+    'csv': ('text/csv', render_csv),
+}
+
+
+def get_output(name):
+    """Метод возвращает тип содержимого и функцию вывода для формата."""
+    if name not in OUTPUTS:
+        raise ValidationError({'output': (
+            f'Допустимые форматы: {", ".join(OUTPUTS)}.')})
+    return OUTPUTS[name]
@@ -0,0 +1,274 @@
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from reviews.models import Category, Genre, GenreTitle, Title
+from reviews.versions import get_versions
+
+from .cache import DELETED_TITLES_VERSION_NAME
+
+FACETS = ('category', 'genre', 'year', )
+FACET_LOOKUPS = {'category': 'category_id__in', 'year': 'year__in'}
+
+
+def make_bits(pks):
+    """Метод собирает битовое множество из идентификаторов за один проход."""
+    if not pks:
+        return 0
+    buffer = bytearray(max(pks) // 8 + 1)
+    for pk in pks:
+        buffer[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def count_bits(bits):
+    return bin(bits).count('1')
+
+
+def iterate_bits(bits):
+    """Метод возвращает номера установленных битов по возрастанию."""
+    return [
+        pk for pk, bit in enumerate(reversed(bin(bits)[2:])) if bit == '1']
+
+
+def get_values(record):
+    """Метод возвращает пары (фасет, значение) записи произведения."""
+    category_id, year, genre_ids = record
+    return (
+        ('category', category_id), ('year', year),
+        *(('genre', genre_id) for genre_id in genre_ids))
+
+
+def read_records(queryset):
+    """
+    Метод читает категорию, год и жанры произведений одним запросом
+    с присоединением связей с жанрами.
+    """
+    titles, genres = {}, defaultdict(set)
+    for pk, category_id, year, genre_id in queryset.using(
+            DEFAULT_DB_ALIAS).values_list(
+            'pk', 'category_id', 'year', 'genre').order_by().iterator():
+        titles[pk] = (category_id, year)
+        if genre_id is not None:
+            genres[pk].add(genre_id)
+    return {
+        pk: (category_id, year, frozenset(genres[pk]))
+        for pk, (category_id, year) in titles.items()}
+
+
+def get_selection(data):
+    """
+    Метод собирает выбор {фасет: значения} из очищенных данных
+    TitleFilter, пропуская незаполненные фасеты.
+    """
+    selection = {
+        facet: [item.pk for item in data[facet]]
+        for facet in ('category', 'genre') if data.get(facet)}
+    if data.get('year') is not None:
+        selection['year'] = [data['year']]
+    return selection
+
+
+def filter_facets(queryset, selection):
+    """
+    Метод отбирает произведения по выбору фасетов средствами базы данных.
+    Жанры проверяются подзапросом, поэтому строки не размножаются
+    и DISTINCT не нужен.
+    """
+    if 'genre' in selection:
+        queryset = queryset.filter(pk__in=GenreTitle.objects.filter(
+            genre_id__in=selection['genre']).values('title_id'))
+    return queryset.filter(**{
+        FACET_LOOKUPS[facet]: values
+        for facet, values in selection.items() if facet in FACET_LOOKUPS})
+
+
+class FacetState:
+    """
+    Класс снимка индекса фасетов: для каждого значения категории,
+    жанра и года хранится битовое множество, в котором бит с номером
+    pk отмечает произведение.
+    """
+
+    def __init__(self, titles=None):
+        self.titles = titles or {}
+        members = {facet: defaultdict(list) for facet in FACETS}
+        for pk, record in self.titles.items():
+            for facet, value in get_values(record):
+                members[facet][value].append(pk)
+        self.bits = {
+            facet: {value: make_bits(pks) for value, pks in values.items()}
+            for facet, values in members.items()}
+        self.everything = make_bits(list(self.titles))
+
+    def copy(self):
+        state = FacetState()
+        state.titles = dict(self.titles)
+        state.bits = {
+            facet: dict(values) for facet, values in self.bits.items()}
+        state.everything = self.everything
+        return state
+
+    def set_bits(self, pk, record, enabled):
+        bit = 1 << pk
+        for facet, value in get_values(record):
+            bits = self.bits[facet].get(value, 0)
+            self.bits[facet][value] = bits | bit if enabled else bits & ~bit
+        if enabled:
+            self.everything |= bit
+        else:
+            self.everything &= ~bit
+
+    def put(self, pk, record):
+        """Метод заменяет запись произведения и его биты во всех фасетах."""
+        stored = self.titles.get(pk)
+        if stored == record:
+            return
+        if stored is not None:
+            self.set_bits(pk, stored, False)
+        self.titles[pk] = record
+        self.set_bits(pk, record, True)
+
+    def select(self, selection, exclude=None):
+        """
+        Метод возвращает битовое множество произведений, подходящих
+        под выбор: значения одного фасета объединяются, разные фасеты
+        пересекаются. Фасет exclude не учитывается.
+        """
+        result = self.everything
+        for facet, values in selection.items():
+            if facet != exclude:
+                result &= reduce(or_, (
+                    self.bits[facet].get(value, 0) for value in values), 0)
+        return result
+
+    def count(self, selection, restrict=None):
+        """
+        Метод возвращает число подходящих произведений и для каждого
+        фасета словарь {значение: число произведений}. Выбор в самом
+        фасете не учитывается, чтобы были видны соседние значения;
+        restrict дополнительно сужает множество, например по названию.
+        """
+        total = self.select(selection)
+        if restrict is not None:
+            total &= restrict
+        counts = {}
+        for facet in FACETS:
+            base = self.select(selection, exclude=facet)
+            if restrict is not None:
+                base &= restrict
+            counts[facet] = {
+                value: count_bits(bits & base)
+                for value, bits in self.bits[facet].items()
+                if value is not None and bits & base}
+        return count_bits(total), counts
+
+
+class FacetIndex:
+    """
+    Класс битового индекса фасетов произведений в памяти процесса.
+
+    При смене версии произведений дочитываются только произведения,
+    изменённые после прошлого обновления (с запасом
+    FACET_REFRESH_OVERLAP секунд на долгие транзакции). Смена категорий,
+    жанров, связей с жанрами или удаление произведений перестраивает
+    индекс целиком. Индекс читается с ведущей базы, чтобы отставание
+    реплики не закрепилось в нём до следующей смены версии. Версии
+    увеличиваются ещё раз после фиксации записи, поэтому снимок,
+    построенный до фиксации, перестраивается следующим запросом.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.versions = None
+        self.refreshed_at = None
+        self.state = FacetState()
+
+    def update(self, state, since):
+        """Метод переносит в копию снимка недавно изменённые произведения."""
+        records = read_records(Title.objects.filter(
+            updated_at__gte=since - timedelta(
+                seconds=settings.FACET_REFRESH_OVERLAP)))
+        if all(state.titles.get(pk) == record
+               for pk, record in records.items()):
+            return state
+        state = state.copy()
+        for pk, record in records.items():
+            state.put(pk, record)
+        return state
+
+    def refresh(self):
+        """
+        Метод возвращает актуальный снимок. Снимок строится без
+        блокировки, чтобы полная перестройка не задерживала остальные
+        запросы процесса; под блокировкой только подменяется ссылка,
+        если за это время другой поток не сохранил снимок новее.
+        """
+        versions = get_versions(
+            Title, Category, Genre, GenreTitle, DELETED_TITLES_VERSION_NAME)
+        with self.lock:
+            if versions == self.versions:
+                return self.state
+            current, refreshed_at, state = (
+                self.versions, self.refreshed_at, self.state)
+        started_at = timezone.now()
+        if current is None or versions[1:] != current[1:]:
+            state = FacetState(read_records(Title.objects.all()))
+        else:
+            state = self.update(state, refreshed_at)
+        with self.lock:
+            if self.refreshed_at is None or self.refreshed_at <= started_at:
+                self.versions, self.refreshed_at = versions, started_at
+                self.state = state
+            return self.state
+
+    def get_ids(self, selection, limit=None):
+        """
+        Метод возвращает идентификаторы произведений, подходящих под
+        выбор, или None, если их больше limit.
+        """
+        bits = self.refresh().select(selection)
+        if limit is not None and count_bits(bits) > limit:
+            return None
+        return iterate_bits(bits)
+
+    def count(self, selection, ids=None):
+        """
+        Метод считает произведения по значениям всех фасетов за один
+        проход по снимку; ids ограничивает подсчёт этими произведениями.
+        """
+        restrict = None if ids is None else make_bits(list(ids))
+        return self.refresh().count(selection, restrict)
+
+
+title_facets = FacetIndex()
+
+
+def get_facet_counts(filterset):
+    """
+    Метод возвращает число произведений, подходящих под параметры
+    TitleFilter, и их распределение по категориям, жанрам и годам.
+    Фильтр по названию проверяет база данных.
+    """
+    data = filterset.form.cleaned_data
+    ids = None
+    if data.get('name'):
+        ids = filterset.filters['name'].filter(
+            Title.objects.all(), data['name']).values_list('pk', flat=True)
+    total, counts = title_facets.count(get_selection(data), ids)
+    result = {'count': total}
+    for facet, model in (('category', Category), ('genre', Genre)):
+        result[facet] = sorted((
+            {'slug': slug, 'name': name, 'count': counts[facet][pk]}
+            for pk, slug, name in model.objects.filter(
+                pk__in=list(counts[facet])).values_list('pk', 'slug', 'name')
+        ), key=lambda item: (-item['count'], item['slug']))
+    result['year'] = [
+        {'year': year, 'count': count}
+        for year, count in sorted(counts['year'].items(), reverse=True)]
+    return result
@@ -0,0 +1,143 @@
+from operator import attrgetter
+from time import perf_counter
+
+from django.db import models
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+
+def get_datetime_converter(field):
+    """
+    Метод возвращает преобразование даты в строку ISO 8601 так же,
+    как DateTimeField: в текущем часовом поясе и с Z вместо +00:00.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+
+    def convert(value):
+        value = field.enforce_timezone(value).isoformat()
+        if value.endswith('+00:00'):
+            return value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def get_converter(field):
+    """
+    Метод возвращает функцию преобразования значения поля. Для полей
+    без быстрого преобразования используется to_representation поля.
+    """
+    if isinstance(field, serializers.ListSerializer):
+        return get_many_converter(compile_serializer(field.child))
+    if isinstance(field, serializers.Serializer):
+        return compile_serializer(field)
+    if isinstance(field, serializers.ManyRelatedField):
+        return get_many_converter(get_converter(field.child_relation))
+    if isinstance(field, serializers.SlugRelatedField):
+        return attrgetter(field.slug_field)
+    if isinstance(field, serializers.DateTimeField):
+        return get_datetime_converter(field)
+    if type(field) is serializers.ReadOnlyField:
+        return None
+    if type(field) is serializers.IntegerField:
+        return int
+    if type(field) is serializers.CharField:
+        return str
+    return field.to_representation
+
+
+def get_many_converter(convert):
+    def convert_many(value):
+        if isinstance(value, models.Manager):
+            value = value.all()
+        return [convert(item) for item in value]
+    return convert_many
+
+
+def get_accessor(field):
+    """
+    Метод возвращает функцию чтения значения поля из объекта.
+    Составные источники читаются методом get_attribute поля.
+    """
+    if field.source == '*' or len(field.source_attrs) != 1:
+        return field.get_attribute
+    return attrgetter(field.source)
+
+
+class CompiledField:
+    """
+    Класс скомпилированного поля: читает значение из объекта
+    и преобразует его так же, как поле DRF из атрибута field.
+    """
+    __slots__ = ('field', 'get', 'convert')
+
+    def __init__(self, field):
+        self.field = field
+        self.get = get_accessor(field)
+        self.convert = get_converter(field)
+
+    def __call__(self, instance):
+        value = self.get(instance)
+        if value is None or self.convert is None:
+            return value
+        return self.convert(value)
+
+
+def compile_serializer(serializer):
+    """
+    Метод компилирует сериализатор в функцию, которая строит словарь
+    ответа из объекта модели. Поля читаются заранее подготовленными
+    функциями, поэтому результат совпадает с serializer.data, но
+    не проходит через to_representation каждого поля.
+    """
+    accessors = [
+        (field.field_name, CompiledField(field))
+        for field in serializer._readable_fields]
+
+    def represent(instance):
+        return {name: get(instance) for name, get in accessors}
+    return represent
+
+
+class FastRepresentation:
+    """
+    Класс представления объектов для ответа на чтение. Заменяет
+    serializer.data результатом скомпилированного сериализатора.
+    """
+
+    def __init__(self, serializer):
+        self.serializer = serializer
+
+    @property
+    def data(self):
+        serializer = self.serializer
+        if isinstance(serializer, serializers.ListSerializer):
+            represent = compile_serializer(serializer.child)
+            return [represent(item) for item in serializer.instance]
+        return compile_serializer(serializer)(serializer.instance)
+
+
+def measure_throughput(represent, instances, repeat):
+    """Метод возвращает число объектов, обработанных за секунду."""
+    started = perf_counter()
+    for _ in range(repeat):
+        represent(instances)
+    return len(instances) * repeat / (perf_counter() - started)
+
+
+def compare_serialization(serializer, repeat=20):
+    """
+    Метод сравнивает пропускную способность сериализатора DRF
+    и скомпилированного представления на тех же объектах списка.
+    """
+    instances = list(serializer.instance)
+    child = serializer.child
+    represent = compile_serializer(child)
+    fast = measure_throughput(
+        lambda items: [represent(item) for item in items], instances, repeat)
+    drf = measure_throughput(
+        lambda items: [child.to_representation(item) for item in items],
+        instances, repeat)
+    return {'objects': len(instances), 'drf': round(drf),
+            'fast': round(fast), 'speedup': round(fast / drf, 2)}
@@ -1,6 +1,12 @@
+from django.conf import settings
+from django.db.models import F
 from django_filters.rest_framework import (CharFilter, FilterSet,
                                            ModelMultipleChoiceFilter)
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
 from reviews.models import Category, Genre, Title
+from reviews.search import search_titles
+
+from .facets import filter_facets, get_selection, title_facets
 
 
 class TitleFilter(FilterSet):
@@ -16,3 +22,56 @@ class TitleFilter(FilterSet):
     class Meta:
         model = Title
         fields = ('category', 'genre', 'name', 'year', )
+
+    def filter_queryset(self, queryset):
+        """
+        Метод отбирает произведения по категориям, жанрам и году через
+        индекс фасетов: до FACET_ID_LIMIT совпадений передаются в запрос
+        списком идентификаторов, иначе условия проверяет база данных.
+        """
+        data = self.form.cleaned_data
+        selection = get_selection(data)
+        if selection:
+            ids = title_facets.get_ids(
+                selection, limit=settings.FACET_ID_LIMIT)
+            if ids is None:
+                queryset = filter_facets(queryset, selection)
+            else:
+                queryset = queryset.filter(pk__in=ids)
+        return self.filters['name'].filter(queryset, data.get('name'))
+
+
+class TitleSearchFilter(BaseFilterBackend):
+    """
+    Класс полнотекстового поиска произведений по названию и описанию.
+    Без параметра ordering результаты сортируются по релевантности.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        return search_titles(
+            queryset, request.query_params.get(self.search_param, ''),
+            ranked='ordering' not in request.query_params)
+
+
+class NullsLastOrderingFilter(OrderingFilter):
+    """
+    Класс сортировки, который ставит пустые значения nullable_fields
+    в конец в обоих направлениях, чтобы порядок не зависел от СУБД.
+    """
+    nullable_fields = ('rating', )
+
+    def get_expression(self, name):
+        field = name.lstrip('-')
+        if field not in self.nullable_fields:
+            return name
+        if name.startswith('-'):
+            return F(field).desc(nulls_last=True)
+        return F(field).asc(nulls_last=True)
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
+        return queryset.order_by(*(
+            self.get_expression(name) for name in ordering))
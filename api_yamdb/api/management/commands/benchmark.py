@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...benchmark import (SCALE_OPTIONS, add_scale_arguments, compare,
+                          get_meta, run_admin_benchmark, run_benchmark,
+                          run_serialization, seed_catalog, temporary_database)
+
+
+class Command(BaseCommand):
+    """Команда измерения производительности API на сгенерированных данных."""
+    help = (
+        'Создаёт тестовую базу, детерминированно заполняет её каталогом '
+        'заданного размера и измеряет задержку, пропускную способность '
+        'и число SQL-запросов каждого адреса API. Результаты выводятся '
+        'в JSON и сравниваются с базовым файлом.')
+
+    def add_arguments(self, parser):
+        add_scale_arguments(parser)
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Число измеряемых запросов к каждому адресу.')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--output', help='Файл для результатов; по умолчанию stdout.')
+        parser.add_argument(
+            '--baseline', help='Файл базовых результатов для сравнения.')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Допустимый рост медианы задержки, доля от базовой.')
+
+    def handle(self, *args, **options):
+        scale = {name: options[name] for name in SCALE_OPTIONS}
+        with temporary_database(options['keepdb']):
+            seed_catalog(**scale)
+            results = {
+                'meta': get_meta(**scale),
+                'endpoints': {
+                    **run_benchmark(options['repeat'], options['warmup']),
+                    **run_admin_benchmark(
+                        options['repeat'], options['warmup'])},
+                'serialization': run_serialization(options['repeat'])}
+        report = json.dumps(results, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report + '\n')
+        else:
+            self.stdout.write(report)
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+            regressions = compare(results, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError(
+                    'Регрессии производительности:\n' + '\n'.join(
+                        regressions))
@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...benchmark import (SCALE_OPTIONS, add_scale_arguments, get_meta,
+                          seed_catalog, temporary_database)
+from ...plans import capture_plans, compare_plans
+
+
+class Command(BaseCommand):
+    """Команда проверки планов SQL-запросов API."""
+    help = (
+        'Создаёт тестовую базу, заполняет её каталогом заданного размера '
+        'и снимает EXPLAIN всех SELECT, которые выполняют адреса API. '
+        'Завершается с ошибкой, если таблица читается целиком без '
+        'индекса или план отличается от базового файла.')
+
+    def add_arguments(self, parser):
+        add_scale_arguments(parser)
+        parser.add_argument(
+            '--output', help='Файл для планов; по умолчанию stdout.')
+        parser.add_argument(
+            '--baseline', help='Файл базовых планов для сравнения.')
+
+    def handle(self, *args, **options):
+        scale = {name: options[name] for name in SCALE_OPTIONS}
+        with temporary_database(options['keepdb']):
+            seed_catalog(**scale)
+            results = {
+                'meta': get_meta(**scale), 'endpoints': capture_plans()}
+        report = json.dumps(results, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report + '\n')
+        else:
+            self.stdout.write(report)
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+        problems = compare_plans(results, baseline)
+        if problems:
+            raise CommandError(
+                'Проблемы планов запросов:\n' + '\n'.join(problems))
@@ -0,0 +1,60 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+from rest_framework.exceptions import ValidationError
+
+from ...export import (ENTITIES, OUTPUTS, export_records, get_export_titles,
+                       get_output, parse_include, parse_since)
+
+
+class Command(BaseCommand):
+    """Команда потоковой выгрузки каталога с отзывами и комментариями."""
+    help = (
+        'Выгружает произведения, отзывы и комментарии в NDJSON или CSV, '
+        'читая базу пачками, так что память не растёт с размером таблиц.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', choices=tuple(OUTPUTS), default='ndjson',
+            help='Формат выгрузки.')
+        parser.add_argument(
+            '--file', help='Файл для записи; по умолчанию stdout.')
+        parser.add_argument(
+            '--since',
+            help='Выгружать только изменённое начиная с даты ISO 8601.')
+        parser.add_argument(
+            '--include', default=','.join(ENTITIES),
+            help='Сущности через запятую: titles, reviews, comments.')
+        parser.add_argument(
+            '--category', action='append', default=[],
+            help='Слаг категории; можно указать несколько раз.')
+        parser.add_argument(
+            '--genre', action='append', default=[],
+            help='Слаг жанра; можно указать несколько раз.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Число строк, читаемых из базы за раз.')
+
+    def handle(self, *args, **options):
+        params = QueryDict(mutable=True)
+        params.setlist('category', options['category'])
+        params.setlist('genre', options['genre'])
+        try:
+            _, render = get_output(options['output'])
+            records = export_records(
+                get_export_titles(params),
+                since=parse_since(options['since']),
+                include=parse_include(options['include']),
+                chunk_size=options['chunk_size'])
+        except ValidationError as error:
+            raise CommandError(error.detail)
+        stream = (
+            open(options['file'], 'w', encoding='utf-8', newline='')
+            if options['file'] else sys.stdout)
+        try:
+            for chunk in render(records):
+                stream.write(chunk)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
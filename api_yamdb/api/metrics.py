@@ -0,0 +1,257 @@
+import hmac
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from ipaddress import ip_address, ip_network
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, )
+SIZE_BUCKETS = (
+    256, 1024, 4096, 16384, 65536, 262144, 1048576, )
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, )
+METRICS = {
+    'yamdb_http_request_duration_seconds': (
+        'histogram', 'Время обработки запроса.',
+        ('view', 'method', 'status'), LATENCY_BUCKETS),
+    'yamdb_http_response_size_bytes': (
+        'histogram', 'Размер тела ответа.', ('view', ), SIZE_BUCKETS),
+    'yamdb_db_queries_per_request': (
+        'histogram', 'Число SQL-запросов за один запрос.', ('view', ),
+        QUERY_BUCKETS),
+    'yamdb_db_queries_total': (
+        'counter', 'Число SQL-запросов.', ('view', ), None),
+    'yamdb_db_duration_seconds_total': (
+        'counter', 'Время выполнения SQL-запросов.', ('view', ), None),
+}
+
+
+def get_view_name(view_func, method):
+    """
+    Метод возвращает имя контроллера для меток: «Класс.действие»
+    для наборов DRF, имя функции для остальных контроллеров.
+    """
+    cls = getattr(view_func, 'cls', None)
+    actions = getattr(view_func, 'actions', None)
+    if cls is not None and actions:
+        return f'{cls.__name__}.{actions.get(method.lower(), "unknown")}'
+    return getattr(view_func, '__name__', 'unknown')
+
+
+class Registry:
+    """
+    Класс хранилища метрик процесса.
+
+    Значения копятся в памяти под одной блокировкой. Если задан
+    METRICS_DIR, процесс не реже раза в METRICS_FLUSH_INTERVAL секунд
+    сохраняет снимок в файл с номером процесса, а вывод метрик
+    складывает снимки всех рабочих процессов gunicorn.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {name: {} for name in METRICS}
+        self.flushed = 0
+
+    def observe(self, name, labels, value):
+        _, _, _, buckets = METRICS[name]
+        with self.lock:
+            series = self.values[name].get(labels)
+            if series is None:
+                series = self.values[name][labels] = [0] * (len(buckets) + 3)
+            series[bisect_left(buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def inc(self, name, labels, value=1):
+        with self.lock:
+            series = self.values[name]
+            series[labels] = series.get(labels, 0) + value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: [[list(labels), value if not isinstance(value, list)
+                        else list(value)]
+                       for labels, value in series.items()]
+                for name, series in self.values.items()}
+
+    def get_path(self):
+        return os.path.join(
+            settings.METRICS_DIR, f'metrics-{os.getpid()}.json')
+
+    def flush(self, force=False):
+        """Метод сохраняет снимок процесса, если подошло время."""
+        if not settings.METRICS_DIR:
+            return
+        now = time.monotonic()
+        if not force and now - self.flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self.flushed = now
+        path = self.get_path()
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(f'{path}.tmp', path)
+
+    def read_snapshots(self):
+        """Метод читает сохранённые снимки остальных процессов."""
+        if not settings.METRICS_DIR or not os.path.isdir(
+                settings.METRICS_DIR):
+            return []
+        own = os.path.basename(self.get_path())
+        snapshots = []
+        for name in os.listdir(settings.METRICS_DIR):
+            if not name.endswith('.json') or name == own:
+                continue
+            try:
+                with open(os.path.join(settings.METRICS_DIR, name)) as file:
+                    snapshots.append(json.load(file))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def collect(self):
+        """
+        Метод складывает снимки всех процессов; для текущего
+        процесса берутся значения из памяти.
+        """
+        merged = {name: {} for name in METRICS}
+        for snapshot in [self.snapshot(), *self.read_snapshots()]:
+            for name, series in snapshot.items():
+                for labels, value in series:
+                    merge_value(merged.get(name, {}), tuple(labels), value)
+        return merged
+
+
+def merge_value(series, labels, value):
+    current = series.get(labels)
+    if current is None:
+        series[labels] = value
+    elif isinstance(value, list):
+        series[labels] = [left + right for left, right in zip(current, value)]
+    else:
+        series[labels] = current + value
+
+
+registry = Registry()
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    return '{' + ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace(
+            '"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs) + '}'
+
+
+def render(merged):
+    """Метод выводит метрики в текстовом формате Prometheus."""
+    lines = []
+    for name, (kind, help_text, label_names, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(merged[name].items()):
+            if kind == 'counter':
+                lines.append(
+                    f'{name}{format_labels(label_names, labels)} {value}')
+                continue
+            total = 0
+            for bound, count in zip(buckets + ('+Inf', ), value):
+                total += count
+                lines.append('{}_bucket{} {}'.format(
+                    name, format_labels(
+                        label_names, labels, (('le', bound), )), total))
+            lines.append(
+                f'{name}_sum{format_labels(label_names, labels)} {value[-2]}')
+            lines.append(
+                f'{name}_count{format_labels(label_names, labels)} '
+                f'{value[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+def is_scraper(request):
+    """
+    Метод пропускает сборщик метрик: запрос из сетей
+    METRICS_ALLOWED_NETWORKS или с токеном METRICS_TOKEN в заголовке
+    Authorization: Bearer.
+    """
+    if settings.METRICS_TOKEN and hmac.compare_digest(
+            request.META.get('HTTP_AUTHORIZATION', ''),
+            f'Bearer {settings.METRICS_TOKEN}'):
+        return True
+    try:
+        address = ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ip_network(network)
+        for network in settings.METRICS_ALLOWED_NETWORKS)
+
+
+def metrics(request):
+    """Контроллер вывода метрик для Prometheus."""
+    if not is_scraper(request):
+        return HttpResponseForbidden()
+    registry.flush(force=True)
+    return HttpResponse(render(registry.collect()), content_type=CONTENT_TYPE)
+
+
+class QueryTimer:
+    """Класс обёртки выполнения SQL, считающий запросы и их время."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """
+    Класс промежуточного слоя, записывающий время ответа, его размер,
+    число SQL-запросов и их суммарное время с меткой контроллера.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path == settings.METRICS_PATH:
+            return self.get_response(request)
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        view = getattr(request, 'metrics_view', 'unmatched')
+        registry.observe(
+            'yamdb_http_request_duration_seconds',
+            (view, request.method, str(response.status_code)), elapsed)
+        if not response.streaming:
+            registry.observe(
+                'yamdb_http_response_size_bytes', (view, ),
+                len(response.content))
+        registry.observe('yamdb_db_queries_per_request', (view, ), timer.count)
+        registry.inc('yamdb_db_queries_total', (view, ), timer.count)
+        registry.inc(
+            'yamdb_db_duration_seconds_total', (view, ), timer.duration)
+        registry.flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = get_view_name(view_func, request.method)
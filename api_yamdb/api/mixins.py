@@ -0,0 +1,321 @@
+from calendar import timegm
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from reviews.versions import get_versions
+
+from . import replicas
+from .cache import stats
+from .fast import FastRepresentation
+
+RESPONSE_KEY = 'response:{}:{}:{}:{}'
+
+
+def make_etag(*parts):
+    """Метод собирает сильный ETag из значений, определяющих ответ."""
+    return quote_etag(md5('|'.join(
+        str(part) for part in parts).encode()).hexdigest())
+
+
+def get_timestamp(value):
+    """Метод переводит дату в секунды эпохи для заголовков HTTP."""
+    if value is None:
+        return None
+    return timegm(value.utctimetuple())
+
+
+def get_query_string(request):
+    """Метод возвращает параметры запроса в каноническом порядке."""
+    return urlencode(sorted(
+        (key, value) for key, values in request.query_params.lists()
+        for value in values))
+
+
+class EagerLoadingMixin:
+    """
+    Миксин контроллера, подгружающий связи, которые сериализатор
+    объявляет в атрибутах Meta.select_related и Meta.prefetch_related.
+    """
+
+    def get_loaded_fields(self):
+        """Метод возвращает поля ответа или None, если нужны все."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        meta = getattr(self.get_serializer_class(), 'Meta', None)
+        fields = self.get_loaded_fields()
+        select_related, prefetch_related = (
+            [name for name in getattr(meta, option, ())
+             if fields is None or name.split('__')[0] in fields]
+            for option in ('select_related', 'prefetch_related'))
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        return queryset.prefetch_related(*prefetch_related)
+
+
+def parse_names(params, name, available):
+    """
+    Метод разбирает параметр со списком имён через запятую и проверяет,
+    что все имена допустимы. Без параметра возвращает None.
+    """
+    if name not in params:
+        return None
+    names = [item.strip() for item in params[name].split(',')
+             if item.strip()]
+    unknown = set(names) - set(available)
+    if unknown:
+        raise ValidationError({name: [
+            f'Неизвестные поля: {", ".join(sorted(unknown))}.']})
+    return names
+
+
+class SparseFieldsMixin(EagerLoadingMixin):
+    """
+    Миксин выборочных полей для получения списка и объекта.
+
+    Параметр fields оставляет в ответе перечисленные поля, expand —
+    разворачивает перечисленные связи из Meta.expandable сериализатора,
+    остальные связи отдаются слагами. Связи, которых нет в ответе,
+    не загружаются, а поля из Meta.deferrable не читаются из базы.
+    """
+
+    def get_sparse_fields(self):
+        """Метод возвращает пару (fields, expand) из параметров запроса."""
+        if self.action not in ('list', 'retrieve'):
+            return None, None
+        if not hasattr(self, '_sparse_fields'):
+            meta = self.get_serializer_class().Meta
+            params = self.request.query_params
+            self._sparse_fields = (
+                parse_names(params, 'fields', meta.fields),
+                parse_names(
+                    params, 'expand', getattr(meta, 'expandable', {})))
+        return self._sparse_fields
+
+    def get_loaded_fields(self):
+        fields, _ = self.get_sparse_fields()
+        return fields
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_loaded_fields()
+        if fields is None:
+            return queryset
+        meta = self.get_serializer_class().Meta
+        deferred = [
+            name for name in getattr(meta, 'deferrable', ())
+            if name not in fields]
+        return queryset.defer(*deferred) if deferred else queryset
+
+    def get_serializer_context(self):
+        fields, expand = self.get_sparse_fields()
+        return {
+            **super().get_serializer_context(),
+            'fields': fields, 'expand': expand}
+
+
+class FastReadMixin:
+    """
+    Миксин быстрого чтения.
+
+    При FAST_SERIALIZATION ответы в JSON на получение списка и объекта
+    строятся скомпилированным сериализатором: результат совпадает
+    с ответом DRF, но поля не проходят через to_representation.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        if (settings.FAST_SERIALIZATION and args
+                and self.action in ('list', 'retrieve')
+                and getattr(renderer, 'format', None) == 'json'):
+            return FastRepresentation(serializer)
+        return serializer
+
+
+class ReplicaReadMixin:
+    """
+    Миксин чтения с реплик.
+
+    Безопасные запросы читают с реплики, если пользователь не менял
+    данные последние REPLICA_STICKY_SECONDS секунд. При ошибке реплики
+    она исключается из выбора, а запрос повторяется на ведущей базе.
+    """
+    replica_fallback = False
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not self.replica_fallback and (
+                not replicas.is_pinned(request.user)):
+            replicas.use_replica()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            replicas.pin(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except DatabaseError:
+            alias = replicas.release()
+            if alias is None or alias == DEFAULT_DB_ALIAS:
+                raise
+            replicas.mark_unavailable(alias)
+            self.replica_fallback = True
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            replicas.release()
+
+
+class ResponseCacheMixin:
+    """
+    Базовый миксин кеширования ответов контроллера.
+
+    Ключ включает адрес, параметры запроса и версии моделей из
+    cache_models, поэтому запись моделей инвалидирует ответы без
+    перебора ключей. Ответ, прочитанный с реплики, не кешируется:
+    отстающая реплика могла ещё не получить запись, увеличившую версию.
+    """
+    cache_models = ()
+
+    def get_response_cache_key(self, request):
+        url = (f'{request.build_absolute_uri(request.path)}'
+               f'?{get_query_string(request)}')
+        versions = '.'.join(
+            str(version) for version in get_versions(*self.cache_models))
+        return RESPONSE_KEY.format(
+            self.basename, self.action, md5(url.encode()).hexdigest(),
+            versions)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            stats[f'{self.basename}.{self.action}.hit'] += 1
+            return Response(data, headers={'X-Cache': 'HIT'})
+        stats[f'{self.basename}.{self.action}.miss'] += 1
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200 and not replicas.reads_replica():
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class CachedListMixin(ResponseCacheMixin):
+    """Миксин кеширования ответов на получение списка объектов."""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(ResponseCacheMixin):
+    """Миксин кеширования ответов на получение объекта."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+
+class ConditionalRequestMixin:
+    """
+    Миксин условных запросов.
+
+    ETag списка строится по счётчикам версий из get_list_versions,
+    ETag объекта — по его полю updated_at и версиям моделей из
+    etag_models, поэтому валидаторы считаются без сериализации.
+    Неизменившийся ресурс отдаётся ответом 304, а изменение и удаление
+    с устаревшим If-Match отклоняются с 412. Ответ, прочитанный
+    с реплики, отдаётся без валидаторов, потому что версии могут
+    опережать прочитанные данные.
+    """
+    etag_models = ()
+
+    def get_list_versions(self):
+        """Метод возвращает модели и имена версий для ETag списка."""
+        return (self.queryset.model, ) + tuple(self.etag_models)
+
+    def get_validator_queryset(self):
+        """Метод возвращает объекты, по которым считаются валидаторы."""
+        return self.get_queryset()
+
+    def get_validators(self, lock=False):
+        """
+        Метод возвращает пару (etag, last_modified) для действия.
+        ETag зависит от параметров запроса: fields и expand меняют
+        представление. При lock строка объекта блокируется до конца
+        транзакции.
+        """
+        if self.action == 'list':
+            return make_etag(
+                get_query_string(self.request),
+                *get_versions(*self.get_list_versions())), None
+        pk = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        queryset = self.get_validator_queryset().filter(pk=pk).order_by()
+        if lock:
+            queryset = queryset.select_for_update(of=('self', ))
+        updated_at = next(iter(
+            queryset.values_list('updated_at', flat=True)[:1]), None)
+        if updated_at is None:
+            return None, None
+        return make_etag(
+            pk, updated_at.isoformat(), get_query_string(self.request),
+            *get_versions(*self.etag_models)), updated_at
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return self.respond_conditionally(
+                handler, request, *args, **kwargs)
+        with transaction.atomic():
+            return self.respond_conditionally(
+                handler, request, *args, **kwargs)
+
+    def respond_conditionally(self, handler, request, *args, **kwargs):
+        """
+        Метод проверяет валидаторы и выполняет действие. Изменение
+        и удаление идут в транзакции, а строка объекта блокируется
+        при чтении валидаторов, поэтому два запроса с одним If-Match
+        не могут оба пройти проверку.
+        """
+        unsafe = request.method not in SAFE_METHODS
+        etag, last_modified = self.get_validators(lock=unsafe)
+        if etag is not None:
+            response = get_conditional_response(
+                request, etag=etag,
+                last_modified=get_timestamp(last_modified))
+            if response is not None:
+                return response
+        response = handler(request, *args, **kwargs)
+        if unsafe:
+            etag, last_modified = self.get_validators()
+        if (response.status_code == 200 and etag is not None
+                and not replicas.reads_replica()):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(
+                    get_timestamp(last_modified))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().update, request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().destroy, request, *args, **kwargs)
@@ -0,0 +1,206 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import date
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from reviews.pagination import estimate_count
+
+from . import replicas
+
+FALSE_VALUES = ('0', 'false', 'no', 'off', )
+
+
+class CachedCountPagination(LimitOffsetPagination):
+    """
+    Класс пагинации limit/offset с дешёвым подсчётом общего числа объектов.
+
+    Число объектов кешируется на PAGINATION_COUNT_CACHE_TIMEOUT секунд
+    для каждой пары «адрес — набор фильтров». Если планировщик оценивает
+    выборку больше чем в PAGINATION_COUNT_ESTIMATE_THRESHOLD строк,
+    вместо COUNT(*) отдаётся оценка. Число, прочитанное с реплики,
+    не кешируется. Параметр count=false убирает подсчёт из ответа совсем.
+    """
+    count_query_param = 'count'
+    count_cache_prefix = 'pagination-count'
+    ignored_query_params = ('limit', 'offset', 'cursor', 'count', )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.with_count = request.query_params.get(
+            self.count_query_param, '').lower() not in FALSE_VALUES
+        if self.with_count:
+            return super().paginate_queryset(queryset, request, view)
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.count = None
+        results = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(results) > self.limit
+        return results[:self.limit]
+
+    def get_paginated_response(self, data):
+        if self.with_count:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_next_link(self):
+        if self.with_count:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = replace_query_param(
+            self.request.build_absolute_uri(),
+            self.limit_query_param, self.limit)
+        return replace_query_param(
+            url, self.offset_query_param, self.offset + self.limit)
+
+    def get_count(self, queryset):
+        key = self.get_count_cache_key()
+        count = cache.get(key)
+        if count is None:
+            count = estimate_count(queryset)
+            if count is None or (
+                    count < settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD):
+                count = super().get_count(queryset)
+            if not replicas.reads_replica():
+                cache.set(
+                    key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+        return count
+
+    def get_count_cache_key(self):
+        params = sorted(
+            (key, value)
+            for key, values in self.request.query_params.lists()
+            for value in values if key not in self.ignored_query_params)
+        digest = md5(
+            f'{self.request.path}?{urlencode(params)}'.encode()).hexdigest()
+        return f'{self.count_cache_prefix}:{digest}'
+
+
+class OptionalKeysetPagination(CachedCountPagination):
+    """
+    Класс пагинации с дешёвым подсчётом и переключением в режим курсора.
+
+    Если контроллер объявляет атрибут cursor_ordering, а клиент передаёт
+    параметр cursor (пустой для первой страницы), выборка строится
+    по ключу сортировки без OFFSET и COUNT, а в ответе возвращаются
+    непрозрачные курсоры на следующую и предыдущую страницы.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.ordering = getattr(view, 'cursor_ordering', None)
+        self.keyset = bool(self.ordering) and (
+            self.cursor_query_param in request.query_params)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.fields = [
+            (name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+        position, self.reverse = self.decode_cursor(
+            queryset.model, request.query_params[self.cursor_query_param])
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [
+                name[1:] if name.startswith('-') else f'-{name}'
+                for name in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(position))
+        results = list(queryset[:self.limit + 1])
+        has_more = len(results) > self.limit
+        results = results[:self.limit]
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.get_cursor_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.get_cursor_link(self.page[0], reverse=True)
+
+    def get_keyset_filter(self, position):
+        """
+        Метод строит условие «строго после позиции» для составного
+        ключа сортировки с учётом направления каждого поля.
+        """
+        condition, equal = Q(), Q()
+        for (name, descending), value in zip(self.fields, position):
+            lookup = 'lt' if descending != self.reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def get_cursor_link(self, instance, reverse):
+        position = [getattr(instance, name) for name, _ in self.fields]
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.offset_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param,
+            self.encode_cursor(position, reverse))
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({
+            'p': [
+                value.isoformat() if isinstance(value, date) else value
+                for value in position],
+            'r': int(reverse)}, separators=(',', ':'))
+        return urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, model, cursor):
+        """
+        Метод возвращает позицию и направление из курсора;
+        пустой курсор означает первую страницу.
+        """
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(
+                cursor + '=' * (-len(cursor) % 4)).decode())
+            if len(payload['p']) != len(self.fields):
+                raise ValueError(cursor)
+            position = [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, payload['p'])]
+            return position, bool(payload['r'])
+        except (KeyError, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
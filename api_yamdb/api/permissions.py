@@ -13,7 +13,7 @@ class IsAuthorOrModeratorOrReadOnly(BasePermission):
 
     def has_object_permission(self, request, view, obj):
         return request.method in SAFE_METHODS or (
-            obj.author == request.user or (
+            obj.author_id == request.user.pk or (
                 request.user.is_authenticated and request.user.is_moderator))
 
 
@@ -0,0 +1,144 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client
+from reviews.models import User
+
+from .authentication import get_access_token
+from .benchmark import get_endpoints
+from .queries import fingerprint
+
+SQLITE_SCAN_PATTERN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+FILTER_PATTERN = re.compile(r'\b(?:WHERE|ORDER BY)\b')
+
+
+class SelectCollector:
+    """Класс обёртки выполнения SQL, запоминающий запросы SELECT."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith('SELECT'):
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def collect_queries(client, url):
+    """Метод выполняет запрос на пустом кеше и возвращает его SELECT."""
+    cache.clear()
+    collector = SelectCollector()
+    with connection.execute_wrapper(collector):
+        response = client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+    return collector.queries
+
+
+def describe_node(node, depth=0):
+    """Метод разворачивает узел плана PostgreSQL в строки без оценок."""
+    line = '  ' * depth + node['Node Type']
+    if 'Relation Name' in node:
+        line += f' on {node["Relation Name"]}'
+    if 'Index Name' in node:
+        line += f' using {node["Index Name"]}'
+    lines = [line]
+    for child in node.get('Plans', ()):
+        lines.extend(describe_node(child, depth + 1))
+    return lines
+
+
+def explain_postgresql(sql, params):
+    """
+    Метод строит план с выключенным последовательным чтением: если
+    в плане всё равно остался Seq Scan, подходящего индекса нет.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    lines = describe_node(plan[0]['Plan'])
+    seq_scans = [
+        line.split(' on ')[1] for line in lines
+        if line.strip().startswith('Seq Scan on ')]
+    return lines, seq_scans
+
+
+def explain_sqlite(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        lines = [row[-1] for row in cursor.fetchall()]
+    tables = set(connection.introspection.table_names())
+    seq_scans = []
+    for line in lines:
+        match = SQLITE_SCAN_PATTERN.match(line)
+        if match and match.group(1) in tables:
+            seq_scans.append(match.group(1))
+    return lines, seq_scans
+
+
+EXPLAINERS = {
+    'postgresql': explain_postgresql,
+    'sqlite': explain_sqlite,
+}
+
+
+def explain(sql, params):
+    """
+    Метод возвращает строки плана и таблицы, читаемые целиком.
+    Полное чтение без условий и сортировки индекс не ускорит,
+    поэтому такие запросы не считаются проблемой.
+    """
+    explainer = EXPLAINERS.get(connection.vendor)
+    if explainer is None:
+        return [], []
+    lines, seq_scans = explainer(sql, params)
+    return lines, seq_scans if FILTER_PATTERN.search(sql) else []
+
+
+def get_plans(client, url):
+    """Метод возвращает планы запросов адреса по их формам."""
+    plans = {}
+    for sql, params in collect_queries(client, url):
+        shape = fingerprint(sql)
+        if shape not in plans:
+            lines, seq_scans = explain(sql, params)
+            plans[shape] = {'plan': lines, 'seq_scans': seq_scans}
+    return plans
+
+
+def capture_plans(endpoints=None):
+    """
+    Метод собирает планы всех SELECT, которые выполняют адреса API
+    от имени администратора. Одинаковые формы запросов адреса
+    объединяются.
+    """
+    admin = User.objects.filter(role=User.ADMIN).order_by('pk').first()
+    client = Client(HTTP_AUTHORIZATION=f'Bearer {get_access_token(admin)}')
+    return {
+        name: get_plans(client, url)
+        for name, url in (endpoints or get_endpoints())}
+
+
+def compare_plans(results, baseline=None):
+    """
+    Метод возвращает описания проблем: таблицы, читаемые целиком,
+    и планы, изменившиеся относительно базовых для той же СУБД.
+    """
+    problems = []
+    for name, plans in sorted(results['endpoints'].items()):
+        for shape, plan in sorted(plans.items()):
+            for table in plan['seq_scans']:
+                problems.append(
+                    f'{name}: последовательное чтение {table} в {shape}')
+    if baseline is None or (
+            baseline['meta']['vendor'] != results['meta']['vendor']):
+        return problems
+    for name, plans in sorted(results['endpoints'].items()):
+        base_plans = baseline['endpoints'].get(name, {})
+        for shape, plan in sorted(plans.items()):
+            base = base_plans.get(shape)
+            if base is not None and base['plan'] != plan['plan']:
+                problems.append(f'{name}: изменился план {shape}')
+    return problems
@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.fields import Field
+from rest_framework.serializers import BaseSerializer
+
+from .metrics import get_view_name
+
+logger = logging.getLogger(__name__)
+
+IGNORED_MODULES = ('api.queries', 'api.metrics', )
+STRING_PATTERN = re.compile(r"'(?:[^']|'')*'")
+NUMBER_PATTERN = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_PATTERN = re.compile(r'%s|%\(\w+\)s')
+IN_PATTERN = re.compile(r'\bIN \(\?(?:, \?)*\)', re.IGNORECASE)
+SPACE_PATTERN = re.compile(r'\s+')
+REPORTED_SHAPES = 5
+
+
+class SQLBudgetError(Exception):
+    """Исключение строгого режима: превышен бюджет или найден N+1."""
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql):
+    """
+    Метод приводит запрос к форме без значений: литералы и параметры
+    заменяются на «?», списки IN — на «IN (...)».
+    """
+    shape = STRING_PATTERN.sub('?', sql)
+    shape = PLACEHOLDER_PATTERN.sub('?', shape)
+    shape = NUMBER_PATTERN.sub('?', shape)
+    shape = IN_PATTERN.sub('IN (...)', shape)
+    return SPACE_PATTERN.sub(' ', shape).strip()
+
+
+def get_serializer_field(owner):
+    """
+    Метод возвращает имя поля сериализатора или None. Скомпилированные
+    поля api.fast хранят поле DRF в атрибуте field.
+    """
+    owner = getattr(owner, 'field', owner)
+    parent = getattr(owner, 'parent', None)
+    if isinstance(owner, Field) and isinstance(parent, BaseSerializer) and (
+            owner.field_name):
+        return f'{type(parent).__name__}.{owner.field_name}'
+    return None
+
+
+def get_source(frame):
+    filename = frame.f_code.co_filename
+    if not filename.startswith(settings.BASE_DIR) or (
+            'site-packages' in filename):
+        return None
+    return '{}:{} {}'.format(
+        os.path.relpath(filename, settings.BASE_DIR), frame.f_lineno,
+        frame.f_code.co_name)
+
+
+def attribute(frame):
+    """
+    Метод находит по стеку вызовов поле сериализатора, которое
+    вызвало запрос, и ближайшую строку кода проекта.
+    """
+    field = source = None
+    while frame is not None and (field is None or source is None):
+        if frame.f_globals.get('__name__') not in IGNORED_MODULES:
+            if field is None:
+                field = get_serializer_field(frame.f_locals.get('self'))
+            if source is None:
+                source = get_source(frame)
+        frame = frame.f_back
+    return {'field': field, 'source': source}
+
+
+class QueryTracker:
+    """
+    Класс обёртки выполнения SQL, собирающий формы запросов одного
+    HTTP-запроса. Стек разбирается только для медленных запросов
+    и для формы, повторившейся SQL_REPEAT_THRESHOLD раз.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.count = 0
+        self.duration = 0
+        self.shapes = Counter()
+        self.sources = {}
+
+    @property
+    def view(self):
+        return getattr(self.request, 'query_view', 'unmatched')
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.track(sql, elapsed)
+
+    def track(self, sql, elapsed):
+        shape = fingerprint(sql)
+        self.count += 1
+        self.duration += elapsed
+        self.shapes[shape] += 1
+        if self.shapes[shape] == settings.SQL_REPEAT_THRESHOLD:
+            self.sources[shape] = attribute(sys._getframe())
+        if elapsed * 1000 >= settings.SQL_SLOW_QUERY_MS:
+            log_report({
+                'event': 'sql_slow_query',
+                'view': self.view,
+                'duration_ms': round(elapsed * 1000, 3),
+                'fingerprint': shape,
+                **attribute(sys._getframe()),
+            })
+
+    def get_budget(self):
+        budgets = settings.SQL_BUDGETS
+        return budgets.get(self.view, budgets.get('default'))
+
+    def get_report(self):
+        """
+        Метод возвращает отчёт о превышении бюджета и повторах формы
+        запроса или None, если нарушений нет.
+        """
+        budget = self.get_budget()
+        repeated = [
+            {'fingerprint': shape, 'count': count, **self.sources[shape]}
+            for shape, count in self.shapes.most_common()
+            if shape in self.sources]
+        if not repeated and (budget is None or self.count <= budget):
+            return None
+        return {
+            'event': 'sql_budget',
+            'view': self.view,
+            'method': self.request.method,
+            'path': self.request.path,
+            'queries': self.count,
+            'budget': budget,
+            'duration_ms': round(self.duration * 1000, 3),
+            'repeated': repeated,
+            'top': [
+                {'fingerprint': shape, 'count': count}
+                for shape, count in self.shapes.most_common(REPORTED_SHAPES)],
+        }
+
+
+def log_report(report):
+    """Метод пишет отчёт предупреждением: JSON в тексте и в extra."""
+    logger.warning(
+        json.dumps(report, ensure_ascii=False), extra={'sql_report': report})
+
+
+class QueryBudgetMiddleware:
+    """
+    Класс промежуточного слоя, проверяющий бюджет SQL-запросов
+    контроллера из SQL_BUDGETS и повторы одинаковых запросов (N+1).
+    В строгом режиме (SQL_BUDGET_STRICT, включён в тестах) нарушение
+    вызывает исключение, иначе пишется предупреждение с формами
+    запросов.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        tracker = QueryTracker(request)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(tracker))
+            response = self.get_response(request)
+        report = tracker.get_report()
+        if report is None:
+            return response
+        if settings.SQL_BUDGET_STRICT:
+            raise SQLBudgetError(json.dumps(report, ensure_ascii=False))
+        log_report(report)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_view = get_view_name(view_func, request.method)
@@ -0,0 +1,117 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+PIN_KEY = 'replica-pin:{}'
+LAG_QUERY = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() '
+    'THEN 0 ELSE COALESCE(EXTRACT(EPOCH FROM now() - '
+    'pg_last_xact_replay_timestamp()), 0) END')
+
+state = threading.local()
+unavailable = {}
+checked = {}
+
+
+def get_lag(alias):
+    """
+    Метод возвращает отставание реплики в секундах. Отставание
+    считается только для PostgreSQL, на ведущем сервере оно равно 0.
+    """
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(LAG_QUERY)
+        lag = cursor.fetchone()[0]
+    return float(lag or 0)
+
+
+def mark_unavailable(alias):
+    """Метод исключает реплику из выбора на REPLICA_RETRY_INTERVAL."""
+    unavailable[alias] = time.monotonic() + settings.REPLICA_RETRY_INTERVAL
+    checked.pop(alias, None)
+
+
+def is_available(alias):
+    """
+    Метод проверяет соединение с репликой и её отставание. Успешная
+    проверка запоминается на REPLICA_CHECK_INTERVAL секунд.
+    """
+    now = time.monotonic()
+    if unavailable.get(alias, 0) > now:
+        return False
+    if checked.get(alias, 0) > now:
+        return True
+    try:
+        connections[alias].ensure_connection()
+        lag = get_lag(alias)
+    except DatabaseError:
+        lag = None
+    if lag is None or lag > settings.REPLICA_MAX_LAG:
+        mark_unavailable(alias)
+        return False
+    checked[alias] = now + settings.REPLICA_CHECK_INTERVAL
+    return True
+
+
+def choose_replica():
+    """Метод выбирает доступную реплику или возвращает ведущую базу."""
+    replicas = list(settings.DATABASE_REPLICAS)
+    random.shuffle(replicas)
+    return next(
+        (alias for alias in replicas if is_available(alias)),
+        DEFAULT_DB_ALIAS)
+
+
+def use_replica():
+    """Метод направляет чтение текущего потока на выбранную реплику."""
+    state.alias = choose_replica()
+
+
+def release():
+    """Метод возвращает чтение на ведущую базу и отдаёт прежний псевдоним."""
+    return vars(state).pop('alias', None)
+
+
+def reads_replica():
+    """Метод сообщает, что чтение текущего потока идёт с реплики."""
+    return getattr(state, 'alias', DEFAULT_DB_ALIAS) != DEFAULT_DB_ALIAS
+
+
+def pin(user):
+    """Метод закрепляет чтение пользователя за ведущей базой."""
+    if user.is_authenticated:
+        cache.set(PIN_KEY.format(user.pk), 1, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(user):
+    return user.is_authenticated and cache.get(
+        PIN_KEY.format(user.pk)) is not None
+
+
+class ReplicaRouter:
+    """
+    Класс маршрутизатора баз данных.
+
+    Чтение уходит на реплику, только если её выбрал контроллер для
+    безопасного запроса; запись, транзакции и всё остальное остаются
+    на ведущей базе. Реплики — копии ведущей базы, поэтому связи
+    между объектами из разных баз разрешены.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = getattr(state, 'alias', None)
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
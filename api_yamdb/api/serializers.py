@@ -1,6 +1,8 @@
 from django.conf import settings
 from rest_framework import serializers
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleRanking, User)
+from reviews.rankings import get_current_trending
 from reviews.validators import validate_username, validate_year
 
 
@@ -64,37 +66,128 @@ class GenreSerializer(serializers.ModelSerializer):
         fields = ('name', 'slug')
 
 
-class TitleSerializer(serializers.ModelSerializer):
+class AuthorSerializer(serializers.ModelSerializer):
+    """Класс-сериализатор автора для развёрнутых отзывов и комментариев."""
+
+    class Meta:
+        model = User
+        fields = ('username', 'first_name', 'last_name')
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Миксин сериализатора выборочных полей.
+
+    Оставляет поля из context['fields'], а связи из Meta.expandable
+    разворачивает, если они перечислены в context['expand'], или
+    отдаёт слагами. Meta.expandable сопоставляет связи пару
+    (сериализатор, поле слага).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        expand = self.context.get('expand')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        if expand is None:
+            return
+        for name, options in getattr(self.Meta, 'expandable', {}).items():
+            if name in self.fields:
+                self.fields[name] = self.build_relation(
+                    name, *options, expanded=name in expand)
+
+    def build_relation(self, name, serializer_class, slug_field, expanded):
+        many = self.Meta.model._meta.get_field(name).many_to_many
+        if expanded:
+            return serializer_class(many=many, read_only=True)
+        return serializers.SlugRelatedField(
+            slug_field=slug_field, many=many, read_only=True)
+
+
+class PrefetchedSlugRelatedField(serializers.SlugRelatedField):
+    """
+    Класс поля связи по слагу, которое при массовой записи берёт
+    объекты из словаря, загруженного одним запросом на все элементы.
+    """
+
+    def get_prefetched(self):
+        return self.context.get('related_cache', {}).get(
+            (self.queryset.model, self.slug_field))
+
+    def to_internal_value(self, data):
+        objects = self.get_prefetched()
+        if objects is None:
+            return super().to_internal_value(data)
+        try:
+            return objects[str(data)]
+        except KeyError:
+            self.fail(
+                'does_not_exist', slug_name=self.slug_field, value=str(data))
+
+
+class TitleSerializer(SparseFieldsSerializerMixin,
+                      serializers.ModelSerializer):
     """Класс-сериализатор для модели произведение на чтение."""
     genre = GenreSerializer(many=True)
     category = CategorySerializer()
     rating = serializers.IntegerField()
+    score_histogram = serializers.ReadOnlyField()
 
     class Meta:
         model = Title
-        fields = '__all__'
+        fields = (
+            'id', 'genre', 'category', 'rating', 'review_count',
+            'score_histogram', 'name', 'year', 'description')
         read_only_fields = (
-            'id', 'name', 'year', 'rating', 'description', 'genre', 'category')
+            'id', 'name', 'year', 'rating', 'review_count', 'description',
+            'genre', 'category')
+        select_related = ('category', )
+        prefetch_related = ('genre', )
+        expandable = {
+            'genre': (GenreSerializer, 'slug'),
+            'category': (CategorySerializer, 'slug'),
+        }
+        deferrable = ('description', )
+
+
+class RankingSerializer(serializers.ModelSerializer):
+    """Класс-сериализатор места произведения в рейтингах."""
+    title = TitleSerializer(read_only=True)
+    trending = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TitleRanking
+        fields = ('title', 'weighted', 'trending', 'review_count')
+        select_related = ('title__category', )
+        prefetch_related = ('title__genre', )
+
+    def get_trending(self, ranking):
+        return round(get_current_trending(ranking.trending), 3)
 
 
 class PostTitleSerializer(serializers.ModelSerializer):
     """Класс-сериализатор для модели произведение на создание и изменение."""
-    genre = serializers.SlugRelatedField(
+    genre = PrefetchedSlugRelatedField(
         queryset=Genre.objects.all(), required=True,
         many=True, slug_field='slug')
-    category = serializers.SlugRelatedField(
+    category = PrefetchedSlugRelatedField(
         queryset=Category.objects.all(), required=True, slug_field='slug')
 
     class Meta:
         model = Title
         fields = (
             'id', 'name', 'year', 'description', 'genre', 'category')
+        select_related = ('category', )
+        prefetch_related = ('genre', )
 
     def validate_year(self, value):
         return validate_year(value)
 
 
-class BasePostSerializer(serializers.ModelSerializer):
+class BasePostSerializer(SparseFieldsSerializerMixin,
+                         serializers.ModelSerializer):
     """Базовый класс-сериализатор для моделей отзыв и комментарий."""
     author = serializers.SlugRelatedField(
         read_only=True, slug_field='username',
@@ -107,18 +200,12 @@ class ReviewSerializer(BasePostSerializer):
 
     class Meta:
         model = Review
-        fields = ('id', 'text', 'author', 'score', 'pub_date', 'title', )
-
-    def validate(self, data):
-        if self.context.get('request').method == 'POST' and (
-            Review.objects.filter(
-                author=self.context.get('request').user,
-                title__id=self.context.get('view').kwargs.get('title_id')
-            ).exists()
-        ):
-            raise serializers.ValidationError(
-                'Вы можете оставить только один отзыв на это произведение.')
-        return data
+        fields = (
+            'id', 'text', 'author', 'score', 'comment_count', 'pub_date',
+            'title', )
+        select_related = ('author', )
+        expandable = {'author': (AuthorSerializer, 'username')}
+        deferrable = ('text', )
 
 
 class CommentSerializer(BasePostSerializer):
@@ -127,3 +214,6 @@ class CommentSerializer(BasePostSerializer):
     class Meta:
         model = Comment
         fields = ('id', 'text', 'author', 'pub_date', )
+        select_related = ('author', )
+        expandable = {'author': (AuthorSerializer, 'username')}
+        deferrable = ('text', )
@@ -0,0 +1,95 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, TitleRanking, User)
+from reviews.signals import (comment_count_changed, data_imported,
+                             rankings_refreshed, rating_changed)
+from reviews.versions import bump_versions
+
+from .authentication import forget_token_version, user_cache
+from .cache import (DELETED_TITLES_VERSION_NAME, get_comments_version_name,
+                    get_reviews_version_name)
+
+
+def bump_sender_version(sender, **kwargs):
+    """Обработчик инвалидирует кешированные ответы по изменённой модели."""
+    bump_versions(sender)
+
+
+for model in (Category, Genre, Title):
+    post_save.connect(bump_sender_version, sender=model)
+    post_delete.connect(bump_sender_version, sender=model)
+
+
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+@receiver(m2m_changed, sender=Title.genre.through)
+def bump_title_version(sender, **kwargs):
+    """Обработчик инвалидирует ответы о произведениях при смене жанров."""
+    bump_versions(Title, GenreTitle)
+
+
+@receiver(post_delete, sender=Title)
+def bump_deleted_titles_version(sender, **kwargs):
+    """Обработчик перестраивает индекс фасетов после удаления произведения."""
+    bump_versions(DELETED_TITLES_VERSION_NAME)
+
+
+@receiver(rating_changed, sender=Title)
+def bump_rating_versions(sender, title_ids, **kwargs):
+    """
+    Обработчик инвалидирует ответы о произведениях и списки их отзывов
+    при изменении рейтинга, в том числе при переносе отзыва.
+    """
+    bump_versions(Title, *(
+        get_reviews_version_name(title_id) for title_id in title_ids))
+
+
+@receiver(comment_count_changed, sender=Review)
+def bump_comment_count_versions(sender, title_ids, **kwargs):
+    """Обработчик инвалидирует списки отзывов при смене их счётчиков."""
+    bump_versions(*(
+        get_reviews_version_name(title_id) for title_id in title_ids))
+
+
+@receiver(rankings_refreshed, sender=TitleRanking)
+def bump_rankings_version(sender, **kwargs):
+    """Обработчик инвалидирует ответы рейтингов после пересчёта."""
+    bump_versions(TitleRanking)
+
+
+@receiver(data_imported)
+def bump_imported_versions(sender, models, title_ids, review_ids, **kwargs):
+    """
+    Обработчик инвалидирует ответы по моделям, загруженным в обход
+    сигналов сохранения, и списки отзывов и комментариев их родителей.
+    """
+    bump_versions(*models, *(
+        get_reviews_version_name(title_id) for title_id in title_ids), *(
+        get_comments_version_name(review_id) for review_id in review_ids))
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def bump_reviews_version(sender, instance, **kwargs):
+    """Обработчик инвалидирует список отзывов произведения."""
+    bump_versions(get_reviews_version_name(instance.title_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comments_version(sender, instance, **kwargs):
+    """Обработчик инвалидирует список комментариев к отзыву."""
+    bump_versions(get_comments_version_name(instance.review_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def refresh_token_version(sender, instance, **kwargs):
+    """
+    Обработчик сбрасывает версию токенов пользователя в общем кеше
+    и его строку в кеше процесса, чтобы отзыв токенов вступил в силу
+    на следующем же запросе.
+    """
+    user_cache.forget(instance.pk)
+    forget_token_version(instance.pk)
@@ -0,0 +1,146 @@
+import time
+from hashlib import md5
+
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+THROTTLE_KEY = 'throttle:{}:{}:{}'
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+
+def parse_rate(rate):
+    """Метод разбирает норму вида «5/min» в пару (число, период)."""
+    capacity, period = rate.split('/')
+    return int(capacity), PERIODS[period[0]]
+
+
+def increment(key, timeout):
+    """
+    Метод атомарно увеличивает счётчик в кеше и возвращает новое
+    значение; отсутствующий счётчик создаётся через add, который
+    не перезаписывает счётчик, созданный другим процессом.
+    """
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, timeout):
+            return 1
+        return cache.incr(key)
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Базовый класс ограничения частоты запросов скользящим окном.
+
+    Норма scope из REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] вида «5/min»
+    задаёт число запросов за период. Запросы считаются счётчиками
+    в общем кеше, по одному на период; счётчик увеличивается атомарно,
+    поэтому параллельные запросы разных процессов не теряют друг друга.
+    Число запросов за последний период оценивается как текущий счётчик
+    плюс доля прошлого, ещё не вышедшая из окна, поэтому на границе
+    периодов норма не удваивается. Отклонённые запросы тоже считаются.
+    """
+    scope = None
+    timer = time.time
+
+    def get_rate(self):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_bucket(self, request, view):
+        """Метод возвращает идентификатор счётчика или None без ограничения."""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        rate = self.get_rate()
+        bucket = self.get_bucket(request, view)
+        if rate is None or bucket is None:
+            return True
+        capacity, period = parse_rate(rate)
+        window, elapsed = divmod(self.timer(), period)
+        window = int(window)
+        count = increment(
+            THROTTLE_KEY.format(self.scope, bucket, window), 2 * period)
+        previous = 0
+        if count <= capacity:
+            previous = cache.get(
+                THROTTLE_KEY.format(self.scope, bucket, window - 1), 0)
+            if previous * (period - elapsed) / period + count <= capacity:
+                return True
+        self.retry_after = self.get_retry_after(
+            capacity, period, elapsed, count, previous)
+        return False
+
+    @staticmethod
+    def get_retry_after(capacity, period, elapsed, count, previous):
+        """
+        Метод возвращает время, через которое пройдёт следующий запрос:
+        в текущем окне, если в счётчике есть место и дождаться выхода
+        части прошлого окна, иначе в следующем окне, когда с ним
+        уложится доля текущего счётчика.
+        """
+        if count < capacity:
+            return period * (1 - (capacity - count - 1) / previous) - elapsed
+        return period - elapsed + period * (1 - (capacity - 1) / count)
+
+    def wait(self):
+        return getattr(self, 'retry_after', None)
+
+
+class IPThrottle(SlidingWindowThrottle):
+    """Класс ограничения частоты запросов с одного адреса."""
+
+    def get_bucket(self, request, view):
+        return self.get_ident(request)
+
+
+class UsernameThrottle(SlidingWindowThrottle):
+    """
+    Класс ограничения частоты запросов к одному имени пользователя.
+    Имя ещё не проверено сериализатором, поэтому в ключ идёт его хеш.
+    """
+
+    def get_bucket(self, request, view):
+        data = request.data
+        username = data.get('username') if isinstance(data, dict) else None
+        if not isinstance(username, str) or not username.strip():
+            return None
+        return md5(username.strip().encode()).hexdigest()
+
+
+class UserThrottle(SlidingWindowThrottle):
+    """
+    Класс ограничения частоты запросов пользователя; анонимные
+    запросы ограничиваются по адресу.
+    """
+
+    def get_bucket(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f'user-{request.user.pk}'
+        return f'ip-{self.get_ident(request)}'
+
+
+class SignUpIPThrottle(IPThrottle):
+    scope = 'signup'
+
+
+class SignUpUsernameThrottle(UsernameThrottle):
+    scope = 'signup_username'
+
+
+class TokenIPThrottle(IPThrottle):
+    scope = 'token'
+
+
+class TokenUsernameThrottle(UsernameThrottle):
+    scope = 'token_username'
+
+
+class CreateThrottle(UserThrottle):
+    """Класс ограничения частоты создания отзывов и комментариев."""
+    scope = 'create'
+
+    def get_bucket(self, request, view):
+        if getattr(view, 'action', None) != 'create':
+            return None
+        return super().get_bucket(request, view)
@@ -2,8 +2,8 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                    ReviewViewSet, TitleViewSet, UserViewSet, signup,
-                    token_obtain)
+                    RankingViewSet, ReviewViewSet, TitleViewSet, UserViewSet,
+                    signup, token_obtain)
 
 router_v1 = DefaultRouter()
 
@@ -11,6 +11,7 @@ router_v1.register(r'users', UserViewSet, basename='user')
 router_v1.register(r'titles', TitleViewSet, basename='title')
 router_v1.register(r'categories', CategoryViewSet, basename='category')
 router_v1.register(r'genres', GenreViewSet, basename='genre')
+router_v1.register(r'rankings', RankingViewSet, basename='ranking')
 router_v1.register(
     r'^titles/(?P<title_id>\d+)/reviews', ReviewViewSet, basename='review')
 router_v1.register(
@@ -1,54 +1,72 @@
 from random import sample
 
 from django.conf import settings
-from django.core.mail import send_mail
-from django.db import IntegrityError
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
-from rest_framework.decorators import action, api_view, permission_classes
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.decorators import (action, api_view, permission_classes,
+                                       throttle_classes)
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import SearchFilter
 from rest_framework.mixins import (CreateModelMixin, DestroyModelMixin,
                                    ListModelMixin)
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
-from rest_framework_simplejwt.tokens import RefreshToken
-from reviews.models import Category, Genre, Review, Title, User
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleRanking, User)
+from reviews.outbox import enqueue_email
 
-from .filters import TitleFilter
+from .authentication import get_access_token, get_user_instance
+from .bulk import BulkWriteMixin
+from .cache import get_comments_version_name, get_reviews_version_name
+from .export import (export_records, get_export_titles, get_output,
+                     parse_include, parse_since)
+from .facets import get_facet_counts
+from .filters import NullsLastOrderingFilter, TitleFilter, TitleSearchFilter
+from .mixins import (CachedListMixin, CachedRetrieveMixin,
+                     ConditionalRequestMixin, EagerLoadingMixin, FastReadMixin,
+                     ReplicaReadMixin, SparseFieldsMixin)
 from .permissions import IsAdmin, IsAuthorOrModeratorOrReadOnly, ReadOnly
 from .serializers import (CategorySerializer, CommentSerializer,
                           GenreSerializer, PostTitleSerializer,
-                          ReviewSerializer, SignUpSerializer, TitleSerializer,
+                          RankingSerializer, ReviewSerializer,
+                          SignUpSerializer, TitleSerializer,
                           TokenObtainSerializer, UserNotAdminSerializer,
                           UserSerializer)
+from .throttling import (CreateThrottle, SignUpIPThrottle,
+                         SignUpUsernameThrottle, TokenIPThrottle,
+                         TokenUsernameThrottle)
 
 
 @api_view(['POST', ])
 @permission_classes([AllowAny, ])
+@throttle_classes([SignUpIPThrottle, SignUpUsernameThrottle])
 def signup(request):
     """Контроллер для самостоятельной регистрации пользователей."""
     serializer = SignUpSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
     try:
-        user, _ = User.objects.get_or_create(**serializer.validated_data)
+        with transaction.atomic():
+            user, _ = User.objects.get_or_create(**serializer.validated_data)
+            user.confirmation_code = ''.join(
+                sample('0123456789', settings.CODE_LENGTH))
+            user.save()
+            enqueue_email(
+                user.email, 'Код подтверждения', user.confirmation_code)
     except IntegrityError:
         return Response(
             status=status.HTTP_400_BAD_REQUEST, data={'detail': (
                 'Нельзя зарегистрироваться на уже '
                 'существующий никнейм или почту.')})
-    user.confirmation_code = ''.join(
-        sample('0123456789', settings.CODE_LENGTH))
-    user.save()
-    send_mail('Код подтверждения', user.confirmation_code,
-              settings.EMAIL_HOST_USER, (user.email, ), fail_silently=False)
     return Response(status=status.HTTP_200_OK, data=serializer.data)
 
 
 @api_view(['POST', ])
 @permission_classes([AllowAny, ])
+@throttle_classes([TokenIPThrottle, TokenUsernameThrottle])
 def token_obtain(request):
     """Контроллер получения access токена по юзернейму и коду подтверждения."""
     serializer = TokenObtainSerializer(data=request.data)
@@ -62,7 +80,7 @@ def token_obtain(request):
             data={'detail': 'Неверно указан код подтверждения.'})
     return Response(
         status=status.HTTP_200_OK,
-        data={"access": str(RefreshToken.for_user(user).access_token)})
+        data={"access": str(get_access_token(user))})
 
 
 class UserViewSet(ModelViewSet):
@@ -83,10 +101,11 @@ class UserViewSet(ModelViewSet):
         """Метод эндпоинта с информацией о себе."""
         if request.method == 'GET':
             return Response(
-                data=self.get_serializer(request.user).data,
+                data=self.get_serializer(get_user_instance(request.user)).data,
                 status=status.HTTP_200_OK)
         serializer = self.get_serializer(
-            request.user, data=request.data, partial=True
+            get_object_or_404(User, pk=request.user.pk),
+            data=request.data, partial=True
         )
         if serializer.is_valid():
             serializer.save()
@@ -94,23 +113,69 @@ class UserViewSet(ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class TitleViewSet(ModelViewSet):
+class TitleViewSet(ReplicaReadMixin, SparseFieldsMixin, FastReadMixin,
+                   ConditionalRequestMixin, CachedListMixin,
+                   CachedRetrieveMixin, BulkWriteMixin, ModelViewSet):
     """Класс контроллера для модели произведение."""
-    queryset = Title.objects.all().annotate(rating=Avg('reviews__score'))
+    queryset = Title.objects.all()
     serializer_class = TitleSerializer
     permission_classes = (IsAdmin | ReadOnly, )
-    filter_backends = (DjangoFilterBackend, OrderingFilter)
+    filter_backends = (
+        DjangoFilterBackend, TitleSearchFilter, NullsLastOrderingFilter)
     filterset_class = TitleFilter
     ordering_fields = ('-year', 'rating', 'name')
+    cursor_ordering = ('-year', 'name', 'id')
+    cache_models = (Title, Genre, Category)
+    etag_models = (Genre, Category)
 
     def get_serializer_class(self):
         if self.action not in ('list', 'retrieve'):
             return PostTitleSerializer
         return super(TitleViewSet, self).get_serializer_class()
 
+    def get_validator_queryset(self):
+        return Title.objects.all()
+
+    def bulk_written(self, instances):
+        super().bulk_written(instances)
+        Title.objects.filter(
+            pk__in=[title.pk for title in instances]).update_search_vector()
+
+    @action(methods=['get'], detail=False, permission_classes=(IsAdmin, ))
+    def export(self, request):
+        """
+        Метод потоковой выгрузки произведений, отзывов и комментариев
+        в NDJSON или CSV с фильтрами TitleFilter и параметром since.
+        """
+        params = request.query_params
+        output = params.get('output', 'ndjson')
+        content_type, render = get_output(output)
+        records = export_records(
+            get_export_titles(params), since=parse_since(params.get('since')),
+            include=parse_include(params.get('include')))
+        response = StreamingHttpResponse(
+            render(records), content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="titles.{output}"')
+        return response
+
+    @action(methods=['get'], detail=False)
+    def facets(self, request):
+        """
+        Метод возвращает число произведений по каждой категории, жанру
+        и году для выбора из параметров TitleFilter.
+        """
+        filterset = TitleFilter(
+            request.query_params, queryset=Title.objects.all(),
+            request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        return Response(get_facet_counts(filterset))
+
 
 class BaseSectionViewSet(
-        GenericViewSet, CreateModelMixin, DestroyModelMixin, ListModelMixin):
+        ReplicaReadMixin, CachedListMixin, BulkWriteMixin, GenericViewSet,
+        CreateModelMixin, DestroyModelMixin, ListModelMixin):
     """
     Базовый класс контроллера для получения списка,
     создания и удаления объектов моделей категория и жанр.
@@ -119,6 +184,7 @@ class BaseSectionViewSet(
     filter_backends = (SearchFilter, )
     search_fields = ('name', )
     lookup_field = 'slug'
+    bulk_lookup_field = 'slug'
 
 
 class CategoryViewSet(BaseSectionViewSet):
@@ -126,6 +192,7 @@ class CategoryViewSet(BaseSectionViewSet):
 
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    cache_models = (Category, )
 
 
 class GenreViewSet(BaseSectionViewSet):
@@ -133,39 +200,144 @@ class GenreViewSet(BaseSectionViewSet):
 
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    cache_models = (Genre, )
 
 
-class ReviewViewSet(ModelViewSet):
+class RankingViewSet(ReplicaReadMixin, EagerLoadingMixin, CachedListMixin,
+                     ListModelMixin, GenericViewSet):
+    """
+    Класс контроллера рейтингов произведений из предрасчитанной таблицы.
+    Параметр kind выбирает рейтинг (top — взвешенный, trending —
+    популярность), category и genre — слаги для рейтинга категории
+    или жанра. Кешированные ответы сбрасывает пересчёт рейтингов,
+    а не запись отзывов.
+    """
+    queryset = TitleRanking.objects.all()
+    serializer_class = RankingSerializer
+    permission_classes = (ReadOnly, )
+    cache_models = (TitleRanking, Genre, Category)
+    orderings = {
+        'top': ('-weighted', 'title_id'),
+        'trending': ('-trending', 'title_id'),
+    }
+
+    @property
+    def cursor_ordering(self):
+        kind = self.request.query_params.get('kind', 'top')
+        if kind not in self.orderings:
+            raise ValidationError({'kind': [
+                f'Допустимые значения: {", ".join(self.orderings)}.']})
+        return self.orderings[kind]
+
+    def get_queryset(self):
+        params = self.request.query_params
+        queryset = super().get_queryset().filter(review_count__gt=0)
+        if 'category' in params:
+            queryset = queryset.filter(category__slug=params['category'])
+        if 'genre' in params:
+            queryset = queryset.filter(title__genre__slug=params['genre'])
+        return queryset.order_by(*self.cursor_ordering)
+
+
+class ReviewViewSet(ReplicaReadMixin, SparseFieldsMixin, FastReadMixin,
+                    ConditionalRequestMixin, ModelViewSet):
     """Класс контроллера для модели отзыв."""
+    queryset = Review.objects.all()
     serializer_class = ReviewSerializer
     permission_classes = (
         IsAuthenticated | ReadOnly, IsAuthorOrModeratorOrReadOnly, )
+    throttle_classes = (CreateThrottle, )
+    cursor_ordering = ('-pub_date', 'id')
 
     def get_queryset(self):
-        """Метод возвращает отзывы к этому произведению."""
-        return self.get_title().reviews.all()
+        """
+        Метод возвращает отзывы к этому произведению. Для действий
+        с отзывом произведение не загружается: отзыв ищется сразу
+        по паре ключей.
+        """
+        return super().get_queryset().filter(
+            title_id=self.kwargs.get('title_id'))
+
+    def get_list_versions(self):
+        return (get_reviews_version_name(self.kwargs.get('title_id')), )
+
+    def get_validator_queryset(self):
+        return Review.objects.filter(title_id=self.kwargs.get('title_id'))
+
+    def list(self, request, *args, **kwargs):
+        self.get_title()
+        return super().list(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, title=self.get_title())
+        """
+        Метод создаёт отзыв; повторный отзыв отклоняет ограничение
+        unique_title_review, ошибка которого отдаётся ответом 400.
+        """
+        try:
+            with transaction.atomic():
+                serializer.save(
+                    author=get_user_instance(self.request.user),
+                    title=self.get_title())
+        except IntegrityError:
+            raise ValidationError(
+                'Вы можете оставить только один отзыв на это произведение.')
 
-    def get_title(self, key='title_id'):
-        """Метод получения произведения по его первичному ключу."""
-        return get_object_or_404(Title, id=self.kwargs.get(key))
+    def get_title(self):
+        """Метод получения произведения; запрос выполняется один раз."""
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(
+                Title, id=self.kwargs.get('title_id'))
+        return self._title
 
 
-class CommentViewSet(ModelViewSet):
+class CommentViewSet(ReplicaReadMixin, SparseFieldsMixin, FastReadMixin,
+                     ConditionalRequestMixin, ModelViewSet):
     """Класс контроллера для модели комментарий."""
+    queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = (
         IsAuthenticated | ReadOnly, IsAuthorOrModeratorOrReadOnly, )
+    throttle_classes = (CreateThrottle, )
+    cursor_ordering = ('-pub_date', 'id')
 
     def get_queryset(self):
-        """Метод возвращает комментарии к этому отзыву."""
-        return self.get_review().comments.all()
+        """
+        Метод возвращает комментарии к этому отзыву; принадлежность
+        отзыва произведению проверяется в том же запросе. При удалении
+        отзыв читается тем же соединением таблиц, чтобы сигнал счётчика
+        комментариев не запрашивал его произведение отдельно.
+        """
+        queryset = super().get_queryset().filter(
+            review_id=self.kwargs.get('review_id'),
+            review__title_id=self.kwargs.get('title_id'))
+        if self.action == 'destroy':
+            return queryset.select_related('review')
+        return queryset
+
+    def get_list_versions(self):
+        return (get_comments_version_name(self.kwargs.get('review_id')), )
+
+    def get_validator_queryset(self):
+        return Comment.objects.filter(
+            review_id=self.kwargs.get('review_id'),
+            review__title_id=self.kwargs.get('title_id'))
+
+    def list(self, request, *args, **kwargs):
+        self.get_review()
+        return super().list(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, review=self.get_review())
+        serializer.save(
+            author=get_user_instance(self.request.user),
+            review=self.get_review())
 
-    def get_review(self, key='review_id'):
-        """Метод получения отзыва по его первичному ключу."""
-        return get_object_or_404(Review, id=self.kwargs.get(key))
+    def get_review(self):
+        """
+        Метод получения отзыва этого произведения; запрос выполняется
+        один раз.
+        """
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review, id=self.kwargs.get('review_id'),
+                title_id=self.kwargs.get('title_id'))
+        return self._review
@@ -1,5 +1,5 @@
 import os
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 
 from dotenv import load_dotenv
 
@@ -34,6 +34,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.queries.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,6 +80,36 @@ DATABASES = {
     }
 }
 
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', default='').split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'NAME' if DATABASES['default']['ENGINE'].endswith('sqlite3')
+        else 'HOST': replica.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+REPLICA_STICKY_SECONDS = 5
+REPLICA_MAX_LAG = 10
+REPLICA_CHECK_INTERVAL = 5
+REPLICA_RETRY_INTERVAL = 30
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='yamdb'),
+    }
+}
+
+RESPONSE_CACHE_TIMEOUT = 300
+
+SEARCH_CONFIG = 'russian'
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -115,20 +147,74 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.OptionalKeysetPagination',
     'PAGE_SIZE': 10,
+    'NUM_PROXIES': 1,
+    'DEFAULT_THROTTLE_RATES': {
+        'signup': '20/hour',
+        'signup_username': '5/hour',
+        'token': '30/hour',
+        'token_username': '10/hour',
+        'create': '30/min',
+    },
 }
 
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = 100000
+ADMIN_TEXT_SEARCH = os.getenv('ADMIN_TEXT_SEARCH', default='') == '1'
+
+EXPORT_CHUNK_SIZE = 2000
+BULK_MAX_ITEMS = 5000
+
+METRICS_PATH = '/metrics'
+METRICS_DIR = os.getenv('METRICS_DIR', default='')
+METRICS_FLUSH_INTERVAL = 1
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', default='')
+METRICS_ALLOWED_NETWORKS = list(filter(None, os.getenv(
+    'METRICS_ALLOWED_NETWORKS', default='127.0.0.0/8,::1/128').split(',')))
+
+SQL_BUDGETS = {
+    'default': 30,
+    'TitleViewSet.list': 7,
+    'TitleViewSet.retrieve': 5,
+    'ReviewViewSet.list': 6,
+    'ReviewViewSet.retrieve': 5,
+    'CommentViewSet.list': 6,
+    'CommentViewSet.retrieve': 5,
+}
+SQL_BUDGET_STRICT = os.getenv('SQL_BUDGET_STRICT', default='') == '1'
+SQL_REPEAT_THRESHOLD = 5
+SQL_SLOW_QUERY_MS = 100
+
+FAST_SERIALIZATION = os.getenv('FAST_SERIALIZATION', default='1') == '1'
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=30),
     'AUTH_HEADER_TYPES': ('Bearer', ),
 }
 
+TOKEN_VERSION_CACHE_TIMEOUT = 60 * 60
+USER_CACHE_TIMEOUT = 30
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'emails')
 EMAIL_HOST_USER = 'no-reply@yamdb.fake'
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60
+EMAIL_OUTBOX_WORKERS = int(os.getenv('EMAIL_OUTBOX_WORKERS', default=1))
+
+RANKING_MIN_REVIEWS = 10
+RANKING_PRIOR_TOLERANCE = 0.05
+RANKING_HALF_LIFE = 7 * 24 * 60 * 60
+RANKING_EPOCH = datetime(2022, 1, 1, tzinfo=timezone.utc)
+RANKING_REFRESH_OVERLAP = 60
+RANKING_BATCH_SIZE = 500
+
+FACET_ID_LIMIT = 1000
+FACET_REFRESH_OVERLAP = 60
 
 
 AUTH_USER_MODEL = 'reviews.User'
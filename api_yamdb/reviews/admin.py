@@ -1,19 +1,104 @@
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.contrib.auth.admin import UserAdmin
 from django.utils.translation import gettext_lazy as _
 
-from .models import Category, Comment, Genre, GenreTitle, Review, Title, User
+from .models import (SCORES, Category, Comment, Genre, GenreTitle,
+                     OutgoingEmail, Review, Title, User)
+from .pagination import EstimatedCountPaginator
+from .search import search_titles
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """
+    Класс фильтра списка по внешнему ключу с выбором объекта через
+    автодополнение. В отличие от RelatedFieldListFilter связанные
+    объекты не загружаются в боковую панель: читается только выбранный.
+    """
+    template = 'admin/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin,
+                 field_path):
+        super().__init__(
+            field, request, params, model, model_admin, field_path)
+        self.form_field = forms.ModelChoiceField(
+            queryset=field.related_model._default_manager.all(),
+            required=False, widget=AutocompleteSelect(
+                field.remote_field, model_admin.admin_site,
+                attrs={'data-width': '100%'}))
+
+    def field_choices(self, field, request, model_admin):
+        return []
+
+    def has_output(self):
+        return True
+
+    @property
+    def widget_id(self):
+        return f'filter-{self.lookup_kwarg}'
+
+    def render_widget(self):
+        return self.form_field.widget.render(
+            self.lookup_kwarg, self.lookup_val, attrs={'id': self.widget_id})
+
+
+class ScoreFilter(admin.SimpleListFilter):
+    """
+    Класс фильтра отзывов по оценке с постоянным списком значений
+    вместо SELECT DISTINCT по всей таблице отзывов.
+    """
+    title = 'оценка'
+    parameter_name = 'score'
+
+    def lookups(self, request, model_admin):
+        return [(str(score), score) for score in SCORES]
+
+    def queryset(self, request, queryset):
+        if self.value() not in {str(score) for score in SCORES}:
+            return queryset
+        return queryset.filter(score=self.value())
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Базовый класс админки больших таблиц: число объектов оценивается
+    планировщиком, полное число без фильтров не считается, а страница
+    списка подключает автодополнение для AutocompleteFilter.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    text_search_fields = ()
+
+    def get_search_fields(self, request):
+        """
+        Метод добавляет к индексированному поиску поиск по тексту,
+        если он включён ADMIN_TEXT_SEARCH: такой поиск читает таблицу
+        целиком.
+        """
+        search_fields = super().get_search_fields(request)
+        if settings.ADMIN_TEXT_SEARCH:
+            return (*search_fields, *self.text_search_fields)
+        return search_fields
+
+    @property
+    def media(self):
+        return super().media + AutocompleteSelect(None, self.admin_site).media
 
 
 @admin.register(User)
-class UserAdmin(UserAdmin):
-    """Класс админки для модели пользователя."""
+class UserAdmin(LargeTableAdmin, UserAdmin):
+    """
+    Класс админки для модели пользователя. Поиск идёт по префиксу
+    уникальных никнейма и почты, который обслуживают их индексы.
+    """
     model = User
     list_display = (
         'username', 'email', 'first_name', 'last_name', 'role', 'is_staff')
-    list_filter = (
-        'username', 'email', 'first_name', 'last_name', 'role', 'is_staff')
-    search_fields = ('username', 'email', 'first_name', 'last_name', 'role', )
+    list_filter = ('role', 'is_staff', 'is_active', )
+    search_fields = ('username__startswith', 'email__startswith', )
+    ordering = ('username', )
     empty_value_display = '-пусто-'
     fieldsets = (
         (None, {'fields': ('username', 'role', 'password')}),
@@ -28,14 +113,26 @@ class UserAdmin(UserAdmin):
 
 
 @admin.register(Title)
-class TitleAdmin(admin.ModelAdmin):
+class TitleAdmin(LargeTableAdmin):
     """Класс админки для модели произведение."""
     list_display = (
         'id', 'name', 'year', 'description', 'category', 'get_genres', )
+    list_select_related = ('category', )
     search_fields = ('name',)
-    list_filter = ('name', 'year', 'genre', 'category', )
+    list_filter = ('year', 'genre', 'category', )
+    autocomplete_fields = ('category', )
     empty_value_display = '-пусто-'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('genre')
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Метод ищет произведения по поисковому вектору, а вне PostgreSQL —
+        по индексу в памяти процесса, как и API.
+        """
+        return search_titles(queryset, search_term, ranked=False), False
+
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -52,27 +149,54 @@ class GenreAdmin(admin.ModelAdmin):
 
 
 @admin.register(GenreTitle)
-class GenreTitleAdmin(admin.ModelAdmin):
+class GenreTitleAdmin(LargeTableAdmin):
     """Класс админки для модели жанр произведений."""
     list_display = ('genre', 'title', )
-    search_fields = ('name',)
-    list_filter = (
-        'genre',
-        'title',
-    )
+    list_select_related = ('genre', 'title', )
+    search_fields = ('genre__slug__startswith', )
+    list_filter = ('genre', ('title', AutocompleteFilter), )
+    autocomplete_fields = ('genre', 'title', )
+    ordering = ('-pk', )
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
-    """Класс админки для модели отзыв."""
-    list_display = ('text', 'author', 'score', 'pub_date', 'title', )
-    search_fields = ('text', 'author', 'title', )
-    list_filter = ('pub_date', 'author', 'score', 'title', )
+class ReviewAdmin(LargeTableAdmin):
+    """
+    Класс админки для модели отзыв. Поиск идёт по префиксу никнейма
+    автора (и по тексту при ADMIN_TEXT_SEARCH), а список сортируется
+    по первичному ключу, чтобы страница читалась по индексу без
+    сортировки всей таблицы.
+    """
+    list_display = (
+        'text', 'author', 'score', 'comment_count', 'pub_date', 'title', )
+    list_select_related = ('author', 'title', )
+    search_fields = ('author__username__startswith', )
+    text_search_fields = ('text', )
+    list_filter = (
+        'pub_date', ScoreFilter, ('author', AutocompleteFilter),
+        ('title', AutocompleteFilter), )
+    autocomplete_fields = ('author', 'title', )
+    ordering = ('-pk', )
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     """Класс админки для модели комментарий."""
     list_display = ('text', 'author', 'review', 'pub_date', )
-    search_fields = ('text', 'author', )
-    list_filter = ('pub_date', 'author', )
+    list_select_related = ('author', 'review', )
+    search_fields = ('author__username__startswith', )
+    text_search_fields = ('text', )
+    list_filter = (
+        'pub_date', ('author', AutocompleteFilter),
+        ('review', AutocompleteFilter), )
+    autocomplete_fields = ('author', 'review', )
+    ordering = ('-pk', )
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(LargeTableAdmin):
+    """Класс админки для модели исходящее письмо."""
+    list_display = (
+        'recipient', 'subject', 'created_at', 'attempts', 'sent_at', )
+    search_fields = ('recipient', )
+    list_filter = ('sent_at', )
@@ -0,0 +1,276 @@
+import csv
+import os
+import time
+from contextlib import contextmanager
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DatabaseError, connections, router, transaction
+from django.db.models import UniqueConstraint
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
+from reviews.signals import data_imported
+
+FILES = (
+    ('users.csv', User),
+    ('category.csv', Category),
+    ('genre.csv', Genre),
+    ('titles.csv', Title),
+    ('genre_title.csv', GenreTitle),
+    ('review.csv', Review),
+    ('comments.csv', Comment),
+)
+
+
+@contextmanager
+def keep_values(fields):
+    """
+    Контекст отключает auto_now и auto_now_add у полей, значения
+    которых взяты из файла, чтобы bulk_create их не перезаписал.
+    """
+    saved = [
+        (field, field.auto_now, field.auto_now_add)
+        for field in fields if hasattr(field, 'auto_now_add')]
+    for field, _, _ in saved:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def copy_value(value):
+    """Метод кодирует значение для COPY в формате CSV; пусто — это NULL."""
+    if value is None:
+        return ''
+    return '"{}"'.format(str(value).replace('"', '""'))
+
+
+class Command(BaseCommand):
+    """Команда массовой загрузки каталога и отзывов из CSV-файлов."""
+    help = (
+        'Загружает пользователей, категории, жанры, произведения, отзывы '
+        'и комментарии из CSV-файлов каталога пачками. Строки с уже '
+        'существующими первичными ключами или повторяющие уникальные '
+        'наборы полей пропускаются, поэтому после '
+        'ошибки команду можно запустить повторно.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=os.path.join(settings.BASE_DIR, 'static', 'data'),
+            help='Каталог с файлами users.csv, category.csv и другими.')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Число строк, записываемых в одной транзакции.')
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Использовать bulk_create даже в PostgreSQL.')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.use_copy = not options['no_copy']
+        self.parents = {Review: set(), Comment: set()}
+        imported = []
+        for name, model in FILES:
+            path = os.path.join(options['path'], name)
+            if not os.path.exists(path):
+                self.stdout.write(f'{name}: файл не найден, пропущен.')
+                continue
+            self.import_file(path, model)
+            imported.append(model)
+        if not imported:
+            return
+        # Итоги пересчитываются по всем файлам, даже без новых строк:
+        # прошлый запуск мог упасть после записи пачек, но до пересчёта.
+        self.reset_sequences(imported)
+        if Title in imported or Review in imported:
+            call_command(
+                'recalculate_ratings', batch_size=self.batch_size,
+                stdout=self.stdout)
+        if Comment in imported:
+            self.update_comment_counts()
+        if Title in imported:
+            self.update_search_vectors()
+        data_imported.send(
+            sender=self.__class__, models=imported,
+            title_ids=self.parents[Review], review_ids=self.parents[Comment])
+
+    def import_file(self, path, model):
+        """
+        Метод потоково читает файл и записывает его строки пачками,
+        каждую в своей транзакции. Возвращает число записанных строк.
+        """
+        name = os.path.basename(path)
+        started = time.monotonic()
+        existing = set(model.objects.values_list('pk', flat=True).iterator())
+        unique_keys = self.get_unique_keys(model)
+        inserted, skipped, batch = 0, 0, []
+        with open(path, encoding='utf-8', newline='') as file:
+            reader = csv.DictReader(file)
+            fields = [model._meta.get_field(column)
+                      for column in reader.fieldnames]
+            known = {
+                field.attname: set(
+                    field.related_model.objects.values_list(
+                        'pk', flat=True).iterator())
+                for field in fields if field.is_relation}
+            for line, row in enumerate(reader, start=2):
+                instance = self.build(model, fields, row)
+                if instance.pk in existing:
+                    self.remember_parent(instance)
+                    skipped += 1
+                    continue
+                if any(
+                        getattr(instance, attname) not in ids
+                        for attname, ids in known.items()
+                        if getattr(instance, attname) is not None) or (
+                        self.is_duplicate(instance, unique_keys)):
+                    skipped += 1
+                    continue
+                batch.append(instance)
+                self.remember_parent(instance)
+                if len(batch) >= self.batch_size:
+                    inserted += self.write(model, fields, batch, name, line)
+                    batch = []
+            if batch:
+                inserted += self.write(model, fields, batch, name, line)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(self.style.SUCCESS(
+            f'{name}: загружено {inserted}, пропущено {skipped}, '
+            f'{inserted / elapsed:.0f} строк/с.'))
+        return inserted
+
+    def remember_parent(self, instance):
+        """
+        Метод отмечает произведение отзыва или отзыв комментария,
+        записанного в базу в этом или в прошлом запуске.
+        """
+        if isinstance(instance, Review):
+            self.parents[Review].add(instance.title_id)
+        elif isinstance(instance, Comment):
+            self.parents[Comment].add(instance.review_id)
+
+    @staticmethod
+    def get_unique_keys(model):
+        """
+        Метод собирает значения уникальных наборов полей модели,
+        уже записанные в базу.
+        """
+        keys = []
+        for constraint in model._meta.constraints:
+            if not isinstance(constraint, UniqueConstraint) or (
+                    constraint.condition is not None):
+                continue
+            attnames = tuple(
+                model._meta.get_field(name).attname
+                for name in constraint.fields)
+            keys.append((attnames, set(
+                model.objects.values_list(*attnames).iterator())))
+        return keys
+
+    @staticmethod
+    def is_duplicate(instance, unique_keys):
+        """Метод проверяет строку на повтор и запоминает её значения."""
+        values = [
+            (tuple(getattr(instance, attname) for attname in attnames), seen)
+            for attnames, seen in unique_keys]
+        if any(value in seen for value, seen in values):
+            return True
+        for value, seen in values:
+            seen.add(value)
+        return False
+
+    @staticmethod
+    def build(model, fields, row):
+        values = {}
+        for field in fields:
+            value = row[field.name if field.name in row else field.attname]
+            if value == '' and field.null:
+                values[field.attname] = None
+            elif field.is_relation:
+                values[field.attname] = field.target_field.to_python(value)
+            else:
+                values[field.attname] = field.to_python(value)
+        return model(**values)
+
+    def write(self, model, fields, batch, name, line):
+        """Метод записывает пачку одной транзакцией через COPY или INSERT."""
+        using = router.db_for_write(model)
+        try:
+            with transaction.atomic(using=using):
+                if (self.use_copy
+                        and connections[using].vendor == 'postgresql'):
+                    self.copy(model, batch, using)
+                else:
+                    with keep_values(fields):
+                        model.objects.using(using).bulk_create(batch)
+        except DatabaseError as error:
+            raise CommandError(
+                f'{name}: не удалось записать пачку, заканчивающуюся '
+                f'строкой {line}: {error}. Загруженные пачки сохранены, '
+                f'повторный запуск продолжит с этого места.')
+        return len(batch)
+
+    @staticmethod
+    def copy(model, batch, using):
+        """Метод записывает пачку командой COPY FROM STDIN."""
+        connection = connections[using]
+        fields = model._meta.concrete_fields
+        buffer = StringIO()
+        for instance in batch:
+            buffer.write(','.join(
+                copy_value(field.get_db_prep_save(field.pre_save(
+                    instance, add=getattr(instance, field.attname) is None),
+                    connection=connection))
+                for field in fields))
+            buffer.write('\n')
+        buffer.seek(0)
+        columns = ', '.join(
+            connection.ops.quote_name(field.column) for field in fields)
+        with connection.cursor() as cursor, connection.wrap_database_errors:
+            cursor.copy_expert(
+                f'COPY {connection.ops.quote_name(model._meta.db_table)} '
+                f'({columns}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+    @staticmethod
+    def reset_sequences(models):
+        """Метод сдвигает последовательности ключей за загруженные id."""
+        for model in models:
+            using = router.db_for_write(model)
+            connection = connections[using]
+            statements = connection.ops.sequence_reset_sql(
+                no_style(), [model])
+            if statements:
+                with connection.cursor() as cursor:
+                    for sql in statements:
+                        cursor.execute(sql)
+
+    def update_comment_counts(self):
+        """
+        Метод пересчитывает число комментариев у отзывов из файла
+        комментариев и отмечает их произведения для инвалидации
+        списков отзывов.
+        """
+        review_ids = sorted(self.parents[Comment])
+        for start in range(0, len(review_ids), self.batch_size):
+            reviews = Review.objects.filter(
+                pk__in=review_ids[start:start + self.batch_size])
+            reviews.recalculate_comment_count()
+            self.parents[Review].update(
+                reviews.values_list('title_id', flat=True))
+
+    def update_search_vectors(self):
+        titles = Title.objects.order_by('pk')
+        last_pk = 0
+        while True:
+            batch = list(titles.filter(pk__gt=last_pk).values_list(
+                'pk', flat=True)[:self.batch_size])
+            if not batch:
+                break
+            Title.objects.filter(pk__in=batch).update_search_vector()
+            last_pk = batch[-1]
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from reviews.models import Title
+from reviews.signals import rating_changed
+
+
+class Command(BaseCommand):
+    """Команда пересчёта сохранённых рейтингов произведений."""
+    help = (
+        'Пересчитывает сумму оценок, число отзывов и рейтинг произведений '
+        'по таблице отзывов пачками по первичному ключу.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Число произведений, пересчитываемых в одной транзакции.')
+        parser.add_argument(
+            'ids', nargs='*', type=int,
+            help='Первичные ключи произведений; по умолчанию все.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        titles = Title.objects.order_by('pk')
+        if options['ids']:
+            titles = titles.filter(pk__in=options['ids'])
+        last_pk, updated = 0, 0
+        while True:
+            batch = list(titles.filter(pk__gt=last_pk).values_list(
+                'pk', flat=True)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                updated += Title.objects.filter(
+                    pk__in=batch).recalculate_rating()
+            rating_changed.send(sender=Title, title_ids=batch)
+            last_pk = batch[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитан рейтинг {updated} произведений.'))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from reviews.rankings import refresh_rankings
+
+
+class Command(BaseCommand):
+    """Команда пересчёта таблицы рейтингов произведений."""
+    help = (
+        'Пересчитывает взвешенный рейтинг и популярность произведений, '
+        'изменённых после прошлого запуска; новые отзывы добавляются '
+        'к сохранённой популярности без чтения старых.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Число произведений в одной транзакции; по умолчанию '
+                 'RANKING_BATCH_SIZE.')
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать все произведения по всем отзывам.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а пересчитывать рейтинги постоянно.')
+        parser.add_argument(
+            '--interval', type=float, default=60,
+            help='Пауза между пересчётами в секундах.')
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            refresh = refresh_rankings(options['batch_size'], full=full)
+            self.stdout.write(self.style.SUCCESS(
+                f'Пересчитаны рейтинги {refresh.titles} произведений.'))
+            if not options['loop']:
+                break
+            full = False
+            time.sleep(options['interval'])
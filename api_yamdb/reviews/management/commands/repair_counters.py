@@ -0,0 +1,102 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from reviews.models import SCORES, Comment, Review, Title, get_score_field
+from reviews.signals import comment_count_changed, rating_changed
+
+TITLE_FIELDS = (
+    'pk', 'score_sum', 'review_count',
+    *(get_score_field(score) for score in SCORES))
+
+
+def find_drifted_titles(batch):
+    """
+    Метод возвращает произведения пачки, у которых сумма оценок,
+    число отзывов или гистограмма расходятся с таблицей отзывов.
+    """
+    actual = {pk: Counter() for pk in batch}
+    for title_id, score, total in Review.objects.filter(
+            title_id__in=batch).order_by().values_list(
+            'title_id', 'score').annotate(total=Count('pk')):
+        actual[title_id][score] = total
+    return [
+        stored[0] for stored in Title.objects.filter(
+            pk__in=batch).values_list(*TITLE_FIELDS)
+        if stored[1:] != (
+            sum(score * total for score, total in actual[stored[0]].items()),
+            sum(actual[stored[0]].values()),
+            *(actual[stored[0]][score] for score in SCORES))]
+
+
+def find_drifted_reviews(batch):
+    """
+    Метод возвращает отзывы пачки, у которых число комментариев
+    расходится с таблицей комментариев.
+    """
+    actual = dict(Comment.objects.filter(
+        review_id__in=batch).order_by().values_list('review_id').annotate(
+        total=Count('pk')))
+    return [
+        pk for pk, comment_count in Review.objects.filter(
+            pk__in=batch).values_list('pk', 'comment_count')
+        if comment_count != actual.get(pk, 0)]
+
+
+class Command(BaseCommand):
+    """Команда поиска и исправления расхождений сохранённых счётчиков."""
+    help = (
+        'Сверяет рейтинг и гистограмму оценок произведений и число '
+        'комментариев к отзывам с исходными таблицами пачками '
+        'по первичному ключу и пересчитывает только разошедшиеся строки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Число строк, сверяемых в одной транзакции.')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только сообщить о расхождениях, не исправляя их.')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+        titles = self.repair(Title, find_drifted_titles, self.repair_titles)
+        reviews = self.repair(
+            Review, find_drifted_reviews, self.repair_reviews)
+        verb = 'Найдены' if self.dry_run else 'Исправлены'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} расхождения у {titles} произведений '
+            f'и {reviews} отзывов.'))
+
+    def repair(self, model, find_drifted, fix):
+        """
+        Метод сверяет строки модели пачками и передаёт разошедшиеся
+        в fix. Возвращает число разошедшихся строк.
+        """
+        rows = model.objects.order_by('pk')
+        last_pk, drifted = 0, 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_pk).values_list(
+                'pk', flat=True)[:self.batch_size])
+            if not batch:
+                return drifted
+            with transaction.atomic():
+                stale = find_drifted(batch)
+                if stale and not self.dry_run:
+                    fix(stale)
+            drifted += len(stale)
+            last_pk = batch[-1]
+
+    def repair_titles(self, pks):
+        Title.objects.filter(pk__in=pks).recalculate_rating()
+        transaction.on_commit(lambda: rating_changed.send(
+            sender=Title, title_ids=pks))
+
+    def repair_reviews(self, pks):
+        Review.objects.filter(pk__in=pks).recalculate_comment_count()
+        title_ids = list(Review.objects.filter(pk__in=pks).values_list(
+            'title_id', flat=True).distinct())
+        transaction.on_commit(lambda: comment_count_changed.send(
+            sender=Review, title_ids=title_ids))
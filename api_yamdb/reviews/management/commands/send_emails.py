@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from reviews.outbox import drain
+
+
+class Command(BaseCommand):
+    """Команда отправки писем из очереди исходящих."""
+    help = (
+        'Отправляет накопившиеся письма пачками через одно соединение '
+        'с почтовым сервером, откладывая неудачные с нарастающей задержкой.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Число писем в одной пачке; по умолчанию '
+                 'EMAIL_OUTBOX_BATCH_SIZE.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а опрашивать очередь постоянно.')
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза между опросами очереди в секундах.')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = drain(options['batch_size'])
+            if sent or failed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Отправлено писем: {sent}, отложено: {failed}.'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
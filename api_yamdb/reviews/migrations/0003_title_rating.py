@@ -0,0 +1,53 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:14
+
+from django.db import migrations, models
+from django.db.models import (Count, ExpressionWrapper, FloatField,
+                              OuterRef, Subquery, Sum)
+from django.db.models.functions import Cast, Coalesce
+
+
+def fill_rating(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    reviews = Review.objects.filter(
+        title=OuterRef('pk')).order_by().values('title')
+    Title.objects.update(
+        score_sum=Coalesce(Subquery(
+            reviews.annotate(total=Sum('score')).values('total'),
+            output_field=models.IntegerField()), 0),
+        review_count=Coalesce(Subquery(
+            reviews.annotate(total=Count('pk')).values('total'),
+            output_field=models.IntegerField()), 0),
+        rating=Subquery(
+            reviews.annotate(
+                total=ExpressionWrapper(
+                    Cast(Sum('score'), FloatField()) / Count('pk'),
+                    output_field=FloatField())
+            ).values('total'),
+            output_field=FloatField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_auto_20220705_1807'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='rating',
+            field=models.FloatField(db_index=True, default=None, editable=False, null=True, verbose_name='Рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество отзывов'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок'),
+        ),
+        migrations.RunPython(fill_rating, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:23
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+INDEX_NAME = 'title_search_vector_idx'
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX {INDEX_NAME} ON reviews_title '
+        f'USING gin (search_vector)')
+    apps.get_model('reviews', 'Title').objects.update(search_vector=(
+        SearchVector('name', weight='A', config=settings.SEARCH_CONFIG)
+        + SearchVector(
+            'description', weight='B', config=settings.SEARCH_CONFIG)))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def remove_broken_links(apps, schema_editor):
+    """Связи без жанра или произведения и повторы пар удаляются."""
+    GenreTitle = apps.get_model('reviews', 'GenreTitle')
+    GenreTitle.objects.filter(
+        models.Q(title__isnull=True) | models.Q(genre__isnull=True)).delete()
+    first_links = GenreTitle.objects.values('title', 'genre').annotate(
+        first_id=models.Min('id')).values('first_id')
+    GenreTitle.objects.exclude(id__in=first_links).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_broken_links, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='genretitle',
+            name='genre',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='reviews.Genre'),
+        ),
+        migrations.AlterField(
+            model_name='genretitle',
+            name='title',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='reviews.Title'),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='name',
+            field=models.CharField(db_index=True, max_length=256, verbose_name='Название'),
+        ),
+        migrations.AlterField(
+            model_name='genre',
+            name='name',
+            field=models.CharField(db_index=True, max_length=256, verbose_name='Название'),
+        ),
+        migrations.AddConstraint(
+            model_name='genretitle',
+            constraint=models.UniqueConstraint(fields=('title', 'genre'), name='unique_genre_title'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_index_audit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingRefresh',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(verbose_name='Начало')),
+                ('prior_mean', models.FloatField(verbose_name='Средняя оценка каталога')),
+                ('titles', models.PositiveIntegerField(verbose_name='Пересчитано произведений')),
+            ],
+            options={
+                'verbose_name': 'Пересчёт рейтингов',
+                'verbose_name_plural': 'Пересчёты рейтингов',
+                'ordering': ('-started_at',),
+            },
+        ),
+        migrations.CreateModel(
+            name='TitleRanking',
+            fields=[
+                ('title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='reviews.Title', verbose_name='Произведение')),
+                ('score_sum', models.PositiveIntegerField(default=0, verbose_name='Сумма оценок')),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('last_review_id', models.PositiveIntegerField(default=0, verbose_name='Последний учтённый отзыв')),
+                ('weighted', models.FloatField(default=0, verbose_name='Взвешенный рейтинг')),
+                ('trending', models.FloatField(default=0, verbose_name='Популярность')),
+                ('category', models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reviews.Category', verbose_name='Категория')),
+            ],
+            options={
+                'verbose_name': 'Место в рейтинге',
+                'verbose_name_plural': 'Места в рейтингах',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='titleranking',
+            index=models.Index(condition=models.Q(review_count__gt=0), fields=['-weighted', 'title'], name='ranking_weighted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='titleranking',
+            index=models.Index(condition=models.Q(review_count__gt=0), fields=['-trending', 'title'], name='ranking_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='titleranking',
+            index=models.Index(condition=models.Q(review_count__gt=0), fields=['category', '-weighted', 'title'], name='ranking_category_weighted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='titleranking',
+            index=models.Index(condition=models.Q(review_count__gt=0), fields=['category', '-trending', 'title'], name='ranking_category_trending_idx'),
+        ),
+    ]
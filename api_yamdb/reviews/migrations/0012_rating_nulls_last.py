@@ -0,0 +1,34 @@
+from django.db import migrations
+
+INDEXES = {
+    'postgresql': {
+        'title_rating_desc_idx': '(rating DESC NULLS LAST)',
+    },
+    'sqlite': {
+        'title_rating_nulls_idx': '((rating IS NULL), rating)',
+        'title_rating_desc_idx': '((rating IS NULL), rating DESC)',
+    },
+}
+
+
+def create_rating_indexes(apps, schema_editor):
+    indexes = INDEXES.get(schema_editor.connection.vendor, {})
+    for name, columns in indexes.items():
+        schema_editor.execute(
+            f'CREATE INDEX {name} ON reviews_title {columns}')
+
+
+def drop_rating_indexes(apps, schema_editor):
+    for name in INDEXES.get(schema_editor.connection.vendor, {}):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_score_histogram'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_rating_indexes, drop_rating_indexes),
+    ]
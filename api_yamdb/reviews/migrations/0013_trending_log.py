@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:58
+
+import math
+
+from django.db import migrations, models
+
+
+def convert_trending(apps, schema_editor, convert):
+    TitleRanking = apps.get_model('reviews', 'TitleRanking')
+    rankings = list(TitleRanking.objects.only('trending').iterator())
+    for ranking in rankings:
+        ranking.trending = convert(ranking.trending)
+    TitleRanking.objects.bulk_update(rankings, ['trending'], batch_size=1000)
+
+
+def to_log(apps, schema_editor):
+    convert_trending(
+        apps, schema_editor,
+        lambda value: math.log2(value) if value > 0 else -math.inf)
+
+
+def from_log(apps, schema_editor):
+    convert_trending(apps, schema_editor, lambda value: 2 ** value)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_rating_nulls_last'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='titleranking',
+            name='trending',
+            field=models.FloatField(default=float("-inf"), verbose_name='Популярность'),
+        ),
+        migrations.RunPython(to_log, from_log),
+    ]
@@ -1,10 +1,15 @@
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models.functions import Cast, Coalesce, Greatest, Now, NullIf
+from django.utils import timezone
 
 from .validators import validate_username, validate_year
 
+SCORES = range(1, 11)
+
 
 class User(AbstractUser):
     """Класс модели пользователя."""
@@ -32,6 +37,10 @@ class User(AbstractUser):
     confirmation_code = models.CharField(
         'Код подтверждения', blank=True, null=True, default=None,
         max_length=settings.CODE_LENGTH)
+    token_version = models.PositiveIntegerField(
+        'Версия токенов', default=0, editable=False)
+
+    ACCESS_FIELDS = ('role', 'is_staff', 'is_active', )
 
     class Meta:
         ordering = ('username', )
@@ -54,7 +63,7 @@ class User(AbstractUser):
 
 class BaseSection(models.Model):
     """Базовый класс для моделей категория и жанр."""
-    name = models.CharField('Название', max_length=256)
+    name = models.CharField('Название', max_length=256, db_index=True)
     slug = models.SlugField(unique=True, max_length=50)
 
     class Meta:
@@ -81,8 +90,112 @@ class Genre(BaseSection):
         verbose_name_plural = 'Жанры'
 
 
-class Title(models.Model):
+def get_score_field(score):
+    """Метод возвращает имя столбца гистограммы для оценки."""
+    return f'score_{score}'
+
+
+def score_count_field(score):
+    return models.PositiveIntegerField(
+        f'Число оценок {score}', default=0, editable=False)
+
+
+def average_rating(score_sum, review_count):
+    """Выражение среднего рейтинга, NULL для произведений без отзывов."""
+    return models.ExpressionWrapper(
+        Cast(score_sum, models.FloatField())
+        / NullIf(review_count, models.Value(0)),
+        output_field=models.FloatField())
+
+
+class TitleQuerySet(models.QuerySet):
+    """Класс набора запросов для модели произведение."""
+
+    def shift_rating(self, added=None, removed=None):
+        """
+        Метод атомарно добавляет оценку added и убирает оценку removed:
+        сдвигает сумму оценок, число отзывов и столбцы гистограммы
+        и пересчитывает средний рейтинг.
+        """
+        score_sum = models.F('score_sum')
+        review_count = models.F('review_count')
+        histogram = {}
+        for score, count in ((added, 1), (removed, -1)):
+            if score is None:
+                continue
+            field = get_score_field(score)
+            score_sum += score * count
+            review_count += count
+            histogram[field] = histogram.get(field, models.F(field)) + count
+        return self.update(
+            score_sum=score_sum, review_count=review_count,
+            rating=average_rating(score_sum, review_count), updated_at=Now(),
+            **histogram)
+
+    def recalculate_rating(self):
+        """
+        Метод пересчитывает агрегаты рейтинга и гистограмму оценок
+        по таблице отзывов.
+        """
+        reviews = Review.objects.filter(
+            title=models.OuterRef('pk')).order_by().values('title')
+        score_sum = Coalesce(models.Subquery(
+            reviews.annotate(total=models.Sum('score')).values('total'),
+            output_field=models.IntegerField()), 0)
+        review_count = Coalesce(models.Subquery(
+            reviews.annotate(total=models.Count('pk')).values('total'),
+            output_field=models.IntegerField()), 0)
+        histogram = {
+            get_score_field(score): Coalesce(models.Subquery(
+                reviews.filter(score=score).annotate(
+                    total=models.Count('pk')).values('total'),
+                output_field=models.IntegerField()), 0)
+            for score in SCORES}
+        return self.update(
+            score_sum=score_sum, review_count=review_count,
+            rating=average_rating(score_sum, review_count), updated_at=Now(),
+            **histogram)
+
+    def update_search_vector(self):
+        """
+        Метод пересчитывает поисковый вектор по названию и описанию.
+        Вектор хранится только в PostgreSQL, для других СУБД
+        используется индекс в памяти из reviews.search.
+        """
+        if connections[self.db].vendor != 'postgresql':
+            return 0
+        return self.update(search_vector=(
+            SearchVector(
+                'name', weight='A', config=settings.SEARCH_CONFIG)
+            + SearchVector(
+                'description', weight='B', config=settings.SEARCH_CONFIG)))
+
+
+class DerivedFieldsModel(models.Model):
+    """
+    Базовый класс моделей с полями, которые обновляются только
+    сигналами: при изменении объекта они не перезаписываются.
+    """
+    DERIVED_FIELDS = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.DERIVED_FIELDS]
+        super().save(*args, **kwargs)
+
+
+class Title(DerivedFieldsModel):
     """Класс модели произведение."""
+    DERIVED_FIELDS = (
+        'score_sum', 'review_count', 'rating', 'search_vector',
+        *(get_score_field(score) for score in SCORES))
+
     name = models.CharField('Название произведения', max_length=256)
     year = models.IntegerField('Год выпуска', validators=[validate_year, ])
     genre = models.ManyToManyField(Genre, through='GenreTitle')
@@ -90,15 +203,44 @@ class Title(models.Model):
         Category, on_delete=models.SET_NULL, related_name='titles',
         null=True, verbose_name='Категория')
     description = models.TextField('Описание', blank=True, null=True)
+    score_sum = models.PositiveIntegerField(
+        'Сумма оценок', default=0, editable=False)
+    review_count = models.PositiveIntegerField(
+        'Количество отзывов', default=0, editable=False)
+    rating = models.FloatField(
+        'Рейтинг', null=True, default=None, editable=False, db_index=True)
+    score_1 = score_count_field(1)
+    score_2 = score_count_field(2)
+    score_3 = score_count_field(3)
+    score_4 = score_count_field(4)
+    score_5 = score_count_field(5)
+    score_6 = score_count_field(6)
+    score_7 = score_count_field(7)
+    score_8 = score_count_field(8)
+    score_9 = score_count_field(9)
+    score_10 = score_count_field(10)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
+    search_vector = SearchVectorField(
+        'Поисковый вектор', null=True, editable=False)
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         ordering = ('-year', 'name', )
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
+        indexes = [
+            models.Index(
+                fields=('-year', 'name', 'id', ), name='title_year_name_idx')]
 
     def __str__(self):
         return self.name
 
+    @property
+    def score_histogram(self):
+        """Метод возвращает число оценок от 1 до 10 списком."""
+        return [getattr(self, get_score_field(score)) for score in SCORES]
+
     def get_genres(self):
         return '\n'.join([g.name for g in self.genre.all()])
 
@@ -108,24 +250,52 @@ class Title(models.Model):
 class GenreTitle(models.Model):
     """Класс модели связи между произведениями и жанрами."""
 
-    genre = models.ForeignKey(Genre, on_delete=models.SET_NULL, null=True)
-    title = models.ForeignKey(Title, on_delete=models.SET_NULL, null=True)
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE)
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE, db_index=False)
 
     class Meta:
         verbose_name = 'Жанры произведений'
         verbose_name_plural = 'Жанры произведений'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('title', 'genre', ), name='unique_genre_title')]
 
     def __str__(self):
         return f'Жанр произведения {self.title} - {self.genre}.'
 
 
-class BasePost(models.Model):
+class ReviewQuerySet(models.QuerySet):
+    """Класс набора запросов для модели отзыв."""
+
+    def shift_comment_count(self, count):
+        """
+        Метод атомарно сдвигает число комментариев к отзывам; разошедшийся
+        счётчик не уходит ниже нуля.
+        """
+        return self.update(
+            comment_count=Greatest(models.F('comment_count') + count, 0),
+            updated_at=Now())
+
+    def recalculate_comment_count(self):
+        """Метод пересчитывает число комментариев по их таблице."""
+        comments = Comment.objects.filter(
+            review=models.OuterRef('pk')).order_by().values('review')
+        return self.update(comment_count=Coalesce(models.Subquery(
+            comments.annotate(total=models.Count('pk')).values('total'),
+            output_field=models.IntegerField()), 0), updated_at=Now())
+
+
+class BasePost(DerivedFieldsModel):
     """Базовый класс для моделей отзыв и комментарий."""
+    TRACKED_FIELDS = ()
+
     text = models.TextField('Текст')
     author = models.ForeignKey(
         User, on_delete=models.CASCADE,
         related_name='%(class)ss', verbose_name='Автор')
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         ordering = ('-pub_date', )
@@ -134,15 +304,37 @@ class BasePost(models.Model):
     def __str__(self):
         return self.text[:30]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Метод запоминает загруженные из базы значения TRACKED_FIELDS,
+        чтобы сигналы могли посчитать приращение счётчиков.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance.remember_tracked()
+        return instance
+
+    def remember_tracked(self):
+        """Метод сохраняет текущие значения отслеживаемых полей."""
+        self._tracked = {
+            field: self.__dict__.get(field) for field in self.TRACKED_FIELDS}
+
 
 class Review(BasePost):
     """Класс модели отзыв."""
+    TRACKED_FIELDS = ('score', 'title_id', )
+    DERIVED_FIELDS = ('comment_count', )
+
     score = models.IntegerField(
         default=0, validators=[MaxValueValidator(10), MinValueValidator(1)],
         verbose_name='Оценка')
     title = models.ForeignKey(
         Title, on_delete=models.CASCADE,
         related_name='reviews', verbose_name='Произведение')
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев', default=0, editable=False)
+
+    objects = ReviewQuerySet.as_manager()
 
     class Meta(BasePost.Meta):
         verbose_name = 'Отзыв'
@@ -150,10 +342,16 @@ class Review(BasePost):
         constraints = [
             models.UniqueConstraint(
                 fields=('author', 'title', ), name='unique_title_review')]
+        indexes = [
+            models.Index(
+                fields=('title', '-pub_date', 'id', ),
+                name='review_title_pub_date_idx')]
 
 
 class Comment(BasePost):
     """Класс модели комментарий."""
+    TRACKED_FIELDS = ('review_id', )
+
     review = models.ForeignKey(
         Review, on_delete=models.CASCADE,
         related_name='comments', verbose_name='Отзыв')
@@ -161,3 +359,98 @@ class Comment(BasePost):
     class Meta(BasePost.Meta):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=('review', '-pub_date', 'id', ),
+                name='comment_review_pub_date_idx')]
+
+
+class TitleRanking(models.Model):
+    """
+    Класс модели предрасчитанного места произведения в рейтингах.
+    Строки пересчитываются командой refresh_rankings; в рейтинги
+    попадают только произведения с отзывами.
+    """
+    title = models.OneToOneField(
+        Title, on_delete=models.CASCADE, primary_key=True,
+        related_name='ranking', verbose_name='Произведение')
+    category = models.ForeignKey(
+        Category, on_delete=models.SET_NULL, null=True, db_index=False,
+        related_name='+', verbose_name='Категория')
+    score_sum = models.PositiveIntegerField('Сумма оценок', default=0)
+    review_count = models.PositiveIntegerField(
+        'Количество отзывов', default=0)
+    last_review_id = models.PositiveIntegerField(
+        'Последний учтённый отзыв', default=0)
+    weighted = models.FloatField('Взвешенный рейтинг', default=0)
+    trending = models.FloatField('Популярность', default=float('-inf'))
+
+    class Meta:
+        verbose_name = 'Место в рейтинге'
+        verbose_name_plural = 'Места в рейтингах'
+        indexes = [
+            models.Index(
+                fields=('-weighted', 'title', ), name='ranking_weighted_idx',
+                condition=models.Q(review_count__gt=0)),
+            models.Index(
+                fields=('-trending', 'title', ), name='ranking_trending_idx',
+                condition=models.Q(review_count__gt=0)),
+            models.Index(
+                fields=('category', '-weighted', 'title', ),
+                name='ranking_category_weighted_idx',
+                condition=models.Q(review_count__gt=0)),
+            models.Index(
+                fields=('category', '-trending', 'title', ),
+                name='ranking_category_trending_idx',
+                condition=models.Q(review_count__gt=0))]
+
+    def __str__(self):
+        return f'Рейтинг произведения {self.title_id}'
+
+
+class RankingRefresh(models.Model):
+    """
+    Класс модели запуска пересчёта рейтингов. Начало последнего
+    запуска отмечает, с какого момента искать изменения.
+    """
+    started_at = models.DateTimeField('Начало')
+    prior_mean = models.FloatField('Средняя оценка каталога')
+    titles = models.PositiveIntegerField('Пересчитано произведений')
+
+    class Meta:
+        ordering = ('-started_at', )
+        verbose_name = 'Пересчёт рейтингов'
+        verbose_name_plural = 'Пересчёты рейтингов'
+
+    def __str__(self):
+        return f'Пересчёт рейтингов {self.started_at}'
+
+
+class OutgoingEmail(models.Model):
+    """
+    Класс модели исходящего письма.
+    Письма записываются в одной транзакции с изменением, которое
+    их порождает, и отправляются пачками из reviews.outbox.
+    """
+    recipient = models.EmailField(
+        'Получатель', max_length=settings.EMAIL_LENGTH)
+    subject = models.CharField('Тема', max_length=256)
+    body = models.TextField('Текст')
+    created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+    send_after = models.DateTimeField(
+        'Отправить после', default=timezone.now)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    sent_at = models.DateTimeField('Дата отправки', null=True, blank=True)
+    error = models.TextField('Последняя ошибка', blank=True, default='')
+
+    class Meta:
+        ordering = ('send_after', 'id', )
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = [
+            models.Index(
+                fields=('send_after', 'id', ), name='email_pending_idx',
+                condition=models.Q(sent_at__isnull=True))]
+
+    def __str__(self):
+        return f'{self.subject} для {self.recipient}'
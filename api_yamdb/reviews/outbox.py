@@ -0,0 +1,168 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+executor = None
+executor_lock = threading.Lock()
+retry_timer = None
+retry_at = None
+
+
+def enqueue_email(recipient, subject, body):
+    """
+    Метод ставит письмо в очередь в текущей транзакции;
+    после её фиксации очередь разбирается фоновым потоком.
+    """
+    OutgoingEmail.objects.create(
+        recipient=recipient, subject=subject, body=body)
+    transaction.on_commit(wake)
+
+
+def get_retry_delay(attempts):
+    """Метод возвращает экспоненциальную задержку перед повтором."""
+    return timedelta(
+        seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def postpone(email, error, now):
+    """Метод откладывает неотправленное письмо до следующей попытки."""
+    logger.warning('Не удалось отправить письмо %s: %s', email.pk, error)
+    email.attempts += 1
+    email.send_after = now + get_retry_delay(email.attempts)
+    email.error = str(error)
+
+
+def send_batch(batch, connection, now):
+    """
+    Метод отправляет письма пачки через одно открытое соединение
+    и возвращает число отправленных; остальные откладываются.
+    """
+    try:
+        connection.open()
+    except Exception as error:
+        for email in batch:
+            postpone(email, error, now)
+        return 0
+    sent = 0
+    try:
+        for email in batch:
+            try:
+                EmailMessage(
+                    email.subject, email.body, settings.EMAIL_HOST_USER,
+                    (email.recipient, ), connection=connection).send()
+            except Exception as error:
+                postpone(email, error, now)
+            else:
+                email.sent_at = timezone.now()
+                email.error = ''
+                sent += 1
+    finally:
+        connection.close()
+    return sent
+
+
+def deliver(batch_size=None, connection=None):
+    """
+    Метод отправляет одну пачку готовых к отправке писем через одно
+    соединение с почтовым сервером и возвращает пару (отправлено,
+    отложено). Строки пачки блокируются, параллельные обработчики
+    пропускают их и берут следующие.
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    now = timezone.now()
+    with transaction.atomic():
+        pending = OutgoingEmail.objects.filter(
+            sent_at__isnull=True, send_after__lte=now,
+            attempts__lt=settings.EMAIL_OUTBOX_MAX_ATTEMPTS)
+        skip_locked = connections[
+            pending.db].features.has_select_for_update_skip_locked
+        batch = list(pending.select_for_update(
+            skip_locked=skip_locked)[:batch_size])
+        if not batch:
+            return 0, 0
+        sent = send_batch(
+            batch, connection or get_connection(fail_silently=False), now)
+        OutgoingEmail.objects.bulk_update(
+            batch, ('attempts', 'send_after', 'sent_at', 'error', ))
+    return sent, len(batch) - sent
+
+
+def drain(batch_size=None, connection=None):
+    """Метод отправляет пачки писем, пока готовые к отправке не кончатся."""
+    total_sent, total_failed = 0, 0
+    while True:
+        sent, failed = deliver(batch_size, connection)
+        if not sent and not failed:
+            return total_sent, total_failed
+        total_sent += sent
+        total_failed += failed
+
+
+def get_next_attempt():
+    """Метод возвращает время ближайшей попытки отправить письмо."""
+    return OutgoingEmail.objects.filter(
+        sent_at__isnull=True,
+        attempts__lt=settings.EMAIL_OUTBOX_MAX_ATTEMPTS).order_by(
+        'send_after').values_list('send_after', flat=True).first()
+
+
+def schedule_retry():
+    """
+    Метод заводит таймер, который разбудит очередь к ближайшей
+    отложенной попытке, чтобы повтор не ждал новой регистрации.
+    Таймер один на процесс и переставляется только на более раннее
+    время; письма, занятые другим обработчиком, проверяются не чаще
+    раза в секунду.
+    """
+    global retry_timer, retry_at
+    send_after = get_next_attempt()
+    if send_after is None:
+        return
+    with executor_lock:
+        if retry_timer is not None and retry_timer.is_alive() and (
+                retry_at <= send_after):
+            return
+        if retry_timer is not None:
+            retry_timer.cancel()
+        delay = max((send_after - timezone.now()).total_seconds(), 1)
+        retry_timer = threading.Timer(delay, wake)
+        retry_timer.daemon = True
+        retry_timer.start()
+        retry_at = send_after
+
+
+def drain_in_background():
+    close_old_connections()
+    try:
+        drain()
+        schedule_retry()
+    except Exception:
+        logger.exception('Ошибка при разборе очереди писем')
+    finally:
+        connections.close_all()
+
+
+def wake():
+    """
+    Метод запускает разбор очереди в пуле из EMAIL_OUTBOX_WORKERS потоков;
+    при нуле письма отправляет только команда send_emails.
+    """
+    global executor
+    if not settings.EMAIL_OUTBOX_WORKERS:
+        return
+    with executor_lock:
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=settings.EMAIL_OUTBOX_WORKERS,
+                thread_name_prefix='email-outbox')
+    executor.submit(drain_in_background)
@@ -0,0 +1,43 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """
+    Метод возвращает оценку числа строк запроса по плану PostgreSQL
+    или None, если база данных не умеет давать такую оценку.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Класс пагинатора больших таблиц: если планировщик оценивает выборку
+    больше чем в PAGINATION_COUNT_ESTIMATE_THRESHOLD строк, число
+    страниц считается по оценке, а не по COUNT(*).
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and (
+                estimate >= settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD):
+            return estimate
+        return super().count
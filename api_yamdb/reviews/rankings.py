@@ -0,0 +1,197 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import RankingRefresh, Review, Title, TitleRanking
+from .signals import rankings_refreshed
+
+RANKED_FIELDS = (
+    'category_id', 'score_sum', 'review_count', 'last_review_id',
+    'weighted', 'trending', )
+FRESH_CHUNK_SIZE = 100
+
+
+def get_contribution(score, pub_date):
+    """
+    Метод возвращает двоичный логарифм вклада оценки в популярность
+    в масштабе RANKING_EPOCH: вклад удваивается каждые
+    RANKING_HALF_LIFE секунд, а логарифм растёт линейно и не
+    переполняется. Старые вклады не пересчитываются, а порядок
+    произведений от момента пересчёта не зависит.
+    """
+    age = (pub_date - settings.RANKING_EPOCH).total_seconds()
+    return math.log2(score) + age / settings.RANKING_HALF_LIFE
+
+
+def add_contributions(trending, contributions):
+    """
+    Метод складывает вклады, заданные логарифмами, и возвращает
+    логарифм суммы; степени считаются от наибольшего слагаемого.
+    """
+    values = [value for value in (trending, *contributions)
+              if value != -math.inf]
+    if not values:
+        return -math.inf
+    top = max(values)
+    return top + math.log2(sum(2 ** (value - top) for value in values))
+
+
+def get_current_trending(trending, now=None):
+    """Метод переводит логарифм популярности в значение на текущий момент."""
+    age = ((now or timezone.now()) - settings.RANKING_EPOCH).total_seconds()
+    return 2 ** (trending - age / settings.RANKING_HALF_LIFE)
+
+
+def get_weighted(score_sum, review_count, prior_mean):
+    """
+    Метод возвращает байесовскую оценку: среднее произведения,
+    к которому добавлено RANKING_MIN_REVIEWS оценок, равных средней
+    по каталогу. Немногочисленные отзывы не выводят произведение вверх.
+    """
+    weight = settings.RANKING_MIN_REVIEWS
+    return (score_sum + weight * prior_mean) / (review_count + weight)
+
+
+def weighted_expression(prior_mean):
+    weight = settings.RANKING_MIN_REVIEWS
+    return models.ExpressionWrapper(
+        (Cast('score_sum', models.FloatField()) + weight * prior_mean)
+        / (models.F('review_count') + weight),
+        output_field=models.FloatField())
+
+
+def get_prior_mean():
+    """Метод возвращает среднюю оценку по сохранённым агрегатам каталога."""
+    totals = Title.objects.aggregate(
+        score_sum=models.Sum('score_sum'),
+        review_count=models.Sum('review_count'))
+    if not totals['review_count']:
+        return 0.0
+    return totals['score_sum'] / totals['review_count']
+
+
+def group_reviews(reviews):
+    grouped = defaultdict(list)
+    for title_id, pk, score, pub_date in reviews.values_list(
+            'title_id', 'pk', 'score', 'pub_date'):
+        grouped[title_id].append((pk, score, pub_date))
+    return grouped
+
+
+def apply_reviews(ranking, reviews):
+    ranking.trending = add_contributions(ranking.trending, [
+        get_contribution(score, pub_date) for _, score, pub_date in reviews])
+    ranking.last_review_id = max(
+        [ranking.last_review_id, *(pk for pk, _, _ in reviews)])
+
+
+def is_consistent(ranking, title, reviews):
+    """
+    Метод проверяет, что строка рейтинга вместе с новыми отзывами
+    сходится с агрегатами произведения.
+    """
+    return (
+        ranking.review_count + len(reviews) == title['review_count']
+        and ranking.score_sum + sum(
+            score for _, score, _ in reviews) == title['score_sum'])
+
+
+def get_fresh_reviews(titles, rankings):
+    """
+    Метод читает отзывы произведений пачки после last_review_id.
+    Условия собираются по FRESH_CHUNK_SIZE произведений: длинная
+    цепочка OR превышает глубину выражения SQLite.
+    """
+    fresh = defaultdict(list)
+    for start in range(0, len(titles), FRESH_CHUNK_SIZE):
+        fresh.update(group_reviews(Review.objects.filter(reduce(or_, (
+            models.Q(title_id=title['pk'], pk__gt=getattr(
+                rankings.get(title['pk']), 'last_review_id', 0))
+            for title in titles[start:start + FRESH_CHUNK_SIZE])))))
+    return fresh
+
+
+def refresh_batch(titles, prior_mean, rebuild=False):
+    """
+    Метод пересчитывает места произведений пачки. Популярность
+    дополняется вкладами отзывов после last_review_id; если суммы
+    не сходятся с агрегатами произведения (отзыв изменён или удалён)
+    или передан rebuild, она пересчитывается по всем отзывам
+    произведения.
+    """
+    rankings = TitleRanking.objects.in_bulk([title['pk'] for title in titles])
+    fresh = defaultdict(list)
+    if not rebuild:
+        fresh = get_fresh_reviews(titles, rankings)
+    stale = []
+    for title in titles:
+        ranking = rankings.get(title['pk'])
+        if ranking is None:
+            ranking = rankings[title['pk']] = TitleRanking(
+                title_id=title['pk'])
+        reviews = fresh[title['pk']]
+        if not rebuild and is_consistent(ranking, title, reviews):
+            apply_reviews(ranking, reviews)
+        else:
+            stale.append(ranking)
+        ranking.category_id = title['category_id']
+        ranking.score_sum = title['score_sum']
+        ranking.review_count = title['review_count']
+        ranking.weighted = get_weighted(
+            title['score_sum'], title['review_count'], prior_mean)
+    if stale:
+        everything = group_reviews(Review.objects.filter(
+            title_id__in=[ranking.title_id for ranking in stale]))
+        for ranking in stale:
+            ranking.trending, ranking.last_review_id = -math.inf, 0
+            apply_reviews(ranking, everything[ranking.title_id])
+    TitleRanking.objects.bulk_create(
+        ranking for ranking in rankings.values() if ranking._state.adding)
+    TitleRanking.objects.bulk_update(
+        [ranking for ranking in rankings.values()
+         if not ranking._state.adding], RANKED_FIELDS)
+
+
+def refresh_rankings(batch_size=None, full=False):
+    """
+    Метод пересчитывает рейтинги произведений, изменённых после
+    начала прошлого запуска (с запасом RANKING_REFRESH_OVERLAP секунд
+    на долгие транзакции). Сдвиг средней оценки каталога больше
+    RANKING_PRIOR_TOLERANCE пересчитывает взвешенный рейтинг всех
+    строк одним UPDATE без чтения отзывов. При full пересчитываются
+    все произведения по всем отзывам.
+    """
+    batch_size = batch_size or settings.RANKING_BATCH_SIZE
+    started_at = timezone.now()
+    last = None if full else RankingRefresh.objects.first()
+    prior_mean = get_prior_mean()
+    titles = Title.objects.order_by('pk')
+    if last is not None:
+        titles = titles.filter(updated_at__gte=last.started_at - timedelta(
+            seconds=settings.RANKING_REFRESH_OVERLAP))
+        if abs(prior_mean - last.prior_mean) <= (
+                settings.RANKING_PRIOR_TOLERANCE):
+            prior_mean = last.prior_mean
+        else:
+            TitleRanking.objects.update(
+                weighted=weighted_expression(prior_mean))
+    last_pk, refreshed = 0, 0
+    while True:
+        batch = list(titles.filter(pk__gt=last_pk).values(
+            'pk', 'category_id', 'score_sum', 'review_count')[:batch_size])
+        if not batch:
+            break
+        with transaction.atomic():
+            refresh_batch(batch, prior_mean, rebuild=full)
+        refreshed += len(batch)
+        last_pk = batch[-1]['pk']
+    rankings_refreshed.send(sender=TitleRanking)
+    return RankingRefresh.objects.create(
+        started_at=started_at, prior_mean=prior_mean, titles=refreshed)
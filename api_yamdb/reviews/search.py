@@ -0,0 +1,116 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import Title
+from .versions import get_versions
+
+TOKEN_PATTERN = re.compile(r'\w+')
+NAME_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+
+
+def tokenize(text):
+    """Метод разбивает текст на слова в нижнем регистре."""
+    return TOKEN_PATTERN.findall((text or '').lower())
+
+
+class InvertedIndex:
+    """
+    Класс инвертированного индекса произведений в памяти процесса.
+
+    Используется вместо поискового вектора, когда база данных
+    не PostgreSQL. Индекс перестраивается, если версия модели
+    произведения изменилась после его построения.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.state = ({}, [])
+
+    def build(self, queryset):
+        """Метод строит словарь вхождений и отсортированный список слов."""
+        postings = defaultdict(lambda: defaultdict(int))
+        for pk, name, description in queryset.values_list(
+                'pk', 'name', 'description').order_by().iterator():
+            for token in tokenize(name):
+                postings[token][pk] += NAME_WEIGHT
+            for token in tokenize(description):
+                postings[token][pk] += DESCRIPTION_WEIGHT
+        postings = {token: dict(ids) for token, ids in postings.items()}
+        return postings, sorted(postings)
+
+    def refresh(self):
+        version = get_versions(Title)[0]
+        with self.lock:
+            if version != self.version:
+                self.state = self.build(Title.objects.all())
+                self.version = version
+        return self.state
+
+    @staticmethod
+    def match_prefix(state, term):
+        """Метод объединяет вхождения всех слов, начинающихся с term."""
+        postings, tokens = state
+        scores = defaultdict(int)
+        position = bisect_left(tokens, term)
+        while position < len(tokens) and tokens[position].startswith(term):
+            for pk, weight in postings[tokens[position]].items():
+                scores[pk] += weight
+            position += 1
+        return scores
+
+    def search(self, terms):
+        """
+        Метод возвращает словарь {pk: ранг} произведений,
+        содержащих все слова запроса как префиксы.
+        """
+        state = self.refresh()
+        result = None
+        for term in terms:
+            scores = self.match_prefix(state, term)
+            if result is None:
+                result = scores
+            else:
+                result = {
+                    pk: result[pk] + weight
+                    for pk, weight in scores.items() if pk in result}
+        return result or {}
+
+
+title_index = InvertedIndex()
+
+
+def search_titles(queryset, text, ranked=True):
+    """
+    Метод фильтрует произведения по словам запроса без учёта регистра,
+    сопоставляя каждое слово как префикс, и при ranked=True
+    сортирует их по убыванию релевантности.
+    """
+    terms = tokenize(text)
+    if not terms:
+        return queryset
+    if connections[queryset.db].vendor == 'postgresql':
+        query = SearchQuery(
+            ' & '.join(f'{term}:*' for term in terms),
+            search_type='raw', config=settings.SEARCH_CONFIG)
+        queryset = queryset.filter(search_vector=query)
+        rank = SearchRank(F('search_vector'), query)
+    else:
+        scores = title_index.search(terms)
+        queryset = queryset.filter(pk__in=scores)
+        rank = Case(
+            *(When(pk=pk, then=Value(score))
+              for pk, score in scores.items()),
+            default=Value(0), output_field=IntegerField())
+    if not ranked:
+        return queryset
+    return queryset.annotate(rank=rank).order_by(
+        '-rank', *Title._meta.ordering)
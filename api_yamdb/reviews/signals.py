@@ -0,0 +1,191 @@
+import threading
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import Signal, receiver
+
+from .models import Comment, Review, Title, User
+
+rating_changed = Signal(providing_args=['title_ids'])
+comment_count_changed = Signal(providing_args=['title_ids'])
+data_imported = Signal(
+    providing_args=['models', 'title_ids', 'review_ids'])
+rankings_refreshed = Signal()
+
+deletion = threading.local()
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, raw=False, **kwargs):
+    """Обработчик сдвигает рейтинг произведения при сохранении отзыва."""
+    if raw:
+        return
+    tracked = getattr(instance, '_tracked', None)
+    title_ids = [instance.title_id]
+    if created:
+        Title.objects.filter(pk=instance.title_id).shift_rating(
+            added=instance.score)
+    elif tracked is None or None in tracked.values():
+        Title.objects.filter(pk=instance.title_id).recalculate_rating()
+    elif tracked['title_id'] != instance.title_id:
+        Title.objects.filter(pk=tracked['title_id']).shift_rating(
+            removed=tracked['score'])
+        Title.objects.filter(pk=instance.title_id).shift_rating(
+            added=instance.score)
+        title_ids.append(tracked['title_id'])
+    elif tracked['score'] != instance.score:
+        Title.objects.filter(pk=instance.title_id).shift_rating(
+            added=instance.score, removed=tracked['score'])
+    else:
+        title_ids = []
+    instance.remember_tracked()
+    if title_ids:
+        rating_changed.send(sender=Title, title_ids=title_ids)
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    """
+    Обработчик вычитает оценку удалённого отзыва из рейтинга, в том числе
+    при каскадном удалении вместе с пользователем или произведением.
+    """
+    tracked = getattr(instance, '_tracked', None) or {
+        'score': instance.score, 'title_id': instance.title_id}
+    Title.objects.filter(pk=tracked['title_id']).shift_rating(
+        removed=tracked['score'])
+    rating_changed.send(sender=Title, title_ids=[tracked['title_id']])
+
+
+def get_title_ids(comment, review_ids):
+    """
+    Метод возвращает произведения отзывов; отзыв, уже загруженный
+    вместе с комментарием, повторно не запрашивается.
+    """
+    if review_ids == [comment.review_id] and Comment.review.is_cached(
+            comment):
+        return [comment.review.title_id]
+    return list(Review.objects.filter(pk__in=review_ids).values_list(
+        'title_id', flat=True))
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_count_on_save(sender, instance, created, raw=False,
+                                 **kwargs):
+    """Обработчик сдвигает число комментариев отзыва при сохранении."""
+    if raw:
+        return
+    tracked = getattr(instance, '_tracked', None)
+    review_ids = [instance.review_id]
+    if created:
+        Review.objects.filter(pk=instance.review_id).shift_comment_count(1)
+    elif tracked is None or tracked['review_id'] is None:
+        Review.objects.filter(
+            pk=instance.review_id).recalculate_comment_count()
+    elif tracked['review_id'] != instance.review_id:
+        Review.objects.filter(pk=tracked['review_id']).shift_comment_count(-1)
+        Review.objects.filter(pk=instance.review_id).shift_comment_count(1)
+        review_ids.append(tracked['review_id'])
+    else:
+        review_ids = []
+    instance.remember_tracked()
+    if review_ids:
+        comment_count_changed.send(
+            sender=Review, title_ids=get_title_ids(instance, review_ids))
+
+
+def is_rolled_back(state):
+    """
+    Метод проверяет, что транзакция удаления, заведшего состояние,
+    откатилась: откат выбрасывает её отложенные on_commit вызовы.
+    """
+    return not any(
+        func is state.marker
+        for _, func in transaction.get_connection().run_on_commit)
+
+
+def get_deletion():
+    """
+    Метод возвращает состояние текущего удаления в потоке: удаляемые
+    отзывы и число удаляемых комментариев по отзывам. Состояние
+    заводится заново первым pre_delete после сдвига счётчиков или
+    после удаления, упавшего до сдвига, чтобы его остатки не
+    уменьшили счётчики чужих отзывов.
+    """
+    if getattr(deletion, 'flushed', True) or is_rolled_back(deletion):
+        deletion.flushed = False
+        deletion.reviews = set()
+        deletion.comments = Counter()
+        deletion.marker = lambda: None
+        transaction.on_commit(deletion.marker)
+    return deletion
+
+
+@receiver(pre_delete, sender=Review)
+def remember_deleted_review(sender, instance, **kwargs):
+    """Обработчик отмечает отзыв, удаляемый вместе с комментариями."""
+    get_deletion().reviews.add(instance.pk)
+
+
+@receiver(post_delete, sender=Review)
+def finish_review_deletion(sender, **kwargs):
+    """
+    Обработчик закрывает состояние удаления: комментарии удаляются
+    раньше своих отзывов.
+    """
+    deletion.flushed = True
+
+
+@receiver(pre_delete, sender=Comment)
+def remember_deleted_comment(sender, instance, **kwargs):
+    review_id = (getattr(instance, '_tracked', None) or {}).get(
+        'review_id') or instance.review_id
+    get_deletion().comments[review_id] += 1
+
+
+@receiver(post_delete, sender=Comment)
+def update_comment_count_on_delete(sender, instance, **kwargs):
+    """
+    Обработчик уменьшает число комментариев отзывов один раз на всё
+    удаление: Django отправляет pre_delete всех объектов до первого
+    post_delete. Отзывы, удаляемые вместе с комментариями, пропускаются,
+    остальные сдвигаются одним UPDATE на каждое значение сдвига.
+    """
+    if getattr(deletion, 'flushed', True):
+        return
+    deletion.flushed = True
+    shifts = defaultdict(list)
+    for review_id, count in deletion.comments.items():
+        if review_id not in deletion.reviews:
+            shifts[count].append(review_id)
+    if not shifts:
+        return
+    for count, review_ids in shifts.items():
+        Review.objects.filter(pk__in=review_ids).shift_comment_count(-count)
+    comment_count_changed.send(sender=Review, title_ids=get_title_ids(
+        instance, [pk for review_ids in shifts.values() for pk in review_ids]))
+
+
+@receiver(post_save, sender=Title)
+def update_search_vector(sender, instance, update_fields=None, **kwargs):
+    """Обработчик обновляет поисковый вектор изменённого произведения."""
+    if update_fields is None or {'name', 'description'} & set(update_fields):
+        Title.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(pre_save, sender=User)
+def revoke_tokens_on_access_change(sender, instance, raw=False, **kwargs):
+    """
+    Обработчик увеличивает версию токенов пользователя при смене роли,
+    статуса сотрудника или активности, отзывая выданные токены доступа.
+    """
+    if raw or instance._state.adding:
+        return
+    stored = User.objects.filter(pk=instance.pk).values(
+        *User.ACCESS_FIELDS, 'token_version').first()
+    if stored is None:
+        return
+    if any(stored[field] != getattr(instance, field)
+           for field in User.ACCESS_FIELDS):
+        instance.token_version = stored['token_version'] + 1
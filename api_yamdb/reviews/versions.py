@@ -0,0 +1,52 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'model-version:{}'
+
+
+def get_version_key(item):
+    """
+    Метод возвращает ключ счётчика версии для модели
+    или для произвольного имени вроде «отзывы произведения 5».
+    """
+    name = item if isinstance(item, str) else item._meta.label_lower
+    return VERSION_KEY.format(name)
+
+
+def get_versions(*items):
+    """
+    Метод возвращает текущие версии моделей. Отсутствующая в кеше версия
+    заводится от текущего времени, чтобы после вытеснения ключа
+    не совпасть с одной из прежних версий. Версии хранятся без срока:
+    их истечение сбросило бы все кешированные ответы и индексы.
+    """
+    keys = [get_version_key(item) for item in items]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, int(time.time() * 1000), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*items):
+    """
+    Метод увеличивает версии моделей, делая устаревшими их ответы.
+    Внутри транзакции версии увеличиваются ещё раз после фиксации:
+    ответ, который конкурентный запрос прочитал до фиксации и сохранил
+    под промежуточной версией, так перестаёт выдаваться.
+    """
+    increment_versions(items)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: increment_versions(items))
+
+
+def increment_versions(items):
+    for item in items:
+        key = get_version_key(item)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, int(time.time() * 1000), timeout=None)
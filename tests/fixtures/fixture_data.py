@@ -0,0 +1,65 @@
+import pytest
+
+
+@pytest.fixture
+def categories():
+    from reviews.models import Category
+
+    return [
+        Category.objects.create(name='Фильм', slug='movie'),
+        Category.objects.create(name='Книга', slug='book'),
+    ]
+
+
+@pytest.fixture
+def genres():
+    from reviews.models import Genre
+
+    return [
+        Genre.objects.create(name='Драма', slug='drama'),
+        Genre.objects.create(name='Комедия', slug='comedy'),
+        Genre.objects.create(name='Фантастика', slug='sci-fi'),
+    ]
+
+
+@pytest.fixture
+def titles(categories, genres):
+    from reviews.models import Title
+
+    first = Title.objects.create(
+        name='Солярис', year=1972, category=categories[0],
+        description='Фильм Андрея Тарковского')
+    first.genre.set([genres[0], genres[2]])
+    second = Title.objects.create(
+        name='Пикник на обочине', year=1972, category=categories[1])
+    second.genre.set([genres[2]])
+    third = Title.objects.create(
+        name='Джентльмены удачи', year=1971, category=categories[0])
+    third.genre.set([genres[1]])
+    return [first, second, third]
+
+
+@pytest.fixture
+def reviews(titles, user, another_user):
+    from reviews.models import Review
+
+    return [
+        Review.objects.create(
+            title=titles[0], author=user, text='Шедевр', score=10),
+        Review.objects.create(
+            title=titles[0], author=another_user, text='Скучно', score=5),
+        Review.objects.create(
+            title=titles[1], author=user, text='Хорошо', score=8),
+    ]
+
+
+@pytest.fixture
+def comments(reviews, user, another_user):
+    from reviews.models import Comment
+
+    return [
+        Comment.objects.create(
+            review=reviews[0], author=another_user, text='Согласен'),
+        Comment.objects.create(
+            review=reviews[0], author=user, text='Спасибо'),
+    ]
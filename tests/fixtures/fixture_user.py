@@ -0,0 +1,63 @@
+import pytest
+
+
+@pytest.fixture
+def admin(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestAdmin', email='admin@yamdb.fake', role='admin')
+
+
+@pytest.fixture
+def moderator(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestModerator', email='moder@yamdb.fake', role='moderator')
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestUser', email='user@yamdb.fake', role='user')
+
+
+@pytest.fixture
+def another_user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestUserAnother', email='another@yamdb.fake', role='user')
+
+
+def get_client(user):
+    from rest_framework.test import APIClient
+
+    from api.authentication import get_access_token
+
+    client = APIClient()
+    token = get_access_token(user)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+@pytest.fixture
+def admin_client(admin):
+    return get_client(admin)
+
+
+@pytest.fixture
+def moderator_client(moderator):
+    return get_client(moderator)
+
+
+@pytest.fixture
+def user_client(user):
+    return get_client(user)
+
+
+@pytest.fixture
+def another_user_client(another_user):
+    return get_client(another_user)
+
+
+@pytest.fixture
+def anon_client():
+    from rest_framework.test import APIClient
+
+    return APIClient()
@@ -0,0 +1,69 @@
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+URL = '/admin/reviews/'
+
+
+@pytest.fixture
+def staff_client(django_user_model):
+    client = Client()
+    client.force_login(django_user_model.objects.create_superuser(
+        username='TestStaff', email='staff@yamdb.fake', password='secret'))
+    return client
+
+
+def get_page(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return response.content.decode(), [
+        query['sql'] for query in context.captured_queries]
+
+
+@pytest.mark.django_db
+class TestAdmin:
+
+    def test_autocomplete_filter_reads_only_selected(
+            self, staff_client, reviews, user, another_user):
+        page, sql = get_page(
+            staff_client, f'{URL}review/?author__id__exact={user.pk}')
+        assert 'admin-autocomplete' in page
+        assert f'{URL}user/autocomplete/' in page
+        assert f'<option value="{user.pk}" selected>TestUser</option>' in page
+        assert 'TestUserAnother' not in page, (
+            'Проверьте, что фильтр по автору не выводит всех пользователей')
+        assert not any(
+            'FROM "reviews_user"' in query and 'WHERE' not in query
+            for query in sql), (
+            'Проверьте, что фильтры не загружают всю таблицу пользователей')
+
+    def test_search_uses_indexed_lookups(self, staff_client, reviews,
+                                         titles):
+        page, _ = get_page(staff_client, f'{URL}review/?q=TestUserA')
+        assert 'Скучно' in page and 'Шедевр' not in page
+        page, _ = get_page(staff_client, f'{URL}title/?q=тарковск')
+        assert 'Солярис' in page and 'Джентльмены удачи' not in page
+
+    def test_text_search_is_opt_in(self, staff_client, reviews, comments,
+                                   settings):
+        def count(url):
+            return staff_client.get(url).context['cl'].result_count
+
+        assert count(f'{URL}review/?q=Шедевр') == 0
+        settings.ADMIN_TEXT_SEARCH = True
+        assert count(f'{URL}review/?q=Шедевр') == 1, (
+            'Проверьте, что ADMIN_TEXT_SEARCH включает поиск по тексту '
+            'отзывов')
+        assert count(f'{URL}comment/?q=Согласен') == 1
+        assert count(f'{URL}review/?q=TestUserA') == 1
+
+    def test_changelist_uses_estimated_count(self, staff_client, titles,
+                                             settings):
+        if connection.vendor != 'postgresql':
+            pytest.skip('Оценка числа строк доступна только в PostgreSQL')
+        settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD = 0
+        _, sql = get_page(staff_client, f'{URL}title/')
+        assert not any('COUNT(' in query.upper() for query in sql), (
+            'Проверьте, что список берёт число строк из оценки планировщика')
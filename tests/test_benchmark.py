@@ -0,0 +1,79 @@
+import pytest
+
+from api.benchmark import (compare, get_admin_endpoints, get_endpoints,
+                           run_admin_benchmark, run_benchmark, seed_catalog)
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
+
+ADMIN_MAX_QUERIES = 10
+
+
+def snapshot():
+    return (
+        list(Title.objects.order_by('pk').values_list(
+            'name', 'year', 'category_id', 'rating')),
+        list(Review.objects.order_by('pk').values_list(
+            'title_id', 'author_id', 'score')),
+        Comment.objects.count(),
+    )
+
+
+@pytest.mark.django_db
+class TestBenchmark:
+
+    def test_seed_is_deterministic(self):
+        seed_catalog(titles=6, reviews=20, comments=5, seed=7)
+        first = snapshot()
+        for model in (GenreTitle, Comment, Review, Title, Category, Genre,
+                      User):
+            model.objects.all().delete()
+        seed_catalog(titles=6, reviews=20, comments=5, seed=7)
+        assert snapshot() == first, (
+            'Проверьте, что генератор данных детерминирован')
+        assert Review.objects.count() == 20
+        assert Title.objects.filter(review_count__gt=0).count() == 6
+
+    def test_endpoints_cover_router(self):
+        seed_catalog(titles=3, reviews=6, comments=2)
+        names = {name for name, _ in get_endpoints()}
+        for basename in ('user', 'title', 'category', 'genre', 'review',
+                         'comment'):
+            assert f'{basename}-list' in names
+
+    def test_run_benchmark(self):
+        seed_catalog(titles=3, reviews=6, comments=2)
+        endpoints = [
+            (name, url) for name, url in get_endpoints()
+            if name in ('title-list', 'review-detail')]
+        results = run_benchmark(repeat=3, warmup=1, endpoints=endpoints)
+        assert set(results) == {'title-list', 'review-detail'}
+        for result in results.values():
+            assert result['status'] == 200
+            assert result['p50_ms'] <= result['p99_ms']
+            assert result['cold_queries'] > 0
+
+    @pytest.mark.parametrize('scale', ((4, 12, 8), (12, 60, 40)))
+    def test_admin_pages_have_fixed_query_count(self, scale):
+        titles, reviews, comments = scale
+        seed_catalog(titles=titles, reviews=reviews, comments=comments)
+        endpoints = get_admin_endpoints()
+        assert {'admin-review-changelist', 'admin-comment-change'} <= {
+            name for name, _ in endpoints}
+        results = run_admin_benchmark(repeat=1, warmup=0)
+        for name, result in results.items():
+            assert result['status'] == 200, name
+            assert result['queries'] <= ADMIN_MAX_QUERIES, (
+                f'Проверьте, что страница {name} не читает связанные '
+                f'объекты построчно и не загружает их все в фильтры')
+
+    def test_compare_reports_regressions(self):
+        meta = {'vendor': 'sqlite'}
+        baseline = {'meta': meta, 'endpoints': {
+            'title-list': {'queries': 2, 'p50_ms': 10.0}}}
+        same = {'meta': meta, 'endpoints': {
+            'title-list': {'queries': 2, 'p50_ms': 11.0}}}
+        worse = {'meta': meta, 'endpoints': {
+            'title-list': {'queries': 3, 'p50_ms': 20.0}}}
+        assert compare(same, baseline, tolerance=0.25) == []
+        assert len(compare(worse, baseline, tolerance=0.25)) == 2, (
+            'Проверьте, что рост числа запросов и задержки — регрессия')
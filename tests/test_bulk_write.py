@@ -0,0 +1,120 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Category, GenreTitle, Title
+
+URL = '/api/v1/titles/bulk/'
+
+
+def make_titles(count, category='movie', genres=('drama', )):
+    return [
+        {'name': f'Новинка {number}', 'year': 2001, 'category': category,
+         'genre': list(genres)}
+        for number in range(count)]
+
+
+def count_create_queries(client, count):
+    with CaptureQueriesContext(connection) as context:
+        response = client.post(URL, data=make_titles(count), format='json')
+    assert response.status_code == 201, response.json()
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestBulkWrite:
+
+    def test_bulk_is_admin_only(self, user_client, titles):
+        response = user_client.post(URL, data=make_titles(1), format='json')
+        assert response.status_code == 403
+
+    def test_bulk_create_titles(self, admin_client, titles):
+        response = admin_client.post(
+            URL, data=make_titles(3, genres=('drama', 'comedy')),
+            format='json')
+        assert response.status_code == 201
+        results = response.json()['results']
+        assert [result['name'] for result in results] == [
+            'Новинка 0', 'Новинка 1', 'Новинка 2']
+        assert sorted(results[0]['genre']) == ['comedy', 'drama']
+        assert GenreTitle.objects.filter(
+            title_id__in=[result['id'] for result in results]).count() == 6
+
+    def test_bulk_create_query_count_is_constant(self, admin_client, titles):
+        count_create_queries(admin_client, 1)
+        small = count_create_queries(admin_client, 2)
+        large = count_create_queries(admin_client, 20)
+        assert small == large, (
+            'Проверьте, что число запросов не зависит от числа элементов')
+
+    def test_bulk_create_is_atomic_by_default(self, admin_client, titles):
+        data = make_titles(3)
+        data[1]['category'] = 'unknown'
+        before = Title.objects.count()
+        response = admin_client.post(URL, data=data, format='json')
+        assert response.status_code == 400
+        errors = response.json()['errors']
+        assert [error['index'] for error in errors] == [1]
+        assert 'category' in errors[0]['errors']
+        assert Title.objects.count() == before, (
+            'Проверьте, что при ошибке ничего не записывается')
+
+    def test_bulk_create_partial_success(self, admin_client, titles):
+        data = make_titles(3)
+        data[2]['year'] = 'никогда'
+        response = admin_client.post(
+            f'{URL}?atomic=false', data=data, format='json')
+        assert response.status_code == 201
+        assert len(response.json()['results']) == 2
+        assert [error['index'] for error in response.json()['errors']] == [2]
+
+    def test_bulk_update_titles(self, admin_client, titles):
+        response = admin_client.patch(URL, data=[
+            {'id': titles[0].pk, 'name': 'Солярис (1972)'},
+            {'id': titles[1].pk, 'genre': ['comedy']},
+            {'id': 0, 'name': 'Нет такого'},
+        ], format='json', QUERY_STRING='atomic=false')
+        assert response.status_code == 200
+        assert response.json()['errors'][0]['index'] == 2
+        titles[0].refresh_from_db()
+        assert titles[0].name == 'Солярис (1972)'
+        assert list(titles[1].genre.values_list('slug', flat=True)) == [
+            'comedy']
+
+    def test_bulk_update_invalidates_cache(self, admin_client, titles):
+        url = f'/api/v1/titles/{titles[0].pk}/'
+        admin_client.get(url)
+        admin_client.patch(
+            URL, data=[{'id': titles[0].pk, 'name': 'Новое имя'}],
+            format='json')
+        assert admin_client.get(url).json()['name'] == 'Новое имя'
+
+    def test_bulk_delete_titles(self, admin_client, titles):
+        response = admin_client.delete(
+            URL, data=[titles[0].pk, titles[1].pk], format='json')
+        assert response.status_code == 200
+        assert response.json()['deleted'] == 2
+        assert not Title.objects.filter(
+            pk__in=[titles[0].pk, titles[1].pk]).exists()
+
+    def test_bulk_create_categories_checks_unique(
+            self, admin_client, categories):
+        response = admin_client.post(
+            '/api/v1/categories/bulk/?atomic=false', data=[
+                {'name': 'Музыка', 'slug': 'music'},
+                {'name': 'Ещё музыка', 'slug': 'music'},
+                {'name': 'Фильм', 'slug': categories[0].slug},
+            ], format='json')
+        assert response.status_code == 201
+        assert [error['index'] for error in response.json()['errors']] == [
+            1, 2], 'Проверьте проверку уникальности слага'
+        assert Category.objects.filter(slug='music').count() == 1
+
+    def test_bulk_update_genres_by_slug(self, admin_client, genres):
+        response = admin_client.patch(
+            '/api/v1/genres/bulk/',
+            data=[{'slug': genres[0].slug, 'name': 'Драма (жанр)'}],
+            format='json')
+        assert response.status_code == 200
+        genres[0].refresh_from_db()
+        assert genres[0].name == 'Драма (жанр)'
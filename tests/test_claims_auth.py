@@ -0,0 +1,69 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from tests.fixtures.fixture_user import get_client
+
+
+def count_queries(client, url):
+    client.get(url)
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestClaimsAuthentication:
+
+    def test_authenticated_read_does_not_load_user(
+            self, anon_client, user_client, titles):
+        url = f'/api/v1/titles/{titles[0].pk}/'
+        assert count_queries(user_client, url) == count_queries(
+            anon_client, url), (
+            'Проверьте, что аутентификация по токену не читает '
+            'пользователя из базы')
+
+    def test_admin_permission_from_claims(self, admin_client, user_client):
+        assert admin_client.get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что роль администратора берётся из токена')
+        assert user_client.get('/api/v1/users/').status_code == 403, (
+            'Проверьте, что обычному пользователю доступ закрыт')
+
+    def test_role_change_revokes_tokens(self, admin_client, user):
+        old_client = get_client(user)
+        assert old_client.get('/api/v1/users/me/').status_code == 200
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'role': 'admin'})
+        assert response.status_code == 200
+        assert old_client.get('/api/v1/users/').status_code == 401, (
+            'Проверьте, что смена роли отзывает выданные токены')
+        user.refresh_from_db()
+        assert get_client(user).get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что новый токен несёт новую роль')
+
+    def test_deleted_user_token_is_rejected(self, admin_client, user):
+        client = get_client(user)
+        assert client.get('/api/v1/users/me/').status_code == 200
+        admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что токен удалённого пользователя отклоняется')
+
+    def test_legacy_token_still_accepted(self, user):
+        client = APIClient()
+        token = RefreshToken.for_user(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == 200, (
+            'Проверьте, что токены без утверждений о роли принимаются')
+        assert response.json()['username'] == user.username
+
+    def test_review_author_is_saved(self, user, user_client, titles):
+        response = user_client.post(
+            f'/api/v1/titles/{titles[2].pk}/reviews/',
+            data={'text': 'Отзыв', 'score': 6})
+        assert response.status_code == 201
+        assert response.json()['author'] == user.username, (
+            'Проверьте, что автор отзыва берётся из токена')
@@ -0,0 +1,135 @@
+import threading
+import time
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.views import ReviewViewSet
+from reviews.models import Review
+
+
+@pytest.mark.django_db
+class TestConditionalRequests:
+
+    def test_title_not_modified(self, anon_client, titles):
+        url = f'/api/v1/titles/{titles[0].pk}/'
+        response = anon_client.get(url)
+        etag = response['ETag']
+        assert response.has_header('Last-Modified')
+        with CaptureQueriesContext(connection) as context:
+            response = anon_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert len(context.captured_queries) <= 1, (
+            'Проверьте, что ответ 304 не читает произведение целиком')
+        modified_since = anon_client.get(url)['Last-Modified']
+        response = anon_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=modified_since)
+        assert response.status_code == 304
+
+    def test_title_etag_follows_rating(self, anon_client, titles, user):
+        url = f'/api/v1/titles/{titles[0].pk}/'
+        etag = anon_client.get(url)['ETag']
+        Review.objects.create(title=titles[0], author=user, text='Ок', score=3)
+        response = anon_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+    def test_title_etag_follows_fields(self, anon_client, titles):
+        url = f'/api/v1/titles/{titles[0].pk}/'
+        etag = anon_client.get(url)['ETag']
+        response = anon_client.get(f'{url}?fields=id', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что ETag объекта зависит от параметра fields')
+        assert response['ETag'] != etag
+        expanded = anon_client.get(f'{url}?expand=category')['ETag']
+        assert expanded not in (etag, response['ETag'])
+        assert anon_client.get(
+            f'{url}?expand=category',
+            HTTP_IF_NONE_MATCH=expanded).status_code == 304
+
+    def test_title_list_etag(self, admin_client, titles, categories):
+        etag = admin_client.get('/api/v1/titles/')['ETag']
+        response = admin_client.get(
+            '/api/v1/titles/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        admin_client.delete(f'/api/v1/categories/{categories[1].slug}/')
+        response = admin_client.get(
+            '/api/v1/titles/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+
+    def test_review_list_etag(self, anon_client, user_client, titles, reviews):
+        url = f'/api/v1/titles/{titles[0].pk}/reviews/'
+        etag = anon_client.get(url)['ETag']
+        assert anon_client.get(
+            url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        user_client.delete(f'{url}{reviews[0].pk}/')
+        assert anon_client.get(
+            url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_comment_etag(self, anon_client, titles, reviews, comments):
+        url = (f'/api/v1/titles/{titles[0].pk}/reviews/{reviews[0].pk}'
+               f'/comments/{comments[0].pk}/')
+        etag = anon_client.get(url)['ETag']
+        assert anon_client.get(
+            url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        other_title = (f'/api/v1/titles/{titles[1].pk}/reviews/'
+                       f'{reviews[0].pk}/comments/{comments[0].pk}/')
+        assert anon_client.get(
+            other_title, HTTP_IF_NONE_MATCH=etag).status_code != 304
+
+    def test_if_match_on_patch_and_delete(
+            self, moderator_client, user_client, titles, reviews):
+        url = f'/api/v1/titles/{titles[0].pk}/reviews/{reviews[0].pk}/'
+        etag = user_client.get(url)['ETag']
+        response = user_client.patch(
+            url, data={'text': 'Правка автора'}, HTTP_IF_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+        response = moderator_client.patch(
+            url, data={'text': 'Правка модератора'}, HTTP_IF_MATCH=etag)
+        assert response.status_code == 412, (
+            'Проверьте, что изменение с устаревшим If-Match отклоняется')
+        response = moderator_client.delete(url, HTTP_IF_MATCH=etag)
+        assert response.status_code == 412
+        current = moderator_client.get(url)['ETag']
+        response = moderator_client.delete(url, HTTP_IF_MATCH=current)
+        assert response.status_code == 204
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentWrites:
+
+    @pytest.mark.skipif(
+        connection.vendor != 'postgresql',
+        reason='Блокировка строк проверяется только в PostgreSQL')
+    def test_same_if_match_passes_once(self, monkeypatch, moderator_client,
+                                       user_client, titles, reviews):
+        url = f'/api/v1/titles/{titles[0].pk}/reviews/{reviews[0].pk}/'
+        etag = user_client.get(url)['ETag']
+        perform_update = ReviewViewSet.perform_update
+
+        def slow_update(self, serializer):
+            time.sleep(0.5)
+            perform_update(self, serializer)
+
+        monkeypatch.setattr(ReviewViewSet, 'perform_update', slow_update)
+        statuses = []
+
+        def patch(client, text):
+            statuses.append(client.patch(
+                url, data={'text': text}, HTTP_IF_MATCH=etag).status_code)
+            connection.close()
+
+        threads = [
+            threading.Thread(target=patch, args=(client, text))
+            for client, text in ((moderator_client, 'Правка модератора'),
+                                 (user_client, 'Правка автора'))]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.1)
+        for thread in threads:
+            thread.join()
+        assert sorted(statuses) == [200, 412], (
+            'Проверьте, что из двух изменений с одним If-Match '
+            'проходит только одно')
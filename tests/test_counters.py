@@ -0,0 +1,168 @@
+import pytest
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.db.models.signals import pre_delete
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Comment, Review, Title
+
+
+def get_histogram(title):
+    return Title.objects.get(pk=title.pk).score_histogram
+
+
+def get_comment_count(review):
+    return Review.objects.get(pk=review.pk).comment_count
+
+
+def add_comments(review, author, count):
+    """Комментарии создаются в обход сигналов, счётчик не сдвигается."""
+    Comment.objects.bulk_create(
+        Comment(review=review, author=author, text=f'Ответ {number}')
+        for number in range(count))
+
+
+def count_delete_queries(client, review):
+    with CaptureQueriesContext(connection) as context:
+        response = client.delete(
+            f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/')
+    assert response.status_code == 204
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestScoreHistogram:
+
+    def test_histogram_follows_reviews(self, titles, reviews):
+        histogram = get_histogram(titles[0])
+        assert (histogram[9], histogram[4], sum(histogram)) == (1, 1, 2)
+        reviews[1].score = 7
+        reviews[1].save()
+        assert get_histogram(titles[0])[4:7] == [0, 0, 1], (
+            'Проверьте, что смена оценки переносит её между столбцами')
+        reviews[1].title = titles[1]
+        reviews[1].save()
+        assert get_histogram(titles[0]) == [0] * 9 + [1]
+        assert get_histogram(titles[1])[6:8] == [1, 1]
+        reviews[2].delete()
+        assert sum(get_histogram(titles[1])) == 1
+
+    def test_title_save_keeps_histogram(self, titles, reviews):
+        stale = Title.objects.get(pk=titles[1].pk)
+        Review.objects.create(
+            title=titles[1], author=reviews[1].author, text='Ок', score=2)
+        stale.name = 'Пикник'
+        stale.save()
+        assert get_histogram(titles[1])[1] == 1, (
+            'Проверьте, что сохранение произведения не затирает гистограмму')
+
+    def test_api_exposes_counters(self, anon_client, titles, reviews,
+                                  comments):
+        data = anon_client.get(f'/api/v1/titles/{titles[0].pk}/').json()
+        assert data['review_count'] == 2
+        assert data['score_histogram'] == [0, 0, 0, 0, 1, 0, 0, 0, 0, 1]
+        data = anon_client.get(
+            f'/api/v1/titles/{titles[0].pk}/reviews/{reviews[0].pk}/').json()
+        assert data['comment_count'] == 2
+
+
+@pytest.mark.django_db
+class TestCommentCount:
+
+    def test_comment_count_follows_comments(self, reviews, comments):
+        assert get_comment_count(reviews[0]) == 2
+        comments[0].review = reviews[1]
+        comments[0].save()
+        assert (get_comment_count(reviews[0]),
+                get_comment_count(reviews[1])) == (1, 1)
+        comments[1].delete()
+        assert get_comment_count(reviews[0]) == 0
+
+    def test_review_save_keeps_comment_count(self, reviews, comments):
+        stale = Review.objects.get(pk=reviews[0].pk)
+        Comment.objects.create(
+            review=reviews[0], author=comments[0].author, text='Ещё')
+        stale.text = 'Исправлено'
+        stale.save()
+        assert get_comment_count(reviews[0]) == 3, (
+            'Проверьте, что сохранение отзыва не затирает счётчик')
+
+    def test_review_delete_does_not_shift_its_comments(
+            self, user_client, user, reviews):
+        add_comments(reviews[0], user, 5)
+        add_comments(reviews[2], user, 40)
+        user_client.get('/api/v1/titles/0/reviews/')
+        assert count_delete_queries(user_client, reviews[0]) == (
+            count_delete_queries(user_client, reviews[2])), (
+            'Проверьте, что число запросов удаления отзыва не зависит '
+            'от числа его комментариев')
+
+    def test_user_delete_shifts_reviews_in_batch(self, user, another_user,
+                                                 reviews, comments):
+        add_comments(reviews[1], user, 3)
+        add_comments(reviews[2], user, 3)
+        Review.objects.filter(pk__in=[reviews[1].pk, reviews[2].pk]).update(
+            comment_count=3)
+        with CaptureQueriesContext(connection) as context:
+            user.delete()
+        assert get_comment_count(reviews[1]) == 0
+        assert sum(
+            'UPDATE "reviews_review"' in query['sql']
+            for query in context.captured_queries) == 1, (
+            'Проверьте, что счётчики сдвигаются одним UPDATE на сдвиг')
+
+    def test_drifted_count_does_not_go_negative(self, user, reviews):
+        add_comments(reviews[1], user, 2)
+        Comment.objects.filter(review=reviews[1]).first().delete()
+        assert get_comment_count(reviews[1]) == 0, (
+            'Проверьте, что счётчик не уходит ниже нуля')
+
+    def test_failed_delete_does_not_leak_into_next(self, user, reviews):
+        add_comments(reviews[1], user, 2)
+        add_comments(reviews[2], user, 2)
+        Review.objects.filter(pk__in=[reviews[1].pk, reviews[2].pk]).update(
+            comment_count=2)
+
+        def fail(sender, **kwargs):
+            raise DatabaseError('Сбой удаления')
+
+        pre_delete.connect(fail, sender=Comment)
+        try:
+            with pytest.raises(DatabaseError), transaction.atomic():
+                Comment.objects.filter(review=reviews[1]).delete()
+        finally:
+            pre_delete.disconnect(fail, sender=Comment)
+        Comment.objects.filter(review=reviews[2]).first().delete()
+        assert get_comment_count(reviews[1]) == 2, (
+            'Проверьте, что упавшее удаление не сдвигает счётчики '
+            'при следующем удалении')
+        assert get_comment_count(reviews[2]) == 1
+
+    def test_comment_updates_review_list_etag(self, user_client, titles,
+                                              reviews):
+        url = f'/api/v1/titles/{titles[0].pk}/reviews/'
+        etag = user_client.get(url)['ETag']
+        user_client.post(
+            f'{url}{reviews[0].pk}/comments/', data={'text': 'Ответ'})
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что новый комментарий меняет ETag списка отзывов')
+
+
+@pytest.mark.django_db
+class TestRepairCounters:
+
+    def test_repair_fixes_only_drifted_rows(self, titles, reviews,
+                                            comments, capsys):
+        Title.objects.filter(pk=titles[0].pk).update(score_10=0, score_3=4)
+        Review.objects.filter(pk=reviews[0].pk).update(comment_count=7)
+        call_command('repair_counters', '--dry-run')
+        assert 'у 1 произведений и 1 отзывов' in capsys.readouterr().out
+        assert get_comment_count(reviews[0]) == 7
+        call_command('repair_counters', '--batch-size', '1')
+        assert 'Исправлены' in capsys.readouterr().out
+        assert get_histogram(titles[0])[9] == 1
+        assert get_histogram(titles[0])[2] == 0
+        assert get_comment_count(reviews[0]) == 2
+        call_command('repair_counters')
+        assert 'у 0 произведений и 0 отзывов' in capsys.readouterr().out
@@ -0,0 +1,68 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Comment, Review, Title
+
+
+def count_queries(client, url):
+    client.get(url)
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+@pytest.fixture
+def many_titles(titles, genres):
+    for number in range(20):
+        title = Title.objects.create(
+            name=f'Произведение {number}', year=2000,
+            category=titles[number % 2].category)
+        title.genre.set(genres[:number % 3 + 1])
+
+
+@pytest.fixture
+def many_reviews(titles, django_user_model):
+    for number in range(15):
+        author = django_user_model.objects.create_user(
+            username=f'reader{number}', email=f'reader{number}@yamdb.fake')
+        review = Review.objects.create(
+            title=titles[0], author=author, text='Отзыв', score=7)
+        Comment.objects.create(review=review, author=author, text='Ответ')
+
+
+@pytest.mark.django_db
+class TestEagerLoading:
+
+    def test_title_list_query_count_is_constant(
+            self, anon_client, many_titles):
+        small = count_queries(anon_client, '/api/v1/titles/?limit=1')
+        large = count_queries(anon_client, '/api/v1/titles/?limit=100')
+        assert small == large, (
+            'Проверьте, что число запросов к базе при получении списка '
+            'произведений не зависит от размера страницы')
+
+    def test_title_retrieve_query_count(
+            self, anon_client, titles, django_assert_num_queries):
+        with django_assert_num_queries(3):
+            anon_client.get(f'/api/v1/titles/{titles[0].pk}/')
+
+    def test_review_list_query_count_is_constant(
+            self, anon_client, titles, many_reviews):
+        url = f'/api/v1/titles/{titles[0].pk}/reviews/'
+        small = count_queries(anon_client, url + '?limit=1')
+        large = count_queries(anon_client, url + '?limit=100')
+        assert small == large
+
+    def test_comment_list_query_count_is_constant(
+            self, anon_client, titles, reviews):
+        for number in range(10):
+            Comment.objects.create(
+                review=reviews[0], text=f'Ответ {number}',
+                author=reviews[number % 2].author)
+        url = (f'/api/v1/titles/{titles[0].pk}/reviews/'
+               f'{reviews[0].pk}/comments/')
+        small = count_queries(anon_client, url + '?limit=1')
+        large = count_queries(anon_client, url + '?limit=100')
+        assert small == large
@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+
+from reviews.models import OutgoingEmail
+from reviews import outbox
+from reviews.outbox import deliver, drain, schedule_retry
+
+
+class FakeTimer:
+    """Класс таймера, который только запоминает задержку и функцию."""
+    started = []
+
+    def __init__(self, delay, function):
+        self.delay, self.function = delay, function
+
+    def start(self):
+        self.started.append(self)
+
+    def is_alive(self):
+        return True
+
+    def cancel(self):
+        self.started.remove(self)
+
+
+@pytest.fixture
+def timers(monkeypatch):
+    FakeTimer.started = []
+    monkeypatch.setattr(outbox.threading, 'Timer', FakeTimer)
+    monkeypatch.setattr(outbox, 'retry_timer', None)
+    return FakeTimer.started
+
+
+class FlakyBackend(EmailBackend):
+    """Почтовый бэкенд, не принимающий письма на адреса в домене broken."""
+
+    def send_messages(self, messages):
+        for message in messages:
+            if any('@broken' in address for address in message.to):
+                raise ConnectionError('SMTP недоступен')
+        return super().send_messages(messages)
+
+
+def create_emails(*recipients):
+    for recipient in recipients:
+        OutgoingEmail.objects.create(
+            recipient=recipient, subject='Тема', body='Текст')
+
+
+@pytest.mark.django_db
+class TestEmailOutbox:
+
+    def test_signup_only_enqueues_email(self, anon_client):
+        response = anon_client.post('/api/v1/auth/signup/', data={
+            'username': 'newbie', 'email': 'newbie@yamdb.fake'})
+        assert response.status_code == 200
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что регистрация не отправляет письмо синхронно')
+        email = OutgoingEmail.objects.get()
+        assert email.recipient == 'newbie@yamdb.fake'
+        assert drain() == (1, 0)
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].body == (
+            email.body), 'Проверьте, что отправлен код подтверждения'
+        email.refresh_from_db()
+        assert email.sent_at is not None
+
+    def test_deliver_respects_batch_size(self):
+        create_emails('a@yamdb.fake', 'b@yamdb.fake', 'c@yamdb.fake')
+        assert deliver(batch_size=2) == (2, 0)
+        assert deliver(batch_size=2) == (1, 0)
+        assert deliver(batch_size=2) == (0, 0), (
+            'Проверьте, что отправленные письма не отправляются повторно')
+
+    def test_failed_email_is_postponed(self):
+        create_emails('ok@yamdb.fake', 'down@broken.fake')
+        assert deliver(connection=FlakyBackend()) == (1, 1)
+        failed = OutgoingEmail.objects.get(recipient='down@broken.fake')
+        assert failed.sent_at is None
+        assert failed.attempts == 1
+        assert failed.error
+        assert failed.send_after > timezone.now(), (
+            'Проверьте, что повтор откладывается с задержкой')
+        assert deliver(connection=FlakyBackend()) == (0, 0)
+
+    def test_retries_stop_after_max_attempts(self, settings):
+        settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 2
+        create_emails('down@broken.fake')
+        for attempt in range(3):
+            OutgoingEmail.objects.update(send_after=timezone.now())
+            deliver(connection=FlakyBackend())
+        assert OutgoingEmail.objects.get().attempts == 2, (
+            'Проверьте, что число попыток ограничено')
+
+    def test_send_emails_command(self):
+        create_emails('a@yamdb.fake', 'b@yamdb.fake')
+        call_command('send_emails', batch_size=1)
+        assert len(mail.outbox) == 2
+
+    def test_postponed_email_schedules_retry(self, timers):
+        create_emails('down@broken.fake', 'later@broken.fake')
+        OutgoingEmail.objects.filter(recipient='later@broken.fake').update(
+            send_after=timezone.now() + timedelta(minutes=5))
+        deliver(connection=FlakyBackend())
+        schedule_retry()
+        assert len(timers) == 1, (
+            'Проверьте, что отложенное письмо будит очередь таймером')
+        assert timers[0].function is outbox.wake
+        assert 50 < timers[0].delay <= 60
+        schedule_retry()
+        assert len(timers) == 1, (
+            'Проверьте, что таймер не заводится повторно на то же время')
+        OutgoingEmail.objects.update(sent_at=timezone.now())
+        outbox.retry_timer = None
+        schedule_retry()
+        assert len(timers) == 1
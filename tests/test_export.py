@@ -0,0 +1,75 @@
+import csv
+import json
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from reviews.models import Review, Title
+
+URL = '/api/v1/titles/export/'
+
+
+def read_ndjson(response):
+    content = b''.join(response.streaming_content).decode()
+    return [json.loads(line) for line in content.splitlines()]
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    def test_export_is_admin_only(self, anon_client, user_client):
+        assert anon_client.get(URL).status_code == 401
+        assert user_client.get(URL).status_code == 403
+
+    def test_export_ndjson(self, admin_client, titles, reviews, comments):
+        response = admin_client.get(URL)
+        assert response.status_code == 200
+        assert response.streaming, 'Проверьте, что выгрузка потоковая'
+        assert response['Content-Type'] == 'application/x-ndjson'
+        records = read_ndjson(response)
+        kinds = [record['type'] for record in records]
+        assert kinds.count('title') == Title.objects.count()
+        assert kinds.count('review') == Review.objects.count()
+        assert kinds.count('comment') == len(comments)
+        title = next(
+            record for record in records
+            if record['type'] == 'title' and record['id'] == titles[0].pk)
+        assert title['category'] == titles[0].category.slug
+        assert title['genre'] == sorted(
+            genre.slug for genre in titles[0].genre.all())
+
+    def test_export_csv(self, admin_client, titles, reviews):
+        response = admin_client.get(URL, {'output': 'csv'})
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'text/csv'
+        rows = list(csv.DictReader(StringIO(
+            b''.join(response.streaming_content).decode())))
+        assert [row['type'] for row in rows].count('review') == len(reviews)
+
+    def test_export_filters(self, admin_client, titles, reviews):
+        category = titles[1].category.slug
+        records = read_ndjson(admin_client.get(
+            URL, {'category': category, 'include': 'titles,reviews'}))
+        assert {record['id'] for record in records
+                if record['type'] == 'title'} == set(
+            Title.objects.filter(
+                category__slug=category).values_list('pk', flat=True))
+        assert all(
+            Title.objects.get(pk=record['title_id']).category.slug == category
+            for record in records if record['type'] == 'review'), (
+            'Проверьте, что отзывы ограничены отфильтрованными произведениями')
+
+    def test_export_since(self, admin_client, titles, reviews):
+        future = (timezone.now() + timedelta(days=1)).isoformat()
+        assert read_ndjson(admin_client.get(URL, {'since': future})) == []
+        assert admin_client.get(
+            URL, {'since': 'вчера'}).status_code == 400
+
+    def test_export_command(self, titles, reviews, tmp_path):
+        path = tmp_path / 'dump.ndjson'
+        call_command('export_catalog', file=str(path), include='reviews')
+        lines = path.read_text(encoding='utf-8').splitlines()
+        assert len(lines) == len(reviews)
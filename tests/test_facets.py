@@ -0,0 +1,115 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api import facets
+from api.facets import title_facets
+from reviews.models import Title
+
+URL = '/api/v1/titles/'
+FILTERS = (
+    'genre=sci-fi', 'genre=drama&genre=comedy', 'category=movie&year=1972',
+    'category=movie&category=book&genre=sci-fi', 'year=1971&name=удачи',
+    'genre=comedy&year=1972', )
+
+
+def get_names(client, query):
+    response = client.get(f'{URL}?{query}')
+    assert response.status_code == 200, response.json()
+    return sorted(item['name'] for item in response.json()['results'])
+
+
+def get_facets(client, query=''):
+    response = client.get(f'{URL}facets/?{query}')
+    assert response.status_code == 200, response.json()
+    return response.json()
+
+
+@pytest.mark.django_db
+class TestFacets:
+
+    def test_index_matches_database_filtering(self, anon_client, titles,
+                                              settings):
+        indexed = [get_names(anon_client, query) for query in FILTERS]
+        settings.FACET_ID_LIMIT = 0
+        assert indexed == [
+            get_names(anon_client, query) for query in FILTERS], (
+            'Проверьте, что отбор через индекс фасетов совпадает '
+            'с отбором в базе данных')
+        assert indexed[1] == ['Джентльмены удачи', 'Солярис']
+        assert indexed[5] == []
+
+    def test_facet_counts(self, anon_client, titles):
+        data = get_facets(anon_client, 'genre=sci-fi')
+        assert data['count'] == 2
+        assert data['category'] == [
+            {'slug': 'book', 'name': 'Книга', 'count': 1},
+            {'slug': 'movie', 'name': 'Фильм', 'count': 1}]
+        assert [(item['slug'], item['count']) for item in data['genre']] == [
+            ('sci-fi', 2), ('comedy', 1), ('drama', 1)], (
+            'Проверьте, что выбор в фасете не сужает его собственные '
+            'значения')
+        assert data['year'] == [{'year': 1972, 'count': 2}]
+
+    def test_index_is_built_without_lock(self, anon_client, titles,
+                                         monkeypatch):
+        read_records = facets.read_records
+
+        def read_unlocked(queryset):
+            assert not title_facets.lock.locked(), (
+                'Проверьте, что индекс строится без блокировки процесса')
+            return read_records(queryset)
+
+        monkeypatch.setattr(facets, 'read_records', read_unlocked)
+        titles[0].save()
+        assert get_names(anon_client, 'genre=drama') == ['Солярис']
+
+    def test_facet_counts_with_name(self, anon_client, titles):
+        data = get_facets(anon_client, 'name=Сол')
+        assert data['count'] == 1
+        assert [item['slug'] for item in data['genre']] == [
+            'drama', 'sci-fi']
+        assert anon_client.get(
+            f'{URL}facets/?genre=horror').status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRefresh:
+
+    @pytest.fixture(autouse=True)
+    def short_overlap(self, settings):
+        """Запас в секунду покрывает точность Now() в SQLite."""
+        settings.FACET_REFRESH_OVERLAP = 1
+
+    def build_and_age(self):
+        """Метод строит индекс и состаривает произведения."""
+        title_facets.refresh()
+        Title.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def test_changed_titles_are_read_incrementally(self, anon_client,
+                                                   titles, categories):
+        self.build_and_age()
+        titles[2].year = 1972
+        titles[2].category = categories[1]
+        titles[2].save()
+        with CaptureQueriesContext(connection) as context:
+            title_facets.refresh()
+        assert len(context.captured_queries) == 1
+        assert '"updated_at" >=' in context.captured_queries[0]['sql'], (
+            'Проверьте, что перечитываются только изменённые произведения')
+        assert get_facets(anon_client, 'category=book')['year'] == [
+            {'year': 1972, 'count': 2}]
+
+    def test_links_and_deletions_rebuild_index(self, anon_client, titles,
+                                               genres):
+        self.build_and_age()
+        titles[1].genre.add(genres[1])
+        assert get_names(anon_client, 'genre=comedy') == [
+            'Джентльмены удачи', 'Пикник на обочине']
+        titles[2].delete()
+        assert get_names(anon_client, 'genre=comedy') == [
+            'Пикник на обочине']
+        assert get_facets(anon_client)['count'] == 2
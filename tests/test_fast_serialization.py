@@ -0,0 +1,84 @@
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from api.fast import compare_serialization
+from api.serializers import ReviewSerializer, TitleSerializer
+from reviews.models import Review, Title
+
+TITLES = '/api/v1/titles/'
+
+
+def render_both(settings, client, url):
+    """Метод возвращает тела ответов быстрого пути и сериализаторов DRF."""
+    contents = []
+    for enabled in (True, False):
+        settings.FAST_SERIALIZATION = enabled
+        cache.clear()
+        response = client.get(url)
+        assert response.status_code == 200, response.content
+        contents.append(response.content)
+    return contents
+
+
+@pytest.mark.django_db
+class TestFastSerialization:
+
+    @pytest.mark.parametrize('params', (
+        '', '?fields=id,name', '?expand=genre', '?expand=',
+        '?cursor=&limit=2', '?category=movie'))
+    def test_titles_are_identical(self, settings, anon_client, titles,
+                                  params):
+        fast, drf = render_both(settings, anon_client, f'{TITLES}{params}')
+        assert fast == drf, (
+            'Проверьте, что быстрый путь отдаёт тот же ответ, что и DRF')
+        fast, drf = render_both(
+            settings, anon_client, f'{TITLES}{titles[0].pk}/{params}')
+        assert fast == drf
+
+    @pytest.mark.parametrize('params', (
+        '', '?fields=id,pub_date', '?expand=author', '?limit=1'))
+    def test_reviews_and_comments_are_identical(self, settings, anon_client,
+                                                reviews, comments, params):
+        Review.objects.filter(pk=reviews[0].pk).update(
+            text='Строка\u2028перевод «кавычки» "\\" 🎬')
+        review = reviews[0]
+        reviews_url = f'{TITLES}{review.title_id}/reviews/'
+        for url in (reviews_url, f'{reviews_url}{review.pk}/',
+                    f'{reviews_url}{review.pk}/comments/',
+                    f'{reviews_url}{review.pk}/comments/{comments[0].pk}/'):
+            with timezone.override('Europe/Moscow'):
+                fast, drf = render_both(settings, anon_client, url + params)
+            assert fast == drf, (
+                f'Проверьте, что ответ {url + params} совпадает с DRF')
+
+    def test_empty_relations(self, settings, anon_client, titles):
+        Title.objects.filter(pk=titles[2].pk).update(
+            category=None, rating=None, description=None)
+        titles[2].genre.clear()
+        fast, drf = render_both(
+            settings, anon_client, f'{TITLES}{titles[2].pk}/')
+        assert fast == drf
+        assert b'"category":null' in fast
+
+    def test_toggle(self, settings, anon_client, titles, monkeypatch):
+        calls = []
+        original = TitleSerializer.to_representation
+
+        def to_representation(serializer, instance):
+            calls.append(instance)
+            return original(serializer, instance)
+        monkeypatch.setattr(
+            TitleSerializer, 'to_representation', to_representation)
+        render_both(settings, anon_client, TITLES)
+        assert len(calls) == len(titles), (
+            'Проверьте, что при FAST_SERIALIZATION сериализатор DRF '
+            'не вызывается, а без него — вызывается')
+
+    def test_throughput_comparison(self, reviews):
+        serializer = ReviewSerializer(
+            Review.objects.select_related('author'), many=True)
+        report = compare_serialization(serializer, repeat=5)
+        assert report['objects'] == len(reviews)
+        assert report['drf'] > 0 and report['fast'] > 0
+        assert report['speedup'] == round(report['fast'] / report['drf'], 2)
@@ -0,0 +1,127 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from reviews.management.commands.import_csv import Command
+from reviews.models import Category, Comment, GenreTitle, Review, Title, User
+
+CSV_FILES = {
+    'users.csv': (
+        'id,username,email,role,bio,first_name,last_name\n'
+        '100,reader,reader@yamdb.fake,user,,,\n'
+        '101,critic,critic@yamdb.fake,moderator,"Пишет, много",Иван,\n'),
+    'category.csv': (
+        'id,name,slug\n'
+        '10,Фильм,movie\n'
+        '11,Книга,book\n'),
+    'genre.csv': (
+        'id,name,slug\n'
+        '20,Драма,drama\n'),
+    'titles.csv': (
+        'id,name,year,category\n'
+        '30,Солярис,1972,10\n'
+        '31,"Пикник ""на обочине""",1972,11\n'
+        '32,Без категории,2000,\n'),
+    'genre_title.csv': (
+        'id,title_id,genre_id\n'
+        '40,30,20\n'
+        '41,31,20\n'
+        '42,99,20\n'
+        '43,30,20\n'),
+    'review.csv': (
+        'id,title_id,text,author,score,pub_date\n'
+        '50,30,Шедевр,100,10,2019-09-24T21:08:21.567Z\n'
+        '51,30,Скучно,101,4,2019-09-25T21:08:21.567Z\n'
+        '52,31,Хорошо,100,8,2019-09-26T21:08:21.567Z\n'),
+    'comments.csv': (
+        'id,review_id,text,author,pub_date\n'
+        '60,50,Согласен,101,2019-09-27T21:08:21.567Z\n'),
+}
+
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    for name, content in CSV_FILES.items():
+        (tmp_path / name).write_text(content, encoding='utf-8')
+    return tmp_path
+
+
+@pytest.mark.django_db
+class TestImportCsv:
+
+    @pytest.mark.parametrize('copy', (True, False))
+    def test_import_loads_all_files(self, csv_dir, copy):
+        options = {} if copy else {'no_copy': True}
+        call_command('import_csv', path=str(csv_dir), batch_size=2, **options)
+        assert User.objects.get(pk=101).bio == 'Пишет, много'
+        assert Title.objects.get(pk=31).name == 'Пикник "на обочине"'
+        assert Title.objects.get(pk=32).category is None
+        assert GenreTitle.objects.count() == 2, (
+            'Проверьте, что строки с несуществующими ключами и повторы '
+            'пар пропускаются')
+        assert Comment.objects.get(pk=60).author.username == 'critic'
+        review = Review.objects.get(pk=50)
+        assert (review.pub_date.year, review.pub_date.day) == (2019, 24), (
+            'Проверьте, что дата публикации берётся из файла')
+
+    def test_import_rebuilds_ratings(self, csv_dir):
+        call_command('import_csv', path=str(csv_dir))
+        title = Title.objects.get(pk=30)
+        assert (title.review_count, title.score_sum) == (2, 14)
+        assert title.rating == 7, (
+            'Проверьте, что рейтинг пересчитывается после загрузки')
+        assert title.score_histogram[3] == title.score_histogram[9] == 1
+        assert Review.objects.get(pk=50).comment_count == 1, (
+            'Проверьте, что число комментариев пересчитывается '
+            'после загрузки')
+
+    def test_import_resets_sequences(self, csv_dir):
+        call_command('import_csv', path=str(csv_dir))
+        assert Category.objects.create(name='Музыка', slug='music').pk > 11
+
+    def test_import_resumes(self, csv_dir):
+        (csv_dir / 'comments.csv').write_text(
+            CSV_FILES['comments.csv']
+            + '61,50,Дубль,999999,2019-09-28T21:08:21.567Z\n',
+            encoding='utf-8')
+        call_command('import_csv', path=str(csv_dir))
+        assert Comment.objects.count() == 1
+        call_command('import_csv', path=str(csv_dir))
+        assert Review.objects.count() == 3, (
+            'Проверьте, что повторный запуск не дублирует строки')
+
+    def test_failed_batch_keeps_previous_batches(self, csv_dir):
+        (csv_dir / 'category.csv').write_text(
+            CSV_FILES['category.csv'] + '12,Дубль,movie\n',
+            encoding='utf-8')
+        with pytest.raises(CommandError):
+            call_command('import_csv', path=str(csv_dir), batch_size=2)
+        assert Category.objects.count() == 2, (
+            'Проверьте, что успешные пачки сохраняются')
+
+    def test_resume_after_failed_batch_finishes_import(
+            self, csv_dir, monkeypatch):
+        (csv_dir / 'comments.csv').write_text(
+            CSV_FILES['comments.csv']
+            + '61,52,Спорно,101,2019-09-28T21:08:21.567Z\n',
+            encoding='utf-8')
+        write = Command.write
+
+        def fail_second_comment(self, model, fields, batch, name, line):
+            if model is Comment and batch[0].pk == 61:
+                raise CommandError('Сбой пачки')
+            return write(self, model, fields, batch, name, line)
+
+        monkeypatch.setattr(Command, 'write', fail_second_comment)
+        with pytest.raises(CommandError):
+            call_command('import_csv', path=str(csv_dir), batch_size=1)
+        monkeypatch.undo()
+        call_command('import_csv', path=str(csv_dir), batch_size=1)
+        assert Title.objects.get(pk=30).rating == 7, (
+            'Проверьте, что повторный запуск пересчитывает рейтинги '
+            'отзывов, загруженных прошлым запуском')
+        assert dict(Review.objects.values_list('pk', 'comment_count')) == {
+            50: 1, 51: 0, 52: 1}, (
+            'Проверьте, что повторный запуск пересчитывает комментарии '
+            'и у отзывов с комментариями из прошлого запуска')
+        assert Category.objects.create(name='Музыка', slug='music').pk > 11
+        assert Title.objects.create(name='Сталкер', year=1979).pk > 32
@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from reviews.models import Review, Title
+
+
+@pytest.fixture
+def review_feed(titles, django_user_model):
+    moment = timezone.now()
+    for number in range(25):
+        author = django_user_model.objects.create_user(
+            username=f'reader{number}', email=f'reader{number}@yamdb.fake')
+        review = Review.objects.create(
+            title=titles[0], author=author, text=f'Отзыв {number}', score=5)
+        Review.objects.filter(pk=review.pk).update(
+            pub_date=moment - timedelta(minutes=number // 3))
+    return list(Review.objects.filter(title=titles[0]).order_by(
+        '-pub_date', 'id').values_list('id', flat=True))
+
+
+def walk(client, url):
+    pages = []
+    while url:
+        data = client.get(url).json()
+        pages.append([item['id'] for item in data['results']])
+        url = data['next']
+    return pages
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+
+    def test_cursor_walk_matches_ordering(
+            self, anon_client, titles, review_feed):
+        pages = walk(
+            anon_client,
+            f'/api/v1/titles/{titles[0].pk}/reviews/?cursor=&limit=10')
+        assert [len(page) for page in pages] == [10, 10, 5]
+        assert sum(pages, []) == review_feed, (
+            'Проверьте, что курсорная пагинация обходит отзывы '
+            'в порядке (-pub_date, id) без пропусков и повторов')
+
+    def test_cursor_page_runs_without_count(
+            self, anon_client, titles, review_feed):
+        url = f'/api/v1/titles/{titles[0].pk}/reviews/?cursor=&limit=10'
+        next_url = anon_client.get(url).json()['next']
+        with CaptureQueriesContext(connection) as context:
+            response = anon_client.get(next_url)
+        assert 'count' not in response.json()
+        for query in context.captured_queries:
+            assert 'COUNT(' not in query['sql'].upper()
+            assert 'OFFSET' not in query['sql'].upper()
+
+    def test_cursor_is_stable_under_inserts(
+            self, anon_client, titles, review_feed, user):
+        url = f'/api/v1/titles/{titles[0].pk}/reviews/?cursor=&limit=10'
+        first = anon_client.get(url).json()
+        Review.objects.create(
+            title=titles[0], author=user, text='Свежий отзыв', score=9)
+        second = anon_client.get(first['next']).json()
+        assert [item['id'] for item in second['results']] == review_feed[
+            10:20]
+
+    def test_previous_cursor(self, anon_client, titles, review_feed):
+        url = f'/api/v1/titles/{titles[0].pk}/reviews/?cursor=&limit=10'
+        first = anon_client.get(url).json()
+        assert first['previous'] is None
+        second = anon_client.get(first['next']).json()
+        previous = anon_client.get(second['previous']).json()
+        assert [item['id'] for item in previous['results']] == review_feed[
+            :10]
+        assert previous['previous'] is None
+        assert previous['next'] is not None
+
+    def test_invalid_cursor(self, anon_client, titles):
+        response = anon_client.get(
+            f'/api/v1/titles/{titles[0].pk}/reviews/?cursor=broken')
+        assert response.status_code == 404
+
+    def test_title_cursor_walk(self, anon_client, titles):
+        pages = walk(anon_client, '/api/v1/titles/?cursor=&limit=2')
+        assert sum(pages, []) == list(Title.objects.order_by(
+            '-year', 'name', 'id').values_list('id', flat=True))
+
+    def test_offset_pagination_by_default(self, anon_client, titles):
+        data = anon_client.get('/api/v1/titles/').json()
+        assert data['count'] == len(titles)
@@ -0,0 +1,93 @@
+import json
+import re
+
+import pytest
+
+from api.metrics import LATENCY_BUCKETS, Registry, render
+
+
+def read_metric(client, name, **labels):
+    content = client.get('/metrics').content.decode()
+    label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(
+        rf'^{re.escape(name)}{{{re.escape(label_text)}}} (\S+)$',
+        content, re.MULTILINE)
+    return float(match.group(1)) if match else 0
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def test_metrics_format(self, anon_client):
+        response = anon_client.get('/metrics')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        content = response.content.decode()
+        assert '# TYPE yamdb_http_request_duration_seconds histogram' in (
+            content)
+        assert '# TYPE yamdb_db_queries_total counter' in content
+
+    def test_requests_are_labelled_by_viewset_action(
+            self, anon_client, user_client, titles):
+        before = read_metric(
+            anon_client, 'yamdb_http_request_duration_seconds_count',
+            view='TitleViewSet.list', method='GET', status='200')
+        anon_client.get('/api/v1/titles/')
+        assert read_metric(
+            anon_client, 'yamdb_http_request_duration_seconds_count',
+            view='TitleViewSet.list', method='GET', status='200') == (
+            before + 1), 'Проверьте, что запросы помечаются контроллером'
+        queries = read_metric(
+            anon_client, 'yamdb_db_queries_total', view='ReviewViewSet.create')
+        user_client.post(
+            f'/api/v1/titles/{titles[2].pk}/reviews/',
+            data={'text': 'Отзыв', 'score': 7})
+        assert read_metric(
+            anon_client, 'yamdb_db_queries_total',
+            view='ReviewViewSet.create') > queries, (
+            'Проверьте, что SQL-запросы считаются по контроллеру')
+
+    def test_metrics_are_closed_to_other_addresses(self, anon_client,
+                                                   settings):
+        outside = {'REMOTE_ADDR': '203.0.113.5'}
+        assert anon_client.get('/metrics', **outside).status_code == 403, (
+            'Проверьте, что метрики не отдаются внешним адресам')
+        settings.METRICS_TOKEN = 'secret'
+        assert anon_client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer wrong',
+            **outside).status_code == 403
+        assert anon_client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret',
+            **outside).status_code == 200
+
+    def test_metrics_merge_worker_snapshots(
+            self, anon_client, settings, tmp_path):
+        settings.METRICS_DIR = str(tmp_path)
+        (tmp_path / 'metrics-999999.json').write_text(json.dumps({
+            'yamdb_db_queries_total': [[['OtherViewSet.list'], 40]]}))
+        assert read_metric(
+            anon_client, 'yamdb_db_queries_total',
+            view='OtherViewSet.list') == 40, (
+            'Проверьте, что метрики других процессов складываются')
+        assert list(tmp_path.glob('metrics-*.json')), (
+            'Проверьте, что процесс сохраняет свой снимок')
+
+
+class TestRegistry:
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        for value in (0.001, 0.02, 0.02, 30):
+            registry.observe(
+                'yamdb_http_request_duration_seconds', ('V.list', 'GET',
+                                                        '200'), value)
+        content = render(registry.collect())
+        labels = 'view="V.list",method="GET",status="200"'
+        assert (f'yamdb_http_request_duration_seconds_bucket{{{labels},'
+                f'le="{LATENCY_BUCKETS[0]}"}} 1') in content
+        assert (f'yamdb_http_request_duration_seconds_bucket{{{labels},'
+                f'le="0.025"}} 3') in content
+        assert (f'yamdb_http_request_duration_seconds_bucket{{{labels},'
+                f'le="+Inf"}} 4') in content
+        assert f'yamdb_http_request_duration_seconds_count{{{labels}}} 4' in (
+            content)
@@ -0,0 +1,155 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Comment, Review
+
+
+def run(method, url, data=None):
+    """
+    Метод выполняет запрос и возвращает ответ и SQL-запросы без точек
+    сохранения: вне тестовой транзакции их нет.
+    """
+    with CaptureQueriesContext(connection) as context:
+        response = method(url, data=data)
+    queries = [
+        query['sql'] for query in context.captured_queries
+        if not query['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT'))]
+    return response, queries
+
+
+def title_queries(queries):
+    return [sql for sql in queries if sql.startswith(
+        'SELECT "reviews_title"."id"')]
+
+
+def read_queries(queries):
+    """
+    Метод отбрасывает EXPLAIN оценки числа строк: его выполняет
+    только PostgreSQL.
+    """
+    return [sql for sql in queries if not sql.startswith('EXPLAIN')]
+
+
+@pytest.fixture
+def warm_clients(user_client, another_user_client):
+    """Кеш версий токенов прогревается заранее."""
+    for client in (user_client, another_user_client):
+        client.get('/api/v1/titles/0/reviews/')
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('warm_clients')
+class TestNestedReviews:
+
+    def test_list_resolves_title_once(self, user_client, reviews):
+        response, queries = run(
+            user_client.get, f'/api/v1/titles/{reviews[0].title_id}/reviews/')
+        assert response.status_code == 200
+        assert len(title_queries(queries)) == 1
+        assert len(read_queries(queries)) == 3
+
+    def test_list_of_unknown_title(self, user_client, reviews):
+        response, _ = run(user_client.get, '/api/v1/titles/0/reviews/')
+        assert response.status_code == 404
+
+    def test_create(self, another_user_client, titles):
+        response, queries = run(
+            another_user_client.post,
+            f'/api/v1/titles/{titles[2].pk}/reviews/',
+            data={'text': 'Отзыв', 'score': 6})
+        assert response.status_code == 201
+        assert len(title_queries(queries)) == 1, (
+            'Проверьте, что произведение загружается один раз')
+        assert not any('SELECT (1) AS "a"' in sql for sql in queries), (
+            'Проверьте, что повтор отзыва не проверяется отдельным запросом')
+        assert len(queries) == 4
+
+    def test_repeated_review_is_rejected(self, user_client, reviews):
+        count = Review.objects.count()
+        response, _ = run(
+            user_client.post, f'/api/v1/titles/{reviews[0].title_id}/reviews/',
+            data={'text': 'Ещё отзыв', 'score': 1})
+        assert response.status_code == 400, (
+            'Проверьте, что ошибка уникальности отдаётся ответом 400')
+        assert Review.objects.count() == count
+        reviews[0].title.refresh_from_db()
+        assert reviews[0].title.review_count == 2, (
+            'Проверьте, что рейтинг не меняется при отклонённом отзыве')
+
+    def test_update_does_not_load_title(self, user_client, reviews):
+        response, queries = run(
+            user_client.patch,
+            f'/api/v1/titles/{reviews[0].title_id}/reviews/{reviews[0].pk}/',
+            data={'text': 'Новый текст'})
+        assert response.status_code == 200
+        assert title_queries(queries) == [], (
+            'Проверьте, что отзыв ищется по паре ключей без произведения')
+        assert len(queries) == 4
+
+    def test_review_of_other_title_is_not_found(self, user_client, reviews):
+        response, _ = run(
+            user_client.patch,
+            f'/api/v1/titles/{reviews[2].title_id}/reviews/{reviews[0].pk}/',
+            data={'text': 'Новый текст'})
+        assert response.status_code == 404
+
+    def test_delete(self, user_client, reviews):
+        response, queries = run(
+            user_client.delete,
+            f'/api/v1/titles/{reviews[2].title_id}/reviews/{reviews[2].pk}/')
+        assert response.status_code == 204
+        assert title_queries(queries) == []
+        assert len(queries) == 6
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('warm_clients')
+class TestNestedComments:
+
+    @staticmethod
+    def get_url(review, title_id=None):
+        return (f'/api/v1/titles/{title_id or review.title_id}/reviews/'
+                f'{review.pk}/comments/')
+
+    def test_list(self, user_client, reviews, comments):
+        response, queries = run(user_client.get, self.get_url(reviews[0]))
+        assert response.status_code == 200
+        assert len(read_queries(queries)) == 3, (
+            'Проверьте, что список читает родителя, число и страницу')
+
+    def test_review_must_belong_to_title(self, user_client, reviews,
+                                         comments, titles):
+        url = self.get_url(reviews[0], title_id=titles[1].pk)
+        assert run(user_client.get, url)[0].status_code == 404, (
+            'Проверьте, что отзыв другого произведения не найден')
+        response, _ = run(user_client.post, url, data={'text': 'Ответ'})
+        assert response.status_code == 404
+        response, _ = run(user_client.get, f'{url}{comments[0].pk}/')
+        assert response.status_code == 404
+        assert Comment.objects.count() == len(comments)
+
+    def test_create(self, user_client, reviews):
+        response, queries = run(
+            user_client.post, self.get_url(reviews[0]),
+            data={'text': 'Ответ'})
+        assert response.status_code == 201
+        assert len(queries) == 4, (
+            'Проверьте, что число комментариев отзыва сдвигается '
+            'одним UPDATE')
+
+    def test_update(self, user_client, reviews, comments):
+        response, queries = run(
+            user_client.patch, f'{self.get_url(reviews[0])}{comments[1].pk}/',
+            data={'text': 'Исправлено'})
+        assert response.status_code == 200
+        assert len(queries) == 4
+
+    def test_delete(self, user_client, reviews, comments):
+        response, queries = run(
+            user_client.delete,
+            f'{self.get_url(reviews[0])}{comments[1].pk}/')
+        assert response.status_code == 204
+        assert len(queries) == 5, (
+            'Проверьте, что отзыв удаляемого комментария не запрашивается '
+            'отдельно')
@@ -0,0 +1,56 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return response, [
+        query['sql'].upper() for query in context.captured_queries
+        if 'COUNT(' in query['sql'].upper()]
+
+
+@pytest.mark.django_db
+class TestCachedCountPagination:
+
+    def test_count_can_be_omitted(self, anon_client, titles):
+        response, counts = count_queries(
+            anon_client, '/api/v1/titles/?count=false&limit=2')
+        data = response.json()
+        assert 'count' not in data
+        assert len(data['results']) == 2
+        assert data['next'] is not None
+        assert not counts, (
+            'Проверьте, что при count=false запрос COUNT не выполняется')
+        response, _ = count_queries(
+            anon_client, '/api/v1/titles/?count=false&limit=2&offset=2')
+        assert response.json()['next'] is None
+
+    def test_count_is_cached_per_filter_set(self, admin_client, titles):
+        _, counts = count_queries(
+            admin_client, '/api/v1/titles/?genre=sci-fi')
+        assert len(counts) == 1
+        response, counts = count_queries(
+            admin_client, '/api/v1/titles/?genre=sci-fi&offset=1')
+        assert response.json()['count'] == 2
+        assert not counts, (
+            'Проверьте, что число объектов берётся из кеша для того же '
+            'набора фильтров')
+        _, counts = count_queries(admin_client, '/api/v1/titles/?genre=drama')
+        assert len(counts) == 1
+        _, counts = count_queries(admin_client, '/api/v1/users/')
+        assert len(counts) == 1
+
+    def test_planner_estimate_above_threshold(
+            self, anon_client, titles, settings):
+        if connection.vendor != 'postgresql':
+            pytest.skip('Оценка числа строк доступна только в PostgreSQL')
+        settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD = 0
+        with CaptureQueriesContext(connection) as context:
+            response = anon_client.get('/api/v1/titles/')
+        queries = [query['sql'] for query in context.captured_queries]
+        assert isinstance(response.json()['count'], int)
+        assert not any('COUNT(' in sql.upper() for sql in queries)
+        assert any(sql.startswith('EXPLAIN') for sql in queries)
@@ -0,0 +1,62 @@
+import pytest
+from django.db import IntegrityError, connection, transaction
+
+from api.benchmark import seed_catalog
+from api.plans import capture_plans, compare_plans
+from reviews.models import GenreTitle
+
+
+def make_results(plan, seq_scans=(), vendor='postgresql'):
+    return {'meta': {'vendor': vendor}, 'endpoints': {'title-list': {
+        'SELECT ?': {'plan': plan, 'seq_scans': list(seq_scans)}}}}
+
+
+@pytest.mark.django_db
+class TestIndexes:
+
+    def test_genre_title_pairs_are_unique(self, titles, genres):
+        with pytest.raises(IntegrityError), transaction.atomic():
+            GenreTitle.objects.create(title=titles[0], genre=genres[0])
+
+    def test_genre_delete_removes_links(self, titles, genres):
+        genres[2].delete()
+        assert not GenreTitle.objects.filter(genre_id=genres[2].pk).exists()
+        assert list(titles[1].genre.all()) == [], (
+            'Проверьте, что связи с удалённым жанром удаляются')
+
+    def test_bulk_create_skips_repeated_genres(self, admin_client, genres,
+                                               categories):
+        response = admin_client.post('/api/v1/titles/bulk/', data=[{
+            'name': 'Новинка', 'year': 2001, 'category': 'movie',
+            'genre': ['drama', 'drama']}], format='json')
+        assert response.status_code == 201, response.json()
+        assert response.json()['results'][0]['genre'] == ['drama']
+
+    @pytest.mark.skipif(
+        connection.vendor not in ('postgresql', 'sqlite'),
+        reason='EXPLAIN разбирается только для PostgreSQL и SQLite')
+    def test_api_queries_use_indexes(self):
+        seed_catalog(titles=30, reviews=90, comments=30)
+        results = {'meta': {'vendor': connection.vendor},
+                   'endpoints': capture_plans()}
+        assert results['endpoints']['title-list'], (
+            'Проверьте, что планы собираются для запросов адреса')
+        assert compare_plans(results) == [], (
+            'Проверьте, что запросы API не читают таблицы целиком')
+
+
+class TestComparePlans:
+
+    def test_seq_scans_are_reported(self):
+        results = make_results(['Seq Scan on t'], seq_scans=['t'])
+        assert len(compare_plans(results)) == 1
+
+    def test_plan_changes_are_reported(self):
+        baseline = make_results(['Index Scan on t using t_idx'])
+        changed = make_results(['Bitmap Heap Scan on t'])
+        assert compare_plans(baseline, baseline) == []
+        assert len(compare_plans(changed, baseline)) == 1, (
+            'Проверьте, что изменение плана — регрессия')
+        other_vendor = make_results(['SCAN t'], vendor='sqlite')
+        assert compare_plans(other_vendor, baseline) == [], (
+            'Проверьте, что планы разных СУБД не сравниваются')
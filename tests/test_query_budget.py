@@ -0,0 +1,76 @@
+import logging
+
+import pytest
+
+from api.queries import SQLBudgetError, fingerprint
+from api.serializers import ReviewSerializer
+
+
+def get_report(caplog):
+    reports = [
+        record.sql_report for record in caplog.records
+        if hasattr(record, 'sql_report')]
+    assert reports, 'Проверьте, что нарушение записывается в журнал'
+    return reports[-1]
+
+
+@pytest.mark.django_db
+class TestQueryBudget:
+
+    def test_overrun_fails_in_strict_mode(self, settings, anon_client,
+                                          titles):
+        settings.SQL_BUDGETS = {'default': 30, 'TitleViewSet.list': 1}
+        with pytest.raises(SQLBudgetError):
+            anon_client.get('/api/v1/titles/')
+
+    def test_overrun_is_logged_in_production(self, settings, anon_client,
+                                             titles, caplog):
+        settings.SQL_BUDGET_STRICT = False
+        settings.SQL_BUDGETS = {'default': 30, 'TitleViewSet.list': 1}
+        with caplog.at_level(logging.WARNING, logger='api.queries'):
+            response = anon_client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        report = get_report(caplog)
+        assert report['view'] == 'TitleViewSet.list'
+        assert report['queries'] > report['budget'] == 1
+        assert report['top'] and all(
+            '%s' not in item['fingerprint'] for item in report['top']), (
+            'Проверьте, что в отчёт попадают формы запросов')
+
+    def test_repeated_queries_are_attributed_to_field(
+            self, settings, monkeypatch, user_client, reviews, caplog):
+        settings.SQL_BUDGET_STRICT = False
+        settings.SQL_REPEAT_THRESHOLD = 2
+        monkeypatch.setattr(ReviewSerializer.Meta, 'select_related', ())
+        title_id = reviews[0].title_id
+        with caplog.at_level(logging.WARNING, logger='api.queries'):
+            user_client.get(f'/api/v1/titles/{title_id}/reviews/')
+        repeated = get_report(caplog)['repeated']
+        assert repeated, 'Проверьте обнаружение повторяющихся запросов'
+        assert repeated[0]['field'] == 'ReviewSerializer.author', (
+            'Проверьте, что N+1 привязывается к полю сериализатора')
+        assert repeated[0]['count'] >= settings.SQL_REPEAT_THRESHOLD
+
+    def test_slow_queries_are_logged(self, settings, anon_client, titles,
+                                     caplog):
+        settings.SQL_SLOW_QUERY_MS = 0
+        with caplog.at_level(logging.WARNING, logger='api.queries'):
+            anon_client.get(f'/api/v1/titles/{titles[0].pk}/')
+        slow = [
+            record.sql_report for record in caplog.records
+            if getattr(record, 'sql_report', {}).get(
+                'event') == 'sql_slow_query']
+        assert slow, 'Проверьте журнал медленных запросов'
+        assert all(report['view'] == 'TitleViewSet.retrieve'
+                   for report in slow)
+        assert any(report['source'] for report in slow), (
+            'Проверьте, что медленный запрос привязывается к коду проекта')
+
+
+class TestFingerprint:
+
+    def test_values_are_removed(self):
+        assert fingerprint(
+            'SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = \'x\'') == (
+            fingerprint('SELECT * FROM t WHERE id IN (%s) AND name = \'y\''))
+        assert fingerprint('SELECT 1 LIMIT 21') == 'SELECT ? LIMIT ?'
@@ -0,0 +1,171 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from reviews import rankings
+from reviews.models import RankingRefresh, Review, Title, TitleRanking, User
+from reviews.rankings import (get_contribution, get_current_trending,
+                              refresh_rankings)
+
+URL = '/api/v1/rankings/'
+
+
+def add_reviews(title, scores, prefix):
+    return [
+        Review.objects.create(
+            title=title, score=score, text='Отзыв',
+            author=User.objects.create(
+                username=f'{prefix}{number}',
+                email=f'{prefix}{number}@yamdb.fake'))
+        for number, score in enumerate(scores)]
+
+
+def get_titles(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.json()
+    return [item['title']['name'] for item in response.json()['results']]
+
+
+@pytest.fixture
+def ranked(settings, titles):
+    """
+    Одна десятка у «Солярис», шесть девяток у «Пикник на обочине»
+    и три двойки у «Джентльмены удачи».
+    """
+    settings.RANKING_MIN_REVIEWS = 5
+    add_reviews(titles[0], [10], 'a')
+    add_reviews(titles[1], [9] * 6, 'b')
+    add_reviews(titles[2], [2] * 3, 'c')
+    refresh_rankings()
+    return titles
+
+
+@pytest.mark.django_db
+class TestRankings:
+
+    def test_weighted_rating_needs_many_reviews(self, anon_client, ranked):
+        assert get_titles(anon_client, URL) == [
+            'Пикник на обочине', 'Солярис', 'Джентльмены удачи'], (
+            'Проверьте, что одна высокая оценка не выводит произведение '
+            'выше многих хороших')
+        ranking = TitleRanking.objects.get(title=ranked[0])
+        assert ranking.weighted == pytest.approx((10 + 5 * 7) / 6)
+
+    def test_category_and_genre_rankings(self, anon_client, ranked):
+        assert get_titles(anon_client, f'{URL}?category=movie') == [
+            'Солярис', 'Джентльмены удачи']
+        assert get_titles(anon_client, f'{URL}?genre=sci-fi') == [
+            'Пикник на обочине', 'Солярис']
+        assert anon_client.get(f'{URL}?kind=best').status_code == 400
+
+    def test_trending_prefers_recent_reviews(self, anon_client, titles,
+                                             settings):
+        old = add_reviews(titles[0], [10, 10], 'a')
+        add_reviews(titles[1], [10, 10], 'b')
+        Review.objects.filter(pk__in=[review.pk for review in old]).update(
+            pub_date=timezone.now() - timedelta(days=30))
+        refresh_rankings()
+        data = anon_client.get(f'{URL}?kind=trending').json()['results']
+        assert [item['title']['name'] for item in data] == [
+            'Пикник на обочине', 'Солярис'], (
+            'Проверьте, что старые отзывы весят меньше новых')
+        assert data[0]['trending'] == pytest.approx(20, rel=0.01)
+        assert data[1]['trending'] == pytest.approx(20 / 2 ** (30 / 7), 0.01)
+
+    def test_trending_does_not_overflow(self, settings):
+        pub_date = settings.RANKING_EPOCH + timedelta(days=365 * 100)
+        trending = get_contribution(10, pub_date)
+        assert get_current_trending(trending, now=pub_date) == (
+            pytest.approx(10)), (
+            'Проверьте, что популярность хранится в логарифмах и не '
+            'переполняется через десятилетия после RANKING_EPOCH')
+
+    def test_review_writes_keep_cached_rankings(self, anon_client, ranked):
+        anon_client.get(URL)
+        add_reviews(ranked[2], [10], 'd')
+        assert anon_client.get(URL)['X-Cache'] == 'HIT', (
+            'Проверьте, что отзывы не сбрасывают кеш до пересчёта')
+        refresh_rankings()
+        assert anon_client.get(URL)['X-Cache'] == 'MISS'
+
+    def test_cursor_pagination(self, anon_client, ranked):
+        response = anon_client.get(f'{URL}?kind=trending&cursor=&limit=2')
+        data = response.json()
+        assert len(data['results']) == 2 and data['next']
+        rest = anon_client.get(data['next']).json()['results']
+        assert len(rest) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRefresh:
+
+    @pytest.fixture(autouse=True)
+    def short_overlap(self, settings):
+        """Запас в секунду покрывает точность Now() в SQLite."""
+        settings.RANKING_REFRESH_OVERLAP = 1
+
+    def refresh_and_age(self):
+        """Метод пересчитывает рейтинги и состаривает произведения."""
+        refresh_rankings()
+        Title.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def get_trending(self):
+        return dict(TitleRanking.objects.values_list('title_id', 'trending'))
+
+    def test_new_reviews_are_added_incrementally(self, reviews, titles):
+        self.refresh_and_age()
+        add_reviews(titles[2], [7], 'c')
+        with CaptureQueriesContext(connection) as context:
+            refresh = refresh_rankings()
+        assert refresh.titles == 1, (
+            'Проверьте, что пересчитываются только изменённые произведения')
+        assert not any(
+            'IN' in query['sql'] and '"reviews_review"' in query['sql']
+            for query in context.captured_queries), (
+            'Проверьте, что старые отзывы не перечитываются')
+        incremental = self.get_trending()
+        refresh_rankings(full=True)
+        assert incremental == pytest.approx(self.get_trending())
+        assert RankingRefresh.objects.count() == 3
+
+    def test_fresh_reviews_are_read_in_chunks(self, monkeypatch, reviews,
+                                              titles):
+        self.refresh_and_age()
+        monkeypatch.setattr(rankings, 'FRESH_CHUNK_SIZE', 1)
+        add_reviews(titles[1], [7], 'b')
+        add_reviews(titles[2], [3], 'c')
+        with CaptureQueriesContext(connection) as context:
+            assert refresh_rankings().titles == 2
+        assert sum(
+            '"reviews_review"' in query['sql']
+            for query in context.captured_queries) == 2, (
+            'Проверьте, что условия по произведениям делятся на части')
+        incremental = self.get_trending()
+        refresh_rankings(full=True)
+        assert incremental == pytest.approx(self.get_trending())
+
+    def test_changed_and_deleted_reviews(self, reviews, titles):
+        self.refresh_and_age()
+        reviews[0].score = 1
+        reviews[0].save()
+        reviews[2].delete()
+        refresh_rankings()
+        incremental = self.get_trending()
+        assert incremental[titles[1].pk] == float('-inf')
+        refresh_rankings(full=True)
+        assert incremental == pytest.approx(self.get_trending()), (
+            'Проверьте, что изменённые отзывы пересчитываются полностью')
+
+    def test_prior_drift_updates_all_rows(self, settings, reviews, titles):
+        self.refresh_and_age()
+        add_reviews(titles[2], [1] * 5, 'c')
+        refresh = refresh_rankings()
+        assert refresh.prior_mean == pytest.approx(
+            (10 + 5 + 8 + 5) / 8)
+        ranking = TitleRanking.objects.get(title=titles[1])
+        assert ranking.weighted == pytest.approx(
+            (8 + settings.RANKING_MIN_REVIEWS * refresh.prior_mean)
+            / (1 + settings.RANKING_MIN_REVIEWS))
@@ -0,0 +1,101 @@
+import pytest
+from django.core.management import call_command
+from django.db.models import Avg
+
+from reviews.models import Review, Title
+
+
+def expected_rating(title):
+    return Review.objects.filter(title=title).aggregate(
+        rating=Avg('score'))['rating']
+
+
+@pytest.mark.django_db
+class TestStoredRating:
+
+    def test_rating_follows_review_create(self, titles, reviews):
+        title = Title.objects.get(pk=titles[0].pk)
+        assert title.review_count == 2
+        assert title.score_sum == 15
+        assert title.rating == expected_rating(title) == 7.5
+        assert Title.objects.get(pk=titles[2].pk).rating is None, (
+            'Проверьте, что у произведения без отзывов рейтинг пустой')
+
+    def test_rating_follows_review_update(self, titles, reviews):
+        review = Review.objects.get(pk=reviews[1].pk)
+        review.score = 9
+        review.save()
+        review.text = 'Пересмотрел'
+        review.save()
+        title = Title.objects.get(pk=titles[0].pk)
+        assert (title.score_sum, title.review_count) == (19, 2)
+        assert title.rating == expected_rating(title)
+
+    def test_rating_follows_review_move(self, titles, reviews):
+        review = Review.objects.get(pk=reviews[1].pk)
+        review.title = titles[2]
+        review.save()
+        assert Title.objects.get(pk=titles[0].pk).rating == 10
+        assert Title.objects.get(pk=titles[2].pk).rating == 5
+
+    def test_rating_follows_review_delete(self, titles, reviews):
+        Review.objects.get(pk=reviews[0].pk).delete()
+        title = Title.objects.get(pk=titles[0].pk)
+        assert (title.score_sum, title.review_count, title.rating) == (
+            5, 1, 5)
+        Review.objects.filter(title=title).delete()
+        title = Title.objects.get(pk=titles[0].pk)
+        assert (title.score_sum, title.review_count, title.rating) == (
+            0, 0, None)
+
+    def test_rating_follows_cascade_delete(self, titles, reviews, user):
+        user.delete()
+        title = Title.objects.get(pk=titles[0].pk)
+        assert (title.score_sum, title.review_count, title.rating) == (
+            5, 1, 5)
+        assert Title.objects.get(pk=titles[1].pk).rating is None
+
+    def test_title_save_keeps_rating(self, titles, reviews):
+        stale = Title.objects.get(pk=titles[1].pk)
+        Review.objects.create(
+            title=titles[1], author=reviews[1].author, text='Ок', score=2)
+        stale.name = 'Пикник'
+        stale.save()
+        title = Title.objects.get(pk=titles[1].pk)
+        assert title.name == 'Пикник'
+        assert (title.score_sum, title.review_count) == (10, 2), (
+            'Проверьте, что сохранение произведения не затирает рейтинг')
+
+    def test_recalculate_ratings_command(self, titles, reviews):
+        Title.objects.update(score_sum=0, review_count=0, rating=None)
+        call_command('recalculate_ratings', '--batch-size', '2')
+        for title in Title.objects.all():
+            assert title.rating == expected_rating(title)
+            assert title.review_count == title.reviews.count()
+
+
+@pytest.mark.django_db
+class TestRatingApi:
+
+    def test_title_list_reads_stored_rating(
+            self, anon_client, titles, reviews, django_assert_max_num_queries):
+        with django_assert_max_num_queries(20) as captured:
+            response = anon_client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        ratings = {
+            item['id']: item['rating'] for item in response.json()['results']}
+        assert ratings == {
+            titles[0].pk: 7, titles[1].pk: 8, titles[2].pk: None}
+        assert not any(
+            'AVG(' in query['sql'].upper() for query in captured.captured_queries
+        ), 'Проверьте, что рейтинг не вычисляется агрегатом при запросе'
+
+    def test_title_ordering_by_rating(self, anon_client, titles, reviews):
+        response = anon_client.get('/api/v1/titles/?ordering=rating')
+        assert [item['id'] for item in response.json()['results']] == [
+            titles[0].pk, titles[1].pk, titles[2].pk]
+        response = anon_client.get('/api/v1/titles/?ordering=-rating')
+        assert [item['id'] for item in response.json()['results']] == [
+            titles[1].pk, titles[0].pk, titles[2].pk], (
+            'Проверьте, что произведения без рейтинга идут в конце '
+            'при любом направлении сортировки')
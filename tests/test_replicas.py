@@ -0,0 +1,128 @@
+import pytest
+from django.core.management import call_command
+from django.db import connections
+
+from api import replicas
+from reviews.models import Category
+
+REPLICAS = ('replica1', 'replica2')
+
+
+def add_database(alias, name):
+    connections.databases[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3', 'NAME': name}
+    connections.ensure_defaults(alias)
+    connections.prepare_test_settings(alias)
+
+
+def remove_database(alias):
+    connections[alias].close()
+    del connections[alias]
+    del connections.databases[alias]
+
+
+@pytest.fixture
+def broken_replica(settings):
+    """Реплика, добавленная после начала теста: её не очищают."""
+
+    def add(name):
+        add_database('broken', name)
+        settings.DATABASE_REPLICAS = ['broken']
+
+    yield add
+    remove_database('broken')
+
+
+@pytest.fixture(scope='module')
+def replica_databases(django_db_setup, django_db_blocker, tmp_path_factory):
+    """Реплики — отдельные базы SQLite со схемой, но без данных."""
+    directory = tmp_path_factory.mktemp('replicas')
+    with django_db_blocker.unblock():
+        for alias in REPLICAS:
+            add_database(alias, str(directory / f'{alias}.sqlite3'))
+        for alias in REPLICAS:
+            call_command('migrate', database=alias, verbosity=0)
+    yield
+    for alias in REPLICAS:
+        remove_database(alias)
+
+
+@pytest.fixture
+def use_replicas(replica_databases, settings):
+    settings.DATABASE_REPLICAS = list(REPLICAS)
+    replicas.unavailable.clear()
+    replicas.checked.clear()
+    yield
+    replicas.unavailable.clear()
+    replicas.checked.clear()
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', *REPLICAS])
+@pytest.mark.usefixtures('use_replicas')
+class TestReplicas:
+
+    def test_safe_requests_read_from_replica(self, anon_client, categories):
+        for alias in REPLICAS:
+            Category.objects.using(alias).create(
+                name='Только на реплике', slug='replica')
+        response = anon_client.get('/api/v1/categories/')
+        assert [item['slug'] for item in response.json()['results']] == [
+            'replica'], 'Проверьте, что списки читаются с реплики'
+
+    def test_replica_reads_are_not_cached(self, anon_client, settings,
+                                          titles):
+        response = anon_client.get('/api/v1/titles/')
+        assert response.json()['results'] == []
+        assert 'ETag' not in response, (
+            'Проверьте, что ответ с реплики не получает ETag по версиям')
+        settings.DATABASE_REPLICAS = []
+        response = anon_client.get('/api/v1/titles/')
+        assert len(response.json()['results']) == len(titles), (
+            'Проверьте, что ответ с реплики не попадает в кеш')
+        assert 'ETag' in response
+
+    def test_writes_go_to_primary(self, admin_client):
+        response = admin_client.post(
+            '/api/v1/categories/', data={'name': 'Музыка', 'slug': 'music'})
+        assert response.status_code == 201
+        assert Category.objects.using('default').filter(
+            slug='music').exists()
+        for alias in REPLICAS:
+            assert not Category.objects.using(alias).exists()
+
+    def test_read_your_writes(self, user_client, anon_client, titles):
+        url = f'/api/v1/titles/{titles[2].pk}/reviews/'
+        response = user_client.post(url, data={'text': 'Отзыв', 'score': 8})
+        assert response.status_code == 201
+        response = user_client.get(url)
+        assert response.status_code == 200, (
+            'Проверьте, что после записи пользователь читает ведущую базу')
+        assert response.json()['results'][0]['text'] == 'Отзыв'
+        assert anon_client.get(url).status_code == 404, (
+            'Проверьте, что остальные читают с реплики')
+
+    def test_unreachable_replica_is_skipped(self, broken_replica,
+                                            anon_client, categories):
+        broken_replica('/nonexistent/db.sqlite3')
+        response = anon_client.get('/api/v1/categories/')
+        assert response.status_code == 200
+        assert response.json()['count'] == len(categories)
+        assert 'broken' in replicas.unavailable
+
+    def test_replica_error_falls_back_to_primary(
+            self, settings, broken_replica, anon_client, titles):
+        settings.SQL_BUDGET_STRICT = False
+        broken_replica(':memory:')
+        response = anon_client.get('/api/v1/titles/')
+        assert response.status_code == 200, (
+            'Проверьте, что при ошибке реплики запрос идёт на ведущую базу')
+        assert response.json()['count'] == len(titles)
+        assert 'broken' in replicas.unavailable
+
+    def test_lagging_replica_is_skipped(self, monkeypatch, settings,
+                                        anon_client, categories):
+        monkeypatch.setattr(
+            replicas, 'get_lag', lambda alias: settings.REPLICA_MAX_LAG + 1)
+        response = anon_client.get('/api/v1/categories/')
+        assert response.json()['count'] == len(categories), (
+            'Проверьте, что отстающая реплика не используется')
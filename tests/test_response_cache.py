@@ -0,0 +1,95 @@
+import pytest
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.cache import get_stats
+from reviews.models import Review, Title
+from reviews import versions
+from reviews.versions import get_versions
+
+
+def get(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return response, len(context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+
+    @pytest.mark.parametrize('url', (
+        '/api/v1/titles/', '/api/v1/categories/', '/api/v1/genres/'))
+    def test_repeated_get_is_served_from_cache(self, anon_client, titles, url):
+        first, _ = get(anon_client, url)
+        second, queries = get(anon_client, url)
+        assert first['X-Cache'] == 'MISS'
+        assert second['X-Cache'] == 'HIT'
+        assert queries == 0, 'Проверьте, что ответ из кеша не читает базу'
+        assert second.json() == first.json()
+
+    def test_retrieve_and_stats(self, anon_client, titles):
+        before = get_stats().get('title.retrieve.hit', 0)
+        url = f'/api/v1/titles/{titles[0].pk}/'
+        get(anon_client, url)
+        response, queries = get(anon_client, url)
+        assert response['X-Cache'] == 'HIT'
+        assert queries == 1, (
+            'Проверьте, что из базы читается только дата изменения для ETag')
+        assert get_stats()['title.retrieve.hit'] == before + 1
+
+    def test_query_params_are_part_of_key(self, anon_client, titles):
+        get(anon_client, '/api/v1/titles/?limit=1')
+        response, _ = get(anon_client, '/api/v1/titles/?limit=2')
+        assert response['X-Cache'] == 'MISS'
+        assert len(response.json()['results']) == 2
+
+    def test_write_invalidates_cache(self, admin_client, titles):
+        get(admin_client, '/api/v1/titles/')
+        admin_client.post('/api/v1/titles/', data={
+            'name': 'Сталкер', 'year': 1979, 'genre': ['drama'],
+            'category': 'movie'})
+        response, _ = get(admin_client, '/api/v1/titles/')
+        assert response['X-Cache'] == 'MISS'
+        assert 'Сталкер' in [
+            item['name'] for item in response.json()['results']]
+
+    def test_related_write_invalidates_titles(self, admin_client, titles):
+        get(admin_client, f'/api/v1/titles/{titles[0].pk}/')
+        admin_client.delete('/api/v1/categories/movie/')
+        response, _ = get(admin_client, f'/api/v1/titles/{titles[0].pk}/')
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['category'] is None
+
+    def test_review_invalidates_rating(self, anon_client, titles, user):
+        url = f'/api/v1/titles/{titles[2].pk}/'
+        get(anon_client, url)
+        Review.objects.create(title=titles[2], author=user, text='Да', score=6)
+        response, _ = get(anon_client, url)
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['rating'] == 6
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCommit:
+
+    def test_versions_are_bumped_again_after_commit(self, titles):
+        with transaction.atomic():
+            titles[0].save()
+            during = get_versions(Title)
+        assert get_versions(Title) > during, (
+            'Проверьте, что версия увеличивается и после фиксации транзакции')
+
+    def test_versions_do_not_expire(self, monkeypatch):
+        timeouts = []
+        add = versions.cache.add
+
+        def remember_add(key, value, timeout=DEFAULT_TIMEOUT, **kwargs):
+            timeouts.append(timeout)
+            return add(key, value, timeout, **kwargs)
+
+        monkeypatch.setattr(versions.cache, 'add', remember_add)
+        get_versions('reviews.title:expiry')
+        assert timeouts == [None], (
+            'Проверьте, что счётчики версий хранятся без срока')
@@ -0,0 +1,57 @@
+import pytest
+
+from reviews.models import Title
+from reviews.search import title_index, tokenize
+
+
+def search(client, text, extra=''):
+    response = client.get(f'/api/v1/titles/?search={text}{extra}')
+    assert response.status_code == 200
+    return [item['name'] for item in response.json()['results']]
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    def test_search_is_case_insensitive_prefix(self, anon_client, titles):
+        assert search(anon_client, 'СОЛЯР') == ['Солярис']
+        assert search(anon_client, 'пикн обоч') == ['Пикник на обочине']
+        assert search(anon_client, 'тарковск') == ['Солярис'], (
+            'Проверьте, что поиск идёт и по описанию произведения')
+        assert search(anon_client, 'несуществующее') == []
+
+    def test_search_ranks_name_above_description(
+            self, anon_client, titles, categories):
+        Title.objects.create(
+            name='Зеркало', year=1975, category=categories[0],
+            description='Ещё один фильм, снятый после Соляриса')
+        assert search(anon_client, 'солярис') == ['Солярис', 'Зеркало']
+
+    def test_explicit_ordering_wins_over_rank(
+            self, anon_client, titles, categories):
+        Title.objects.create(
+            name='Зеркало', year=1975, category=categories[0],
+            description='Ещё один фильм, снятый после Соляриса')
+        assert search(anon_client, 'солярис', '&ordering=name') == [
+            'Зеркало', 'Солярис']
+
+    def test_search_follows_writes(self, admin_client, titles):
+        admin_client.patch(
+            f'/api/v1/titles/{titles[2].pk}/', data={'name': 'Кин-дза-дза'})
+        assert search(admin_client, 'кин') == ['Кин-дза-дза']
+        assert search(admin_client, 'джентльмены') == []
+
+
+@pytest.mark.django_db
+class TestInvertedIndex:
+
+    def test_fallback_index(self, titles):
+        scores = title_index.search(tokenize('фил'))
+        assert set(scores) == {titles[0].pk}
+        scores = title_index.search(tokenize('п'))
+        assert set(scores) == {titles[1].pk}
+
+    def test_fallback_index_refreshes_on_writes(self, titles):
+        assert not title_index.search(tokenize('сталкер'))
+        Title.objects.create(name='Сталкер', year=1979)
+        assert title_index.search(tokenize('сталкер'))
@@ -0,0 +1,71 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+URL = '/api/v1/titles/'
+
+
+def get(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, response.json()
+    return response.json(), ' '.join(
+        query['sql'] for query in context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestSparseFields:
+
+    def test_default_payload_is_unchanged(self, anon_client, titles):
+        data, _ = get(anon_client, f'{URL}{titles[0].pk}/')
+        assert set(data) == {
+            'id', 'genre', 'category', 'rating', 'review_count',
+            'score_histogram', 'name', 'year', 'description'}
+        assert data['category'] == {'name': 'Фильм', 'slug': 'movie'}
+
+    def test_fields_prune_payload_and_queries(self, anon_client, titles):
+        data, sql = get(anon_client, f'{URL}?fields=id,name')
+        assert all(set(item) == {'id', 'name'} for item in data['results'])
+        assert 'reviews_genre' not in sql, (
+            'Проверьте, что жанры не загружаются без поля genre')
+        assert 'reviews_category' not in sql, (
+            'Проверьте, что категория не присоединяется без поля category')
+        assert '"reviews_title"."description"' not in sql, (
+            'Проверьте, что описание не читается без поля description')
+
+    def test_fields_with_cursor_pagination(self, anon_client, titles):
+        data, _ = get(anon_client, f'{URL}?fields=id&cursor=&limit=2')
+        assert [set(item) for item in data['results']] == [{'id'}, {'id'}]
+        assert data['next']
+
+    def test_expand_selected_relations(self, anon_client, titles):
+        data, _ = get(
+            anon_client,
+            f'{URL}{titles[0].pk}/?fields=id,genre,category&expand=category')
+        assert data['category'] == {'name': 'Фильм', 'slug': 'movie'}
+        assert sorted(data['genre']) == ['drama', 'sci-fi'], (
+            'Проверьте, что неразвёрнутые связи отдаются слагами')
+        data, _ = get(anon_client, f'{URL}{titles[0].pk}/?expand=')
+        assert data['category'] == 'movie'
+
+    def test_unknown_fields_are_rejected(self, anon_client, titles):
+        assert anon_client.get(f'{URL}?fields=id,secret').status_code == 400
+        assert anon_client.get(f'{URL}?expand=rating').status_code == 400
+
+    def test_review_fields_and_author_expansion(self, anon_client, reviews):
+        url = f'{URL}{reviews[0].title_id}/reviews/'
+        data, sql = get(anon_client, f'{url}?fields=id,author&expand=author')
+        assert data['results'][0]['author'] == {
+            'username': reviews[1].author.username, 'first_name': None,
+            'last_name': None}
+        assert set(data['results'][0]) == {'id', 'author'}
+        assert '"reviews_review"."text"' not in sql
+        data, _ = get(anon_client, f'{url}?fields=score')
+        assert [item['score'] for item in data['results']] == [5, 10]
+
+    def test_comment_fields(self, anon_client, comments):
+        review = comments[0].review
+        data, _ = get(
+            anon_client, f'{URL}{review.title_id}/reviews/{review.pk}/'
+            f'comments/?fields=text')
+        assert data['results'] == [{'text': 'Спасибо'}, {'text': 'Согласен'}]
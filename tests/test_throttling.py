@@ -0,0 +1,142 @@
+import pytest
+
+from api import throttling
+from api.throttling import SlidingWindowThrottle
+
+SIGNUP = '/api/v1/auth/signup/'
+TOKEN = '/api/v1/auth/token/'
+
+
+@pytest.fixture
+def rates(settings):
+    def set_rates(**rates):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}
+    return set_rates
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [3600 * 1000.0]
+    monkeypatch.setattr(SlidingWindowThrottle, 'timer', lambda self: now[0])
+    return now
+
+
+class CountingCache:
+    """Класс обёртки кеша, считающий обращения."""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.cache, name)
+
+        def call(*args, **kwargs):
+            self.calls.append(name)
+            return method(*args, **kwargs)
+        return call
+
+
+def signup(client, number, **extra):
+    return client.post(SIGNUP, data={
+        'username': f'user{number}', 'email': f'user{number}@yamdb.fake'},
+        **extra)
+
+
+@pytest.mark.django_db
+class TestThrottling:
+
+    def test_signup_is_limited_by_ip(self, anon_client, rates, clock):
+        rates(signup='3/min')
+        for number in range(3):
+            assert signup(anon_client, number).status_code == 200
+        response = signup(anon_client, 3)
+        assert response.status_code == 429, (
+            'Проверьте ограничение регистрации с одного адреса')
+        assert response['Retry-After'] == '90', (
+            'Проверьте, что Retry-After — время, через которое пройдёт '
+            'следующий запрос с учётом отклонённого')
+        other = signup(anon_client, 4, REMOTE_ADDR='10.0.0.2')
+        assert other.status_code == 200, (
+            'Проверьте, что счётчики адресов независимы')
+
+    def test_address_is_taken_from_proxy(self, anon_client, rates, clock):
+        rates(signup='1/min')
+        assert signup(
+            anon_client, 0, HTTP_X_FORWARDED_FOR='1.1.1.1, 10.0.0.2'
+        ).status_code == 200
+        assert signup(
+            anon_client, 1, HTTP_X_FORWARDED_FOR='2.2.2.2, 10.0.0.2'
+        ).status_code == 429, (
+            'Проверьте, что адрес клиента берётся из записи прокси, '
+            'а не из подставленного клиентом заголовка')
+        assert signup(
+            anon_client, 2, HTTP_X_FORWARDED_FOR='10.0.0.3'
+        ).status_code == 200, (
+            'Проверьте, что клиенты за прокси получают разные счётчики')
+
+    def test_window_slides(self, anon_client, rates, clock):
+        rates(signup='4/min')
+        for number in range(4):
+            assert signup(anon_client, number).status_code == 200
+        response = signup(anon_client, 4)
+        assert response.status_code == 429
+        clock[0] += int(response['Retry-After'])
+        assert signup(anon_client, 5).status_code == 200, (
+            'Проверьте, что прошлое окно выходит из нормы постепенно')
+        assert signup(anon_client, 6).status_code == 429
+        clock[0] += 30
+        assert signup(anon_client, 7).status_code == 200, (
+            'Проверьте, что окно продолжает сдвигаться')
+
+    def test_burst_is_capped_by_capacity(self, anon_client, rates, clock):
+        rates(signup='10/hour')
+        clock[0] += 3599
+        allowed = 0
+        for number in range(30):
+            allowed += signup(anon_client, number).status_code == 200
+            clock[0] += 0.1
+        assert allowed == 10, (
+            'Проверьте, что на границе периода норма не удваивается')
+
+    def test_token_is_limited_by_username(self, anon_client, user, rates,
+                                          clock):
+        rates(token_username='3/hour')
+        for number in range(3):
+            response = anon_client.post(TOKEN, data={
+                'username': user.username, 'confirmation_code': '000000'},
+                REMOTE_ADDR=f'10.0.0.{number}')
+            assert response.status_code == 400
+        response = anon_client.post(TOKEN, data={
+            'username': user.username, 'confirmation_code': '000000'},
+            REMOTE_ADDR='10.0.1.1')
+        assert response.status_code == 429, (
+            'Проверьте, что подбор кода ограничен по имени пользователя '
+            'независимо от адреса')
+        assert int(response['Retry-After']) > 0
+
+    def test_review_creation_is_limited(self, user_client, titles, rates,
+                                        clock):
+        rates(create='1/min')
+        url = '/api/v1/titles/{}/reviews/'
+        response = user_client.post(
+            url.format(titles[0].pk), data={'text': 'Отзыв', 'score': 5})
+        assert response.status_code == 201
+        response = user_client.post(
+            url.format(titles[1].pk), data={'text': 'Отзыв', 'score': 5})
+        assert response.status_code == 429
+        assert user_client.get(url.format(titles[0].pk)).status_code == 200, (
+            'Проверьте, что чтение не ограничивается')
+
+    def test_one_cache_round_trip(self, anon_client, rates, clock,
+                                  monkeypatch):
+        rates(signup='5/min')
+        signup(anon_client, 0)
+        cache = CountingCache(throttling.cache)
+        monkeypatch.setattr(throttling, 'cache', cache)
+        signup(anon_client, 1)
+        assert cache.calls == ['incr', 'get'], (
+            'Проверьте, что счётчик увеличивается атомарно, без записи '
+            'прочитанного значения поверх')
+